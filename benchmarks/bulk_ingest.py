@@ -0,0 +1,109 @@
+"""
+Compares the row-by-row insert path of the urls and requests tables with the COPY based bulk path.
+
+Both paths store the same amount of urls and log one request per url in a fresh scratch database.
+
+Usage:
+    python benchmarks/bulk_ingest.py --rows 100000 --section Test
+"""
+
+import argparse
+import configparser
+import time
+import uuid
+from datetime import datetime, timezone
+
+from psycopg2 import sql
+
+from europarl.db import DBInterface, Request, Rules, URLs, tables
+from europarl.rules.rule import rule_registry
+
+
+def create_database(admin_db, name):
+    with admin_db.cursor() as db:
+        db.con.autocommit = True
+        db.cur.execute(sql.SQL("CREATE DATABASE {};").format(sql.Identifier(name)))
+
+
+def drop_database(admin_db, name):
+    with admin_db.cursor() as db:
+        db.con.autocommit = True
+        db.cur.execute(
+            sql.SQL("DROP DATABASE IF EXISTS {};").format(sql.Identifier(name))
+        )
+
+
+def setup_rule(db_interface):
+    rules = Rules(db_interface)
+    rules.register_rules(rule_registry.all)
+    return rules.get_rule(rulename="protocol_en_pdf")[0]
+
+
+def row_by_row(db_interface, rows):
+    rule_id = setup_rule(db_interface)
+    urls = URLs(db_interface)
+    requests = Request(db_interface)
+
+    for i in range(rows):
+        url = "https://www.internet.de/{}".format(i)
+        url_id = urls.save_url(None, rule_id, url)
+        requests.mark_as_requested(url_id, status_code=200, redirected_url=url)
+
+
+def bulk(db_interface, rows):
+    rule_id = setup_rule(db_interface)
+    now = datetime.now(tz=timezone.utc)
+
+    with db_interface.transaction():
+        saved = URLs(db_interface).copy_urls(
+            (None, rule_id, "https://www.internet.de/{}".format(i)) for i in range(rows)
+        )
+        Request(db_interface).copy_requests(
+            (url_id, 200, url, now, None) for url_id, date_id, rule_id, url in saved
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument(
+        "--section",
+        default="Test",
+        help="settings.ini section with the database credentials",
+    )
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    config.read("settings.ini")
+    admin_db = DBInterface(config=config[args.section])
+
+    results = {}
+    for name, function in [("row by row", row_by_row), ("copy", bulk)]:
+        db_name = "europarl_benchmark_{}".format(uuid.uuid4().hex[:8])
+        create_database(admin_db, db_name)
+
+        try:
+            db_config = dict(config[args.section])
+            db_config["dbname"] = db_name
+            db_interface = DBInterface(config=db_config)
+
+            for table in tables:
+                table(db_interface).create_table()
+
+            start = time.perf_counter()
+            function(db_interface, args.rows)
+            results[name] = time.perf_counter() - start
+
+            db_interface.close()
+        finally:
+            drop_database(admin_db, db_name)
+
+    admin_db.close()
+
+    print("{:<12} {:>10} {:>12}".format("path", "seconds", "rows/second"))
+    for name, seconds in results.items():
+        print("{:<12} {:>10.2f} {:>12.0f}".format(name, seconds, args.rows / seconds))
+
+
+if __name__ == "__main__":
+    main()
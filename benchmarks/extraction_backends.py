@@ -0,0 +1,117 @@
+"""
+Compares the speed and output of the text extraction backends on the documents of a download directory.
+
+The documents stored by the crawler are grouped by the format of their rule and every registered backend of the format
+extracts all of them. The output of every backend is compared with the BeautifulSoup or pdfminer implementation
+used before the backend registry existed, other formats are compared with their last registered backend.
+
+Usage:
+    python benchmarks/extraction_backends.py --directory ~/europarl --documents 50
+"""
+
+import argparse
+import time
+
+from europarl import rules
+from europarl.importer import scan_directory
+from europarl.rules.extraction import extraction_backends
+
+# backends used before the backend registry existed
+REFERENCE_BACKENDS = {".html": "beautifulsoup", ".pdf": "pdfminer"}
+
+
+def collect_documents(directory, documents):
+    """
+    Finds the stored documents of every format
+
+    Args:
+        directory (str): download directory
+        documents (int): maximal amount of documents per format
+
+    Returns:
+        dict: lists of file paths keyed by format
+    """
+    files = {}
+    for stored in scan_directory(directory).values():
+        for rulename, filepath in stored.items():
+            format = rules.rule_registry.all[rulename].format
+            if len(files.setdefault(format, [])) < documents:
+                files[format].append(str(filepath))
+    return files
+
+
+def run_backend(backend, files):
+    """
+    Extracts the text of all files
+
+    Returns:
+        tuple: seconds and the extracted texts, None for failed documents
+    """
+    texts = []
+    start = time.perf_counter()
+    for filepath in files:
+        try:
+            texts.append(backend(filepath))
+        except Exception:
+            texts.append(None)
+    return time.perf_counter() - start, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--directory", required=True, help="download directory")
+    parser.add_argument(
+        "--documents", type=int, default=50, help="documents per format"
+    )
+    args = parser.parse_args()
+
+    files = collect_documents(args.directory, args.documents)
+
+    print(
+        "{:<6} {:<14} {:>9} {:>10} {:>10} {:>10} {:>10}".format(
+            "format",
+            "backend",
+            "documents",
+            "seconds",
+            "docs/sec",
+            "identical",
+            "same words",
+        )
+    )
+    for format, backends in extraction_backends.all.items():
+        if not files.get(format):
+            continue
+
+        results = {
+            name: run_backend(backend, files[format])
+            for name, backend in backends.items()
+        }
+        _, reference = results[REFERENCE_BACKENDS.get(format, list(backends)[-1])]
+
+        for name, (seconds, texts) in results.items():
+            identical = sum(
+                text is not None and text == expected
+                for text, expected in zip(texts, reference)
+            )
+            # whitespace differs between the parsers while the words stay the same
+            same_words = sum(
+                text is not None
+                and expected is not None
+                and text.split() == expected.split()
+                for text, expected in zip(texts, reference)
+            )
+            print(
+                "{:<6} {:<14} {:>9} {:>10.2f} {:>10.1f} {:>10} {:>10}".format(
+                    format,
+                    name,
+                    len(texts),
+                    seconds,
+                    len(texts) / seconds,
+                    identical,
+                    same_words,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
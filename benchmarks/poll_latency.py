@@ -0,0 +1,192 @@
+"""
+Measures the latency of the polling queries of the documents table with and without the declared indexes.
+
+The benchmark creates a scratch database, fills it with a given amount of documents of which only a small backlog
+is waiting for postprocessing, indexing or unindexing and times every polling query before and after creating the indexes.
+The scratch database is dropped afterwards.
+
+Usage:
+    python benchmarks/poll_latency.py --documents 1000000 --section Test
+"""
+
+import argparse
+import configparser
+import statistics
+import time
+import uuid
+
+from psycopg2 import sql
+
+from europarl.db import DBInterface, Documents, Rules, tables
+from europarl.rules.rule import rule_registry
+
+
+def create_database(admin_db, name):
+    with admin_db.cursor() as db:
+        db.con.autocommit = True
+        db.cur.execute(sql.SQL("CREATE DATABASE {};").format(sql.Identifier(name)))
+
+
+def drop_database(admin_db, name):
+    with admin_db.cursor() as db:
+        db.con.autocommit = True
+        db.cur.execute(
+            sql.SQL("DROP DATABASE IF EXISTS {};").format(sql.Identifier(name))
+        )
+
+
+def populate(db_interface, documents, backlog):
+    """
+    Fills the database with processed and indexed documents and a backlog of documents in every polling state
+
+    Args:
+        db_interface (DBInterface): connection to the scratch database
+        documents (int): total amount of documents
+        backlog (int): amount of documents waiting in every polling state
+    """
+    rules = Rules(db_interface)
+    rules.register_rules(rule_registry.all)
+    rule_id = rules.get_rule(rulename="protocol_en_pdf")[0]
+    rules.update_rule_state(id=rule_id, active=True)
+
+    with db_interface.cursor() as db:
+        # the largest part of the table consists out of processed and indexed documents
+        db.cur.execute(
+            """ INSERT INTO documents(filepath, filename, enqueued, data, downloaded_at, indexed, unindex)
+                SELECT '/data/' || i || '.pdf', md5(i::text)::uuid, true,
+                    '{"text": "processed"}'::jsonb, now(),
+                    /*documents at the end of the id range form the different backlogs*/
+                    i <= %(documents)s - 2 * %(backlog)s,
+                    i > %(documents)s - %(backlog)s
+                FROM generate_series(1, %(documents)s) AS i;""",
+            {"documents": documents, "backlog": backlog},
+        )
+        # freshly downloaded documents waiting for the postprocessing scheduler
+        db.cur.execute(
+            """ INSERT INTO documents(filepath, filename, enqueued)
+                SELECT '/data/new_' || i || '.pdf', md5('new_' || i)::uuid, false
+                FROM generate_series(1, %s) AS i;""",
+            [backlog],
+        )
+        db.cur.execute(
+            """ INSERT INTO urls(date_id, rule_id, url)
+                SELECT NULL, %s, 'https://www.internet.de/' || id
+                FROM documents;""",
+            [rule_id],
+        )
+        db.cur.execute(
+            """ INSERT INTO requests(url_id, document_id, requested_at, status_code, redirected_url)
+                SELECT urls.id, documents.id, now(), 200, urls.url
+                FROM documents
+                INNER JOIN urls ON urls.url = 'https://www.internet.de/' || documents.id;"""
+        )
+
+
+def drop_indexes(db_interface):
+    with db_interface.cursor() as db:
+        for table in tables:
+            for index_definition in table.index_definitions:
+                words = index_definition.split()
+                if words[:2] != ["CREATE", "INDEX"]:
+                    continue
+                # CREATE INDEX IF NOT EXISTS <name> ON ...
+                db.cur.execute(
+                    sql.SQL("DROP INDEX IF EXISTS {};").format(sql.Identifier(words[5]))
+                )
+
+
+def create_indexes(db_interface):
+    for table in tables:
+        table(db_interface).create_indexes()
+
+    with db_interface.cursor() as db:
+        db.cur.execute("ANALYZE;")
+
+
+def measure(function, polls):
+    """
+    Calls the passed function multiple times
+
+    Returns:
+        tuple: median and maximum latency in milliseconds
+    """
+    timings = []
+    for _ in range(polls):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+def run_polls(db_interface, polls):
+    documents = Documents(db_interface)
+
+    queries = {
+        "get_unprocessed_documents": lambda: documents.get_unprocessed_documents(
+            limit=50
+        ),
+        "get_unindexed_data": lambda: documents.get_unindexed_data(limit=100),
+        "get_documents_to_unidex": documents.get_documents_to_unidex,
+    }
+
+    return {name: measure(query, polls) for name, query in queries.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--documents", type=int, default=1000000)
+    parser.add_argument("--backlog", type=int, default=100)
+    parser.add_argument("--polls", type=int, default=50)
+    parser.add_argument(
+        "--section",
+        default="Test",
+        help="settings.ini section with the database credentials",
+    )
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    config.read("settings.ini")
+
+    admin_db = DBInterface(config=config[args.section])
+    db_name = "europarl_benchmark_{}".format(uuid.uuid4().hex[:8])
+    create_database(admin_db, db_name)
+
+    try:
+        db_config = dict(config[args.section])
+        db_config["dbname"] = db_name
+        db_interface = DBInterface(config=db_config)
+
+        for table in tables:
+            table(db_interface).create_table()
+
+        print("Populating {} documents".format(args.documents))
+        populate(db_interface, args.documents, args.backlog)
+
+        drop_indexes(db_interface)
+        with db_interface.cursor() as db:
+            db.cur.execute("ANALYZE;")
+        without_indexes = run_polls(db_interface, args.polls)
+
+        create_indexes(db_interface)
+        with_indexes = run_polls(db_interface, args.polls)
+
+        print(
+            "{:<28} {:>22} {:>22}".format(
+                "query", "no index median/max ms", "indexed median/max ms"
+            )
+        )
+        for name in without_indexes:
+            print(
+                "{:<28} {:>10.2f} / {:>9.2f} {:>10.2f} / {:>9.2f}".format(
+                    name, *without_indexes[name], *with_indexes[name]
+                )
+            )
+
+        db_interface.close()
+    finally:
+        drop_database(admin_db, db_name)
+        admin_db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 from .documents import Documents
-from .interface import DBInterface, create_table_structure
+from .interface import DBInterface, Listener, create_table_structure
+from .migrations import SchemaMigrations
+from .pendingcombos import PendingCombos
 from .requests import Request
 from .rules import Rules
 from .sessionDay import SessionDay
@@ -7,9 +9,11 @@ from .tables import Table
 from .url import URLs
 
 tables = [
+    SchemaMigrations,
     Rules,
     SessionDay,
     URLs,
     Documents,
     Request,
+    PendingCombos,
 ]
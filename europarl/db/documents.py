@@ -25,6 +25,10 @@ class Documents(Table):
             true if the document is stored in elasticsearch
         unindex (boolean):
             marker to unindex this document
+        sha256 (str):
+            hex encoded SHA-256 fingerprint of the file content
+        filesize (int):
+            size of the file in bytes
 
     """
 
@@ -39,29 +43,72 @@ class Documents(Table):
                             downloaded_at timestamp with time zone,
                             indexed boolean DEFAULT False,
                             unindex boolean DEFAULT False,
+                            sha256 VARCHAR(64),
+                            filesize bigint,
                             CONSTRAINT documents_pkey PRIMARY KEY (id)
                           );"""
+    index_definitions = [
+        # documents waiting to be claimed by the postprocessing scheduler
+        """ CREATE INDEX IF NOT EXISTS documents_unprocessed_index
+            ON {schema}.{table} USING btree
+            (id)
+            WHERE enqueued = false""",
+        # postprocessed documents waiting for the indexer
+        """ CREATE INDEX IF NOT EXISTS documents_unindexed_index
+            ON {schema}.{table} USING btree
+            (id)
+            WHERE indexed = false AND data IS NOT NULL""",
+        # documents which should be removed from the index
+        """ CREATE INDEX IF NOT EXISTS documents_unindex_index
+            ON {schema}.{table} USING btree
+            (id)
+            WHERE unindex = true""",
+    ]
+    trigger_definitions = [
+        # wakes up the postprocessing scheduler for downloaded or reset documents
+        """ DROP TRIGGER IF EXISTS documents_unprocessed_notify ON {schema}.{table};
+            CREATE TRIGGER documents_unprocessed_notify
+            AFTER INSERT OR UPDATE OF enqueued ON {schema}.{table}
+            FOR EACH ROW WHEN (NEW.enqueued = false)
+            EXECUTE PROCEDURE {schema}.notify_channel('documents_unprocessed')""",
+        # wakes up the indexer for postprocessed or reindexed documents
+        """ DROP TRIGGER IF EXISTS documents_unindexed_notify ON {schema}.{table};
+            CREATE TRIGGER documents_unindexed_notify
+            AFTER UPDATE OF data, indexed ON {schema}.{table}
+            FOR EACH ROW WHEN (NEW.indexed = false AND NEW.data IS NOT NULL)
+            EXECUTE PROCEDURE {schema}.notify_channel('documents_unindexed')""",
+    ]
 
     def register_document(
         self,
         filepath,
         filename,
         downloaded_at=None,
+        sha256=None,
+        filesize=None,
     ):
         """
         Stores a document in the table
 
+        If a document with the same filename already exists, no new row is created and the id of the existing document is returned.
+        In the content-addressed storage mode the filename is derived from the content hash, so an unchanged document gets linked to its existing row. Postprocessing and indexing results of that row are kept and no work is redone.
+
         Args:
             filepath (str): path to the place where the document is stored on the system
             filename (uuid): uuid of the document
             downloaded_at (datetime.datetime, optional): Timestamp when the document was downloaded. Defaults to ```datetime.now(tz=timezone.utc)```.
+            sha256 (str, optional): hex encoded SHA-256 fingerprint of the file content. Defaults to None.
+            filesize (int, optional): size of the file in bytes. Defaults to None.
 
         Returns:
             int: id of the database entry
         """
 
-        query = """ INSERT INTO documents(filepath, filename, downloaded_at)
-                    VALUES ( %s, %s, %s)
+        query = """ INSERT INTO documents(filepath, filename, downloaded_at, sha256, filesize)
+                    VALUES ( %s, %s, %s, %s, %s)
+                    ON CONFLICT (filename)
+                    DO
+                        UPDATE SET filename=EXCLUDED.filename
                     RETURNING id
                 """
 
@@ -71,7 +118,7 @@ class Documents(Table):
         with self.db.cursor() as db:
             db.cur.execute(
                 query,
-                [filepath, filename, downloaded_at],
+                [filepath, filename, downloaded_at, sha256, filesize],
             )
             result = db.cur.fetchone()[0]
 
@@ -87,13 +134,23 @@ class Documents(Table):
         Returns:
             list of dicts: dict containing the rule id and name for the document and the document id and filepath
         """
-        query = """ SELECT rules.id, rules.rulename, documents.id, documents.filepath
-                    FROM documents
-                    LEFT JOIN requests ON requests.document_id=documents.id
-                    LEFT JOIN urls on requests.url_id=urls.id
-                    LEFT JOIN rules on urls.rule_id=rules.id
-                    WHERE rules.rulename is not NULL and rules.active=True and documents.enqueued =False
-                    ORDER by requests.requested_at ASC
+        query = """ SELECT rule_id, rulename, document_id, filepath
+                    FROM (
+                        /*a document can be linked to multiple requests, only its first request is used*/
+                        SELECT DISTINCT ON (documents.id)
+                            rules.id AS rule_id,
+                            rules.rulename,
+                            documents.id AS document_id,
+                            documents.filepath,
+                            requests.requested_at
+                        FROM documents
+                        LEFT JOIN requests ON requests.document_id=documents.id
+                        LEFT JOIN urls on requests.url_id=urls.id
+                        LEFT JOIN rules on urls.rule_id=rules.id
+                        WHERE rules.rulename is not NULL and rules.active=True and documents.enqueued =False
+                        ORDER BY documents.id, requests.requested_at ASC
+                    ) first_requests
+                    ORDER by requested_at ASC
                     LIMIT %s
                 """
         with self.db.cursor() as db:
@@ -114,11 +171,89 @@ class Documents(Table):
 
         return result
 
+    def count_unprocessed_documents(self):
+        """
+        Counts the downloaded documents of active rules that aren't processed and aren't queued up for postprocessing
+
+        Returns:
+            int: amount of documents waiting for the postprocessing scheduler
+        """
+        query = """ SELECT COUNT(*)
+                    FROM documents
+                    WHERE documents.enqueued = False
+                    AND EXISTS (
+                        SELECT 1
+                        FROM requests
+                        INNER JOIN urls ON requests.url_id=urls.id
+                        INNER JOIN rules ON urls.rule_id=rules.id
+                        WHERE requests.document_id=documents.id AND rules.active=True
+                    )
+                """
+        with self.db.cursor() as db:
+            db.cur.execute(query)
+            return db.cur.fetchone()[0]
+
+    def claim_unprocessed_documents(self, limit=10):
+        """
+        Atomically marks a batch of unprocessed documents as queued up and returns them.
+        Documents locked by a concurrent claim are skipped, which allows several schedulers to claim documents at the same time without returning a document twice.
+
+        Args:
+            limit (int, optional): Amount of documents that should be claimed. Defaults to 10.
+
+        Returns:
+            list of dicts: dict containing the rule id and name for the document and the document id and filepath, ordered by the time of the first request
+        """
+        query = """ WITH claimed AS (
+                        SELECT documents.id, first_request.rule_id, first_request.rulename, first_request.requested_at
+                        FROM documents
+                        /*a document can be linked to multiple requests, only its first request is used*/
+                        CROSS JOIN LATERAL (
+                            SELECT rules.id AS rule_id, rules.rulename, requests.requested_at
+                            FROM requests
+                            INNER JOIN urls on requests.url_id=urls.id
+                            INNER JOIN rules on urls.rule_id=rules.id
+                            WHERE requests.document_id=documents.id and rules.active=True
+                            ORDER BY requests.requested_at ASC
+                            LIMIT 1
+                        ) first_request
+                        WHERE documents.enqueued=False
+                        ORDER BY first_request.requested_at ASC
+                        LIMIT %s
+                        FOR UPDATE OF documents SKIP LOCKED
+                    )
+                    UPDATE documents
+                    SET enqueued = True
+                    FROM claimed
+                    WHERE documents.id = claimed.id
+                    RETURNING claimed.rule_id, claimed.rulename, documents.id, documents.filepath, claimed.requested_at
+                """
+        with self.db.cursor() as db:
+            db.cur.execute(
+                query,
+                [limit],
+            )
+            documents = db.cur.fetchall()
+
+        # UPDATE ... RETURNING doesn't preserve the order of the subquery
+        documents.sort(key=lambda item: item[4])
+
+        result = []
+        for item in documents:
+            result.append(
+                {
+                    "rule": {"id": item[0], "name": item[1]},
+                    "document": {"id": item[2], "filepath": item[3]},
+                }
+            )
+
+        return result
+
     def mark_as_enqueued(self, document_id):
         """
         Marks a document as queued up.
 
-        Could be integrated into get_uprocessed_documents by converting it into update-returning SQL call.
+        Use claim_unprocessed_documents to get and mark a batch of documents in a single statement.
 
         Args:
             document_id (int): id of the document entry
@@ -134,6 +269,24 @@ class Documents(Table):
                 [document_id],
             )
 
+    def release_documents(self, document_ids):
+        """
+        Marks claimed documents which were never queued up as unprocessed again.
+
+        Args:
+            document_ids (list of int): ids of the claimed documents
+        """
+        query = """ UPDATE documents
+                    SET enqueued = False
+                    WHERE documents.id = ANY(%s)
+                """
+
+        with self.db.cursor() as db:
+            db.cur.execute(
+                query,
+                [list(document_ids)],
+            )
+
     def reset_enqueued(self):
         """
         Removes all enqueued-locking by setting the field to false where no data is associated with the document.
@@ -210,13 +363,15 @@ class Documents(Table):
             dict: dict containing all metadata fields as separate keys
         """
         query = """SET TIMEZONE='UTC';
-        SELECT documents.filepath, documents.downloaded_at, requests.redirected_url, session_days.dates, rules.rulename, rules.filetype, rules.language
+        SELECT documents.filepath, documents.downloaded_at, documents.sha256, documents.filesize, requests.redirected_url, session_days.dates, rules.rulename, rules.filetype, rules.language
         FROM documents
         LEFT JOIN requests ON requests.document_id = documents.id
         LEFT JOIN urls on urls.id=requests.url_id
         LEFT JOIN session_days on urls.date_id = session_days.id
         LEFT JOIN rules on urls.rule_id = rules.id
-        WHERE documents.id = %s;
+        WHERE documents.id = %s
+        ORDER BY requests.requested_at ASC
+        LIMIT 1;
         """
 
         with self.db.cursor() as db:
@@ -229,6 +384,8 @@ class Documents(Table):
         keys = [
             "filepath",
             "downloaded_at",
+            "sha256",
+            "filesize",
             "url",
             "session_date",
             "rulename",
@@ -1,31 +1,61 @@
+import logging
+import os
+import select
+import threading
+import time
 from contextlib import contextmanager
 from types import SimpleNamespace
 
 import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
 from psycopg2 import sql
 
 
 def create_table_structure(config):
-    from europarl.db import tables
+    from europarl.db import SchemaMigrations, tables
 
     temp_db = DBInterface(config=config["General"])
 
+    new_installation = True
     for table in tables:
         table_inst = table(temp_db)
         if not table_inst.table_exists():
             table_inst.create_table()
+        elif table is not SchemaMigrations:
+            new_installation = False
         del table_inst
 
+    migrations = SchemaMigrations(temp_db)
+    if new_installation:
+        # tables created from the latest definitions don't need any migration
+        migrations.baseline()
+    else:
+        pending = migrations.pending_migrations()
+        if len(pending) > 0:
+            logging.getLogger(__name__).warning(
+                "Database schema is missing migrations {}, run 'eurocli db migrate'".format(
+                    [migration.version for migration in pending]
+                )
+            )
+    del migrations
+
     temp_db.close()
 
 
 class DBInterface:
     """
-    Manages the db-connection by storing connection details, tests the connection and providing a custom context manager.
+    Manages a pool of db-connections by storing connection details, checking the health of borrowed connections and providing a custom context manager.
+
+    Table instances share the DBInterface they are created with and borrow a connection from its pool for every cursor.
+    The pool is created lazily and recreated after a fork, because connections can't be shared between processes.
     """
 
     connection_name = "europarl-crawler"
-    connection = None
+    pool = None
+
+    POOL_MIN_SIZE = 1
+    POOL_MAX_SIZE = 4
 
     def __init__(
         self,
@@ -35,6 +65,8 @@ class DBInterface:
         host=None,
         port=None,
         config=None,
+        pool_min_size=None,
+        pool_max_size=None,
     ):
         """Creates a DBInterface instance
         Stores the connection details in the instance and
@@ -47,6 +79,8 @@ class DBInterface:
             password string: passwort for the db user
             host string: hostname/adress to connect to
             port number: host port to connect to
+            pool_min_size int: amount of connections the pool keeps open
+            pool_max_size int: maximal amount of connections the pool opens
         """
         if config:
             self.name = config["dbname"]
@@ -54,6 +88,8 @@ class DBInterface:
             self.password = config["dbpassword"]
             self.host = config["dbhost"]
             self.port = config["dbport"]
+            pool_min_size = config.get("dbpoolminsize", pool_min_size)
+            pool_max_size = config.get("dbpoolmaxsize", pool_max_size)
         else:
             self.name = name
             self.user = user
@@ -61,65 +97,306 @@ class DBInterface:
             self.host = host
             self.port = port
 
+        self.pool_min_size = int(pool_min_size or self.POOL_MIN_SIZE)
+        self.pool_max_size = int(pool_max_size or self.POOL_MAX_SIZE)
+        self.pid = None
+        # connections pinned to a thread by an open transaction
+        self.local = threading.local()
+
     def connect(self):
-        """Creates a db connection and stores it in the instance
-        Reopens already closed connections.
+        """Creates the connection pool and stores it in the instance.
+        Recreates the pool in forked processes and after it was closed.
 
         Returns:
-            psycopg2.connection: returns a psycopg2-connection-instance
+            psycopg2.pool.ThreadedConnectionPool: returns the connection pool
         """
-        if self.connection:
-            if self.connection.closed == 0:
-                # return early if we have an open connection
-                return self.connection
-
-        self.connection = psycopg2.connect(
-            dbname=self.name,
-            user=self.user,
-            password=self.password,
-            host=self.host,
-            port=self.port,
-            application_name=self.connection_name,
+        if self.pool is not None and not self.pool.closed:
+            if self.pid == os.getpid():
+                # return early if we have an open pool
+                return self.pool
+            # the connections belong to the parent process, closing them would close the parents sockets
+            self.pool = None
+
+        self.pool = psycopg2.pool.ThreadedConnectionPool(
+            self.pool_min_size,
+            self.pool_max_size,
+            **self.connection_parameters(),
         )
-        return self.connection
+        self.pid = os.getpid()
+        return self.pool
+
+    def connection_parameters(self):
+        """
+        Returns:
+            dict: keyword arguments for psycopg2.connect
+        """
+        return {
+            "dbname": self.name,
+            "user": self.user,
+            "password": self.password,
+            "host": self.host,
+            "port": self.port,
+            "application_name": self.connection_name,
+        }
+
+    def listen(self, *channels):
+        """Creates a listener for notifications on the passed channels.
+        The listener uses its own connection, because a pooled connection would stop receiving notifications when it is returned.
+
+        Args:
+            *channels (str): names of the notification channels, see the trigger_definitions of the tables
+
+        Returns:
+            Listener: listener which connects on first use
+        """
+        return Listener(self, channels)
+
+    def getconn(self):
+        """Borrows a healthy connection from the pool.
+        Closed or broken connections are discarded and replaced by a new connection.
+
+        Returns:
+            psycopg2.connection: returns a psycopg2-connection-instance
+        """
+        pool = self.connect()
+
+        for _ in range(self.pool_max_size + 1):
+            connection = pool.getconn()
+            if (
+                connection.closed == 0
+                and connection.info.transaction_status
+                != psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN
+            ):
+                return connection
+            pool.putconn(connection, close=True)
+
+        raise psycopg2.OperationalError("Unable to get a healthy connection")
+
+    def putconn(self, connection, discard=False):
+        """Returns a borrowed connection to the pool
+
+        Args:
+            connection (psycopg2.connection): borrowed connection
+            discard (bool, optional): closes the connection instead of reusing it. Defaults to False.
+        """
+        if self.pool is None or self.pool.closed or self.pid != os.getpid():
+            return
+        self.pool.putconn(connection, close=discard or connection.closed != 0)
 
     def close(self):
         """
-        Closes the database connection
+        Closes all database connections of the pool.
+        Open transactions are rolled back by the server.
         """
-        if self.connection:
-            if self.connection.closed == 0:
-                self.connection.close()
-                self.connection = None
+        if self.pool is not None and not self.pool.closed:
+            if self.pid == os.getpid():
+                self.pool.closeall()
+        self.pool = None
 
     def __del__(self):
         """
-        Cleans up after itself and closes the database connection by calling close()
+        Cleans up after itself and closes the database connections by calling close()
         """
         self.close()
 
+    def pinned_connection(self):
+        """Returns the connection pinned to the current thread by an open transaction
+
+        Returns:
+            psycopg2.connection: pinned connection, None if no transaction is open
+        """
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            return None
+        if getattr(self.local, "pool", None) is not self.pool or self.pool is None:
+            # the pool was closed or recreated after a fork
+            self.local.connection = None
+            return None
+        return connection
+
+    def begin(self):
+        """Opens a transaction for the current thread.
+        All cursors of this thread share one connection and nothing is committed until commit() is called.
+        Calling begin() while a transaction is open has no effect.
+        """
+        if self.pinned_connection() is not None:
+            return
+        self.local.connection = self.getconn()
+        self.local.pool = self.pool
+
+    def in_transaction(self):
+        """
+        Returns:
+            bool: True if the current thread has an open transaction
+        """
+        return self.pinned_connection() is not None
+
+    def end(self, commit=True):
+        """Ends the transaction of the current thread and returns its connection to the pool.
+
+        Args:
+            commit (bool, optional): commits the transaction if true, rolls it back otherwise. Defaults to True.
+        """
+        connection = self.pinned_connection()
+        if connection is None:
+            return
+        self.local.connection = None
+
+        discard = False
+        try:
+            if commit:
+                connection.commit()
+            else:
+                connection.rollback()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.putconn(connection, discard=discard)
+
+    def commit(self):
+        """Commits the transaction of the current thread"""
+        self.end(commit=True)
+
+    def rollback(self):
+        """Rolls back the transaction of the current thread"""
+        self.end(commit=False)
+
+    @contextmanager
+    def transaction(self):
+        """Context manager which groups all cursors of the current thread into one transaction.
+        The transaction is committed after exiting the context and rolled back if an exception is raised.
+        Nested transactions join the outer transaction, which is committed by the outermost context.
+
+        Yields:
+            DBInterface: the instance itself
+        """
+        if self.in_transaction():
+            yield self
+            return
+
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
     @contextmanager
     def cursor(self, *args, **kwargs):
         """Context manager which returns a namespace consisting out of a
         psycopg2 connection and cursor object.
         Both can be accessed via dot-notation
 
+        The connection is borrowed from the pool and returned after exiting the context, with its autocommit mode restored.
+        Connections which failed with a connection error are discarded, the next cursor reconnects.
+
         This contextmanager automatically commits the changes after exiting
-        the context.
+        the context. Inside of a transaction the connection of the transaction is used and nothing is committed.
 
         Yields:
             "cursor"-namespace : Namespace with the elements "con" and "cur"
         """
+        pinned = self.pinned_connection()
+        if pinned is not None:
+            cursor = pinned.cursor(*args, **kwargs)
+            try:
+                yield SimpleNamespace(con=pinned, cur=cursor)
+            finally:
+                cursor.close()
+            return
+
         # Code to acquire the db connection
-        self.connect()
-        cursor = self.connection.cursor(*args, **kwargs)
+        connection = self.getconn()
+        autocommit = connection.autocommit
+        cursor = connection.cursor(*args, **kwargs)
 
-        db = {"con": self.connection, "cur": cursor}
+        db = {"con": connection, "cur": cursor}
         db = SimpleNamespace(**db)
 
+        discard = False
         try:
             yield db
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
         finally:
+            try:
+                if not discard:
+                    connection.commit()
+                    cursor.close()
+                    if connection.autocommit != autocommit:
+                        connection.autocommit = autocommit
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                discard = True
+                raise
+            finally:
+                self.putconn(connection, discard=discard)
+
+
+class Listener:
+    """
+    Waits for Postgres notifications on a dedicated connection in autocommit mode.
 
-            self.connection.commit()
-            cursor.close()
+    wait() has the signature of mptools.Doorbell.wait, which allows ProcWorker.wait_for_work to wait on a listener.
+    Notifications sent while nobody waits are queued by the connection, a notification between polling the database and waiting is therefore never lost.
+    """
+
+    def __init__(self, db, channels):
+        self.db = db
+        self.channels = channels
+        self.connection = None
+        self.pid = None
+
+    def connect(self):
+        """Opens the connection and listens on all channels.
+        Reconnects after a fork or a closed connection.
+
+        Returns:
+            psycopg2.connection: listening connection
+        """
+        if (
+            self.connection is not None
+            and self.connection.closed == 0
+            and self.pid == os.getpid()
+        ):
+            return self.connection
+
+        self.connection = psycopg2.connect(**self.db.connection_parameters())
+        self.connection.autocommit = True
+        self.pid = os.getpid()
+        with self.connection.cursor() as cursor:
+            for channel in self.channels:
+                cursor.execute(sql.SQL("LISTEN {};").format(sql.Identifier(channel)))
+        return self.connection
+
+    def wait(self, timeout=None):
+        """Blocks until a notification arrives or the timeout is over.
+        A failing connection is closed and reopened by the next call, the call waits for the timeout to avoid a busy loop.
+
+        Args:
+            timeout (float, optional): seconds to wait. Defaults to waiting forever.
+
+        Returns:
+            bool: True if at least one notification was received
+        """
+        try:
+            connection = self.connect()
+            if not connection.notifies:
+                select.select([connection], [], [], timeout)
+                connection.poll()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self.close()
+            time.sleep(timeout or 0)
+            return False
+
+        notified = len(connection.notifies) > 0
+        connection.notifies.clear()
+        return notified
+
+    def close(self):
+        """Closes the listening connection"""
+        if self.connection is not None and self.pid == os.getpid():
+            self.connection.close()
+        self.connection = None
@@ -0,0 +1,224 @@
+import logging
+from datetime import datetime, timezone
+
+from .tables import Table
+
+logger = logging.getLogger(__name__)
+
+
+class Migration:
+    """
+    Versioned change of the database schema
+
+    Table definitions always describe the latest schema and are used for new installations.
+    Migrations bring databases which were created with an older table definition up to date, their statements should therefore be idempotent.
+
+    Attributes:
+        version (int): unique and increasing version number
+        name (str): short description of the migration
+        statements (list of str): SQL statements of the migration
+        concurrently (bool): executes every statement outside of a transaction, which is required by online steps like CREATE INDEX CONCURRENTLY.
+            A failed concurrent index build leaves an invalid index behind which has to be dropped before rerunning the migration.
+    """
+
+    def __init__(self, version, name, statements, concurrently=False):
+        self.version = version
+        self.name = name
+        self.statements = statements
+        self.concurrently = concurrently
+
+
+migrations = [
+    Migration(
+        1,
+        "document hash and size",
+        [""" ALTER TABLE public.documents
+                ADD COLUMN IF NOT EXISTS sha256 VARCHAR(64),
+                ADD COLUMN IF NOT EXISTS filesize bigint;"""],
+    ),
+    Migration(
+        2,
+        "url validators for conditional requests",
+        [""" ALTER TABLE public.urls
+                ADD COLUMN IF NOT EXISTS etag VARCHAR(2000),
+                ADD COLUMN IF NOT EXISTS last_modified VARCHAR(100);"""],
+    ),
+    Migration(
+        3,
+        "polling indexes",
+        [
+            """ CREATE INDEX CONCURRENTLY IF NOT EXISTS documents_unprocessed_index
+                ON public.documents USING btree
+                (id)
+                WHERE enqueued = false""",
+            """ CREATE INDEX CONCURRENTLY IF NOT EXISTS documents_unindexed_index
+                ON public.documents USING btree
+                (id)
+                WHERE indexed = false AND data IS NOT NULL""",
+            """ CREATE INDEX CONCURRENTLY IF NOT EXISTS documents_unindex_index
+                ON public.documents USING btree
+                (id)
+                WHERE unindex = true""",
+            """ CREATE INDEX CONCURRENTLY IF NOT EXISTS requests_url_id_index
+                ON public.requests USING btree
+                (url_id)""",
+            """ CREATE INDEX CONCURRENTLY IF NOT EXISTS requests_document_id_index
+                ON public.requests USING btree
+                (document_id, requested_at)
+                WHERE document_id IS NOT NULL""",
+        ],
+        concurrently=True,
+    ),
+    Migration(
+        4,
+        "work notifications",
+        [
+            """ CREATE OR REPLACE FUNCTION public.notify_channel()
+                RETURNS trigger AS $$
+                BEGIN
+                    PERFORM pg_notify(TG_ARGV[0], '');
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;""",
+            """ DROP TRIGGER IF EXISTS documents_unprocessed_notify ON public.documents;
+                CREATE TRIGGER documents_unprocessed_notify
+                AFTER INSERT OR UPDATE OF enqueued ON public.documents
+                FOR EACH ROW WHEN (NEW.enqueued = false)
+                EXECUTE PROCEDURE public.notify_channel('documents_unprocessed')""",
+            """ DROP TRIGGER IF EXISTS documents_unindexed_notify ON public.documents;
+                CREATE TRIGGER documents_unindexed_notify
+                AFTER UPDATE OF data, indexed ON public.documents
+                FOR EACH ROW WHEN (NEW.indexed = false AND NEW.data IS NOT NULL)
+                EXECUTE PROCEDURE public.notify_channel('documents_unindexed')""",
+            """ DROP TRIGGER IF EXISTS pending_combos_notify ON public.pending_combos;
+                CREATE TRIGGER pending_combos_notify
+                AFTER INSERT ON public.pending_combos
+                FOR EACH ROW
+                EXECUTE PROCEDURE public.notify_channel('pending_combos')""",
+        ],
+    ),
+]
+
+
+class SchemaMigrations(Table):
+    """
+    Records the schema migrations applied to the database
+
+    Attributes:
+        version (int): version of the migration
+        name (str): name of the migration
+        applied_at (datetime.datetime): timestamp when the migration was applied
+    """
+
+    schema = "public"
+    table_name = "schema_migrations"
+    table_definition = """CREATE TABLE IF NOT EXISTS {schema}.{table}(
+                            version integer,
+                            name VARCHAR(200),
+                            applied_at timestamp with time zone,
+                            CONSTRAINT schema_migrations_pkey PRIMARY KEY (version)
+                          );"""
+
+    def get_applied_versions(self):
+        """
+        Gets the versions of all applied migrations
+
+        Returns:
+            set of int: applied versions
+        """
+        query = """ SELECT version
+                    FROM schema_migrations;"""
+
+        with self.db.cursor() as db:
+            db.cur.execute(query)
+            return {row[0] for row in db.cur.fetchall()}
+
+    def mark_as_applied(self, version, name, applied_at=None):
+        """
+        Records a migration as applied
+
+        Args:
+            version (int): version of the migration
+            name (str): name of the migration
+            applied_at (datetime.datetime, optional): timestamp of the migration. Defaults to now.
+        """
+        query = """ INSERT INTO schema_migrations(version, name, applied_at)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (version) DO NOTHING;"""
+
+        if applied_at is None:
+            applied_at = datetime.now(timezone.utc)
+
+        with self.db.cursor() as db:
+            db.cur.execute(query, [version, name, applied_at])
+
+    def pending_migrations(self):
+        """
+        Gets all migrations which weren't applied yet
+
+        Returns:
+            list of Migration: pending migrations ordered by their version
+        """
+        applied = self.get_applied_versions()
+        return sorted(
+            [migration for migration in migrations if migration.version not in applied],
+            key=lambda migration: migration.version,
+        )
+
+    def baseline(self):
+        """
+        Marks all migrations as applied.
+        Used for new installations whose tables were created from the latest table definitions.
+        """
+        for migration in migrations:
+            self.mark_as_applied(migration.version, migration.name)
+
+    def apply(self, migration):
+        """
+        Applies a single migration and records it.
+        Regular migrations run in one transaction together with their record, concurrent migrations run every statement in autocommit mode.
+
+        Args:
+            migration (Migration): migration to apply
+        """
+        logger.info(
+            "Applying migration {}: {}".format(migration.version, migration.name)
+        )
+
+        if migration.concurrently:
+            with self.db.cursor() as db:
+                db.con.autocommit = True
+                try:
+                    for statement in migration.statements:
+                        db.cur.execute(statement)
+                finally:
+                    db.con.autocommit = False
+            self.mark_as_applied(migration.version, migration.name)
+            return
+
+        with self.db.cursor() as db:
+            for statement in migration.statements:
+                db.cur.execute(statement)
+            db.cur.execute(
+                """ INSERT INTO schema_migrations(version, name, applied_at)
+                    VALUES (%s, %s, %s);""",
+                [migration.version, migration.name, datetime.now(timezone.utc)],
+            )
+
+    def migrate(self, target=None):
+        """
+        Applies all pending migrations up to the target version
+
+        Args:
+            target (int, optional): highest version to apply. Defaults to all migrations.
+
+        Returns:
+            list of int: versions of the applied migrations
+        """
+        applied = []
+        for migration in self.pending_migrations():
+            if target is not None and migration.version > target:
+                break
+            self.apply(migration)
+            applied.append(migration.version)
+        return applied
@@ -0,0 +1,176 @@
+from psycopg2 import sql
+
+from europarl import rules
+
+from .tables import Table
+
+
+class PendingCombos(Table):
+    """
+    Work queue of rule and date combinations which still need an url
+
+    The table is maintained by triggers: confirming a session day (status 200 on a session_day url) adds a combination for every active rule, activating a rule adds a combination for every confirmed session day and storing an url removes its combination.
+    Deactivating a rule removes all of its pending combinations.
+
+    Attributes:
+        date_id (int): reference to the session day
+        dates (datetime.date): date of the session day, duplicated to order the queue by an index
+        rule_id (int): reference to the rule
+        created_at (datetime.datetime): timestamp when the combination was added
+    """
+
+    schema = "public"
+    table_name = "pending_combos"
+    table_definition = """CREATE TABLE IF NOT EXISTS {schema}.{table}(
+                            date_id integer NOT NULL,
+                            dates date NOT NULL,
+                            rule_id integer NOT NULL,
+                            created_at timestamp with time zone DEFAULT now(),
+                            CONSTRAINT pending_combos_pkey PRIMARY KEY (date_id, rule_id),
+                            CONSTRAINT fk_date FOREIGN KEY (date_id)
+                                REFERENCES {schema}.session_days (id)
+                                    ON DELETE CASCADE,
+                            CONSTRAINT fk_rule FOREIGN KEY (rule_id)
+                                REFERENCES {schema}.rules (id)
+                                    ON DELETE CASCADE
+                          );"""
+    index_definitions = [
+        """ CREATE INDEX IF NOT EXISTS pending_combos_dates_index
+            ON {schema}.{table} USING btree
+            (dates DESC, rule_id ASC)""",
+    ]
+    trigger_definitions = [
+        # wakes up the DateUrlGenerator for new combinations
+        """ DROP TRIGGER IF EXISTS pending_combos_notify ON {schema}.{table};
+            CREATE TRIGGER pending_combos_notify
+            AFTER INSERT ON {schema}.{table}
+            FOR EACH ROW
+            EXECUTE PROCEDURE {schema}.notify_channel('pending_combos')""",
+    ]
+
+    maintenance_trigger_definition = """
+        CREATE OR REPLACE FUNCTION {schema}.pending_combos_session_confirmed()
+        RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO {schema}.{table}(date_id, dates, rule_id)
+            SELECT session_days.id, session_days.dates, rules.id
+            FROM urls
+            INNER JOIN rules AS session_rule ON session_rule.id = urls.rule_id
+            INNER JOIN session_days ON session_days.id = urls.date_id
+            CROSS JOIN rules
+            WHERE urls.id = NEW.url_id
+            AND session_rule.rulename = {session_day}
+            AND rules.active = true
+            AND NOT EXISTS (
+                SELECT 1 FROM urls AS existing
+                WHERE existing.date_id = session_days.id
+                AND existing.rule_id = rules.id
+            )
+            ON CONFLICT DO NOTHING;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION {schema}.pending_combos_rule_changed()
+        RETURNS trigger AS $$
+        BEGIN
+            IF NEW.active THEN
+                INSERT INTO {schema}.{table}(date_id, dates, rule_id)
+                SELECT DISTINCT session_days.id, session_days.dates, NEW.id
+                FROM session_days
+                INNER JOIN urls ON urls.date_id = session_days.id
+                INNER JOIN requests ON requests.url_id = urls.id
+                INNER JOIN rules ON urls.rule_id = rules.id
+                WHERE rules.rulename = {session_day} AND requests.status_code = 200
+                AND NOT EXISTS (
+                    SELECT 1 FROM urls AS existing
+                    WHERE existing.date_id = session_days.id
+                    AND existing.rule_id = NEW.id
+                )
+                ON CONFLICT DO NOTHING;
+            ELSE
+                DELETE FROM {schema}.{table} WHERE rule_id = NEW.id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION {schema}.pending_combos_url_created()
+        RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM {schema}.{table}
+            WHERE date_id = NEW.date_id AND rule_id = NEW.rule_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS pending_combos_session_confirmed ON {schema}.requests;
+        CREATE TRIGGER pending_combos_session_confirmed
+            AFTER INSERT ON {schema}.requests
+            FOR EACH ROW WHEN (NEW.status_code = 200)
+            EXECUTE PROCEDURE {schema}.pending_combos_session_confirmed();
+
+        DROP TRIGGER IF EXISTS pending_combos_rule_changed ON {schema}.rules;
+        CREATE TRIGGER pending_combos_rule_changed
+            AFTER INSERT OR UPDATE OF active ON {schema}.rules
+            FOR EACH ROW
+            EXECUTE PROCEDURE {schema}.pending_combos_rule_changed();
+
+        DROP TRIGGER IF EXISTS pending_combos_url_created ON {schema}.urls;
+        CREATE TRIGGER pending_combos_url_created
+            AFTER INSERT ON {schema}.urls
+            FOR EACH ROW
+            EXECUTE PROCEDURE {schema}.pending_combos_url_created();
+    """
+
+    def create_table(self):
+        """
+        Creates the table, its index and the triggers maintaining it.
+        The table is filled with the combinations that are already pending, which makes it possible to add it to an existing database.
+        """
+        super().create_table()
+
+        with self.db.cursor() as db:
+            db.cur.execute(
+                sql.SQL(self.maintenance_trigger_definition).format(
+                    schema=sql.Identifier(self.schema),
+                    table=sql.Identifier(self.table_name),
+                    session_day=sql.Literal(rules.protocol.SessionDayRule.name),
+                )
+            )
+
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        Recomputes all pending combinations from the session days, rules, urls and requests.
+        Combinations which already exist are kept.
+
+        Returns:
+            int: amount of added combinations
+        """
+        query = """ INSERT INTO pending_combos(date_id, dates, rule_id)
+                    SELECT  session_days.id,
+                            session_days.dates,
+                            rules.id
+                    FROM session_days
+                    /*Cross join rules and session_days to get all possible combinations */
+                    CROSS JOIN rules
+                    LEFT JOIN urls
+                        ON urls.rule_id=rules.id
+                        AND urls.date_id=session_days.id
+                    /*From all rule & day-combinations only the active ones without derived URLs are from interest*/
+                    WHERE active = true AND urls.id IS NULL
+                    /*which had successfull crawling results*/
+                    AND session_days.dates IN (
+                        /*Get all dates with successfull session_day crawling results*/
+                        SELECT session_days.dates FROM session_days
+                        INNER JOIN urls ON urls.date_id = session_days.id
+                        INNER JOIN requests ON requests.url_id = urls.id
+                        INNER JOIN rules ON urls.rule_id=rules.id
+                        WHERE rules.rulename = %s AND requests.status_code = 200
+                    )
+                    ON CONFLICT DO NOTHING;"""
+        with self.db.cursor() as db:
+            db.cur.execute(query, [rules.protocol.SessionDayRule.name])
+            return db.cur.rowcount
@@ -2,6 +2,7 @@ from collections import Counter
 from datetime import datetime, timezone
 
 from psycopg2 import sql
+from psycopg2.extras import execute_values
 
 from .tables import Table
 
@@ -37,9 +38,18 @@ class Request(Table):
                                 REFERENCES public.documents (id)
                                     ON DELETE SET NULL
                           );"""
-    index_definition = """  CREATE INDEX requested_at_index
-                            ON public.requests USING btree
-                            (requested_at DESC NULLS LAST)"""
+    index_definitions = [
+        """ CREATE INDEX IF NOT EXISTS requested_at_index
+            ON {schema}.{table} USING btree
+            (requested_at DESC NULLS LAST)""",
+        """ CREATE INDEX IF NOT EXISTS requests_url_id_index
+            ON {schema}.{table} USING btree
+            (url_id)""",
+        """ CREATE INDEX IF NOT EXISTS requests_document_id_index
+            ON {schema}.{table} USING btree
+            (document_id, requested_at)
+            WHERE document_id IS NOT NULL""",
+    ]
 
     def get_request_log(self, id):
         """
@@ -100,9 +110,70 @@ class Request(Table):
             value = db.cur.fetchone()[0]
         return value
 
+    def mark_many_as_requested(self, rows, requested_at=None):
+        """
+        Logs multiple requests with a single statement
+
+        Args:
+            rows (list of tuples): tuples consisting out of the url id, status code, redirected-to url and the optional document id
+            requested_at (datetime.datetime, optional): Timestamp of the requests. Defaults to ```datetime.now(tz=timezone.utc)```.
+
+        Returns:
+            list of int: ids of the logged requests
+        """
+        if requested_at is None:
+            requested_at = datetime.now(tz=timezone.utc)
+
+        query = """ INSERT INTO requests(url_id, document_id, requested_at, status_code, redirected_url)
+                    VALUES %s
+                    RETURNING id
+                """
+
+        if len(rows) == 0:
+            return []
+
+        values = []
+        for row in rows:
+            url_id, status_code, redirected_url = row[0:3]
+            document_id = row[3] if len(row) > 3 else None
+            values.append(
+                (url_id, document_id, requested_at, status_code, redirected_url)
+            )
+
+        with self.db.cursor() as db:
+            result = execute_values(
+                db.cur, query, values, page_size=len(values), fetch=True
+            )
+
+        return [row[0] for row in result]
+
+    def copy_requests(self, rows):
+        """
+        Logs a large amount of requests by streaming them through COPY
+
+        Args:
+            rows (iterable of tuples): tuples consisting out of the url id, status code, redirected-to url, request timestamp and document id
+
+        Returns:
+            int: amount of logged requests
+        """
+        with self.db.cursor() as db:
+            return self.copy_rows(
+                db,
+                rows,
+                [
+                    "url_id",
+                    "status_code",
+                    "redirected_url",
+                    "requested_at",
+                    "document_id",
+                ],
+            )
+
     def get_status_code_summary(self, start_time, end_time):
         """
-        Returns a counter which counts the occurences of the individuall status codes
+        Returns a counter which counts the occurences of the individuall status codes.
+        The occurences are counted by the database, only one row per distinct status code is transferred.
 
         Args:
             start_time (datetime.datetime): start of the time interval to count status codes
@@ -111,9 +182,10 @@ class Request(Table):
         Returns:
             collections.Counter: Counter object with all the status code occurences summed up
         """
-        query = """ SELECT status_code
+        query = """ SELECT status_code, COUNT(*)
                     FROM   public.requests
-                    WHERE  requested_at >= %s AND requested_at <= %s;"""
+                    WHERE  requested_at >= %s AND requested_at <= %s
+                    GROUP BY status_code;"""
 
         with self.db.cursor() as db:
             db.cur.execute(
@@ -123,7 +195,4 @@ class Request(Table):
 
             rows = db.cur.fetchall()
 
-        counter = Counter()
-        counter.update([row[0] for row in rows])
-
-        return counter
+        return Counter(dict(rows))
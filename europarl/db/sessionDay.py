@@ -3,6 +3,7 @@ from datetime import timezone
 
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
 
 from .tables import Table
 
@@ -147,6 +148,39 @@ class SessionDay(Table):
             value = db.cur.fetchone()[0]
         return value
 
+    def insert_dates(self, dates):
+        """
+        Stores multiple dates with a single statement
+
+        Args:
+            dates (list of datetime.date): dates to store
+
+        Returns:
+            list of tuples: tuples consisting out of the id and the date
+        """
+        query = """ INSERT INTO session_days(dates)
+                    VALUES %s
+                    ON CONFLICT (dates)
+                    DO
+                        UPDATE SET dates=EXCLUDED.dates
+                    RETURNING id, dates;
+                """
+
+        # a row can't be updated twice by the same statement
+        dates = sorted(set(dates))
+        if len(dates) == 0:
+            return []
+
+        with self.db.cursor() as db:
+            values = execute_values(
+                db.cur,
+                query,
+                [(date,) for date in dates],
+                page_size=len(dates),
+                fetch=True,
+            )
+        return values
+
     def get_date(self, id):
         """
         Returns the date associated with an id
@@ -1,4 +1,5 @@
 import datetime
+import io
 from abc import ABC
 from contextlib import contextmanager
 from datetime import timezone
@@ -8,31 +9,82 @@ import psycopg2
 from psycopg2 import sql
 
 
+class CopyBuffer(io.RawIOBase):
+    """
+    Read-only file object which renders an iterable of rows as CSV on demand.
+    Used to stream rows through COPY ... FROM STDIN without building the whole input in memory.
+    """
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = b""
+        self.count = 0
+
+    @staticmethod
+    def format_value(value):
+        """
+        Formats a value as a CSV field. None becomes an unquoted empty field which COPY reads as NULL, all other values are quoted.
+        """
+        if value is None:
+            return ""
+        if hasattr(value, "isoformat"):
+            value = value.isoformat()
+        return '"' + str(value).replace('"', '""') + '"'
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                row = next(self.rows)
+            except StopIteration:
+                break
+            line = ",".join(self.format_value(value) for value in row) + "\n"
+            self.buffer += line.encode("utf-8")
+            self.count += 1
+
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+# trigger function which sends an empty notification on the channel passed as the first trigger argument
+NOTIFY_FUNCTION_DEFINITION = """
+    CREATE OR REPLACE FUNCTION {schema}.notify_channel()
+    RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify(TG_ARGV[0], '');
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;"""
+
+
 class Table(ABC):
     """
     Abstract baseclass implementing common table functions
 
+    Attributes:
+        table_definition (str): CREATE TABLE statement of the table
+        index_definitions (list of str): CREATE INDEX IF NOT EXISTS statements, partial indexes are declared with a WHERE clause
+        trigger_definitions (list of str): statements which (re)create the triggers of the table, the notify_channel() function is created beforehand
 
     """
 
     table_definition = None
-    index_definition = None
+    index_definitions = []
+    trigger_definitions = []
 
     def __init__(self, DBInterface):
-        """Creates a new instance of the table class
+        """Creates a new instance of the table class.
+        The table borrows connections from the pool of the DBInterface, deleting the table keeps the connections open.
 
         Args:
             DBInterface (DBInterface): DBInterface instance to execute the commands
         """
         self.db = DBInterface
 
-    def __del__(self):
-        """
-        Forces destructor call of DBInterface and therefore
-        closes database connection
-        """
-        self.db.close()
-
     def create_table(self):
         """Creates the table in the database by executing it's table definition
 
@@ -47,14 +99,68 @@ class Table(ABC):
                     table=sql.Identifier(self.table_name),
                 )
             )
-            if self.index_definition:
+
+        self.create_indexes()
+        self.create_triggers()
+
+    def create_indexes(self):
+        """Creates all declared indexes which don't exist yet.
+        Indexes added to an existing deployment are created by a migration, see europarl.db.migrations.
+        """
+
+        with self.db.cursor() as db:
+            for index_definition in self.index_definitions:
+                db.cur.execute(
+                    sql.SQL(index_definition).format(
+                        schema=sql.Identifier(self.schema),
+                        table=sql.Identifier(self.table_name),
+                    )
+                )
+
+    def create_triggers(self):
+        """Creates or replaces all declared triggers.
+        Triggers added to an existing deployment are created by a migration, see europarl.db.migrations.
+        """
+        if len(self.trigger_definitions) == 0:
+            return
+
+        with self.db.cursor() as db:
+            db.cur.execute(
+                sql.SQL(NOTIFY_FUNCTION_DEFINITION).format(
+                    schema=sql.Identifier(self.schema)
+                )
+            )
+            for trigger_definition in self.trigger_definitions:
                 db.cur.execute(
-                    sql.SQL(self.index_definition).format(
+                    sql.SQL(trigger_definition).format(
                         schema=sql.Identifier(self.schema),
                         table=sql.Identifier(self.table_name),
                     )
                 )
 
+    def copy_rows(self, db, rows, columns, table_name=None):
+        """Streams rows into a table with COPY FROM STDIN.
+        None values are stored as NULL.
+
+        Args:
+            db (SimpleNamespace): open cursor namespace as yielded by DBInterface.cursor
+            rows (iterable of tuples): rows in the order of the columns
+            columns (list of str): names of the target columns
+            table_name (str, optional): target table. Defaults to the table of the instance.
+
+        Returns:
+            int: amount of copied rows
+        """
+        buffer = CopyBuffer(rows)
+        db.cur.copy_expert(
+            sql.SQL("COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)").format(
+                table=sql.Identifier(table_name or self.table_name),
+                columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+            ),
+            buffer,
+        )
+        return buffer.count
+
     def table_exists(self):
         """Checks if the table exists in the database
 
@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
 
 from psycopg2 import sql
+from psycopg2.extras import execute_values
 
 from europarl import rules
 
@@ -23,6 +24,10 @@ class URLs(Table):
             the generated URL
         created_at : timestamp with timezone
             Timestamp when url was created
+        etag : TEXT
+            ETag header of the last successfull response, used for conditional requests
+        last_modified : TEXT
+            Last-Modified header of the last successfull response, used for conditional requests
 
 
     """
@@ -35,6 +40,8 @@ class URLs(Table):
                             rule_id integer,
                             url VARCHAR(2000) NOT NULL,
                             created_at time with time zone,
+                            etag VARCHAR(2000),
+                            last_modified VARCHAR(100),
                             CONSTRAINT urls_pkey PRIMARY KEY (id),
                             CONSTRAINT fk_date FOREIGN KEY (date_id)
                                 REFERENCES public.session_days (id)
@@ -45,12 +52,12 @@ class URLs(Table):
                             UNIQUE (rule_id, url)
 
                           );"""
-    index_definition = """  CREATE EXTENSION IF NOT EXISTS pgcrypto;
-
-                            CREATE INDEX fk_date_id
-                            ON public.urls USING btree
-                            (date_id ASC NULLS LAST)
-                            """
+    index_definitions = [
+        """ CREATE EXTENSION IF NOT EXISTS pgcrypto;""",
+        """ CREATE INDEX IF NOT EXISTS fk_date_id
+            ON {schema}.{table} USING btree
+            (date_id ASC NULLS LAST)""",
+    ]
 
     def save_url(self, date_id, rule_id, url, created_at=None):
         """
@@ -91,9 +98,92 @@ class URLs(Table):
 
         return result
 
+    def save_urls(self, rows, created_at=None):
+        """
+        Stores multiple urls with a single statement
+
+        Args:
+            rows (list of tuples): tuples consisting out of the date id, rule id and url
+            created_at (datetime with timezone, optional): time of url generation. Defaults to now.
+
+        Returns:
+            list of tuples: tuples consisting out of the url id, date id, rule id and url
+        """
+        if created_at is None:
+            created_at = datetime.now(tz=timezone.utc)
+
+        query = """ INSERT INTO urls(date_id, rule_id, url, created_at)
+                    VALUES %s
+                    ON CONFLICT (rule_id, url)
+                    DO
+                        UPDATE SET created_at=EXCLUDED.created_at
+                    RETURNING id, date_id, rule_id, url
+                """
+
+        # a row can't be updated twice by the same statement
+        rows = list({(row[1], row[2]): row for row in rows}.values())
+        if len(rows) == 0:
+            return []
+
+        with self.db.cursor() as db:
+            result = execute_values(
+                db.cur,
+                query,
+                [(date_id, rule_id, url, created_at) for date_id, rule_id, url in rows],
+                page_size=len(rows),
+                fetch=True,
+            )
+
+        return result
+
+    def copy_urls(self, rows, created_at=None):
+        """
+        Stores a large amount of urls by streaming them through COPY into a staging table and upserting them from there.
+        Duplicates within the rows are stored once.
+
+        Args:
+            rows (iterable of tuples): tuples consisting out of the date id, rule id and url
+            created_at (datetime with timezone, optional): time of url generation. Defaults to now.
+
+        Returns:
+            list of tuples: tuples consisting out of the url id, date id, rule id and url
+        """
+        if created_at is None:
+            created_at = datetime.now(tz=timezone.utc)
+
+        # the staging table of an earlier call in the same transaction is replaced
+        staging = """ DROP TABLE IF EXISTS pg_temp.urls_staging;
+                      CREATE TEMPORARY TABLE urls_staging(
+                        date_id integer,
+                        rule_id integer,
+                        url VARCHAR(2000)
+                      ) ON COMMIT DROP;"""
+
+        query = """ INSERT INTO urls(date_id, rule_id, url, created_at)
+                    SELECT DISTINCT ON (rule_id, url) date_id, rule_id, url, %s
+                    FROM urls_staging
+                    ORDER BY rule_id, url
+                    ON CONFLICT (rule_id, url)
+                    DO
+                        UPDATE SET created_at=EXCLUDED.created_at
+                    RETURNING id, date_id, rule_id, url
+                """
+
+        with self.db.cursor() as db:
+            db.cur.execute(staging)
+            self.copy_rows(
+                db, rows, ["date_id", "rule_id", "url"], table_name="urls_staging"
+            )
+            db.cur.execute(query, [created_at])
+            result = db.cur.fetchall()
+
+        return result
+
     def get_todo_rule_and_date_combos(self, limit):
         """
-        Returns a tuple of date and rule combinations that should exist but don't, based upon the active rules, session_dates and already created rules
+        Claims date and rule combinations that should exist but don't, based upon the active rules, session_dates and already created rules.
+        The combinations are removed from the pending_combos table in the same statement that reads them, concurrent callers therefore never claim the same combination.
+        Rows locked by other transactions are skipped. Callers should store the urls of the claimed combinations in the same transaction, a rollback returns the combinations.
 
         Args:
             limit (int): amount of dates that should be returned
@@ -102,33 +192,31 @@ class URLs(Table):
             (int, datetime.date, int, str): tuple consisting out of session_days id, session_days date, rule id and rule name
         """
 
-        query = """ SELECT  session_days.id,
-                            session_days.dates,
-                            rules.id,
-                            rules.rulename
-                    FROM session_days
-                    /*Cross join rules and session_days to get all possible combinations */
-                    CROSS JOIN rules
-                    LEFT JOIN urls
-                        ON urls.rule_id=rules.id
-                        AND urls.date_id=session_days.id
-                    /*From all rule & day-combinations only the active ones without derived URLs are from interest*/
-                    WHERE active = true AND urls.id IS NULL
-                    /*which had successfull crawling results*/
-                    AND session_days.dates IN (
-                        /*Get all dates with successfull session_day crawling results*/
-                        SELECT session_days.dates FROM session_days
-                        INNER JOIN urls ON urls.date_id = session_days.id
-                        INNER JOIN requests ON requests.url_id = urls.id
-                        INNER JOIN rules ON urls.rule_id=rules.id
-                        WHERE rules.rulename = %s AND requests.status_code = 200
+        query = """ WITH claimed AS (
+                        DELETE FROM pending_combos
+                        WHERE (date_id, rule_id) IN (
+                            SELECT  pending_combos.date_id,
+                                    pending_combos.rule_id
+                            FROM pending_combos
+                            INNER JOIN rules ON rules.id = pending_combos.rule_id
+                            WHERE rules.active = true
+                            ORDER BY pending_combos.dates DESC, pending_combos.rule_id ASC
+                            LIMIT %s
+                            FOR UPDATE OF pending_combos SKIP LOCKED
+                        )
+                        RETURNING date_id, dates, rule_id
                     )
-                    ORDER BY dates DESC
-                    LIMIT %s;"""
+                    SELECT  claimed.date_id,
+                            claimed.dates,
+                            claimed.rule_id,
+                            rules.rulename
+                    FROM claimed
+                    INNER JOIN rules ON rules.id = claimed.rule_id
+                    ORDER BY claimed.dates DESC, claimed.rule_id ASC;"""
         with self.db.cursor() as db:
             db.cur.execute(
                 query,
-                [rules.protocol.SessionDayRule.name, limit],
+                [limit],
             )
             result = db.cur.fetchall()
 
@@ -163,9 +251,9 @@ class URLs(Table):
             id (int): URL database id
 
         Returns:
-            dict: dictionary containing id, url and filetype
+            dict: dictionary containing id, url, filetype and the validators for conditional requests
         """
-        query = """ SELECT  urls.id, urls.url, rules.filetype
+        query = """ SELECT  urls.id, urls.url, rules.filetype, urls.etag, urls.last_modified
                     FROM    public.urls
                     JOIN    rules
                     ON rules.id = urls.rule_id
@@ -178,5 +266,32 @@ class URLs(Table):
             )
             value = db.cur.fetchone()
 
-            ret = {"id": value[0], "url": value[1], "filetype": value[2]}
+            ret = {
+                "id": value[0],
+                "url": value[1],
+                "filetype": value[2],
+                "etag": value[3],
+                "last_modified": value[4],
+            }
         return ret
+
+    def set_validators(self, id, etag, last_modified):
+        """
+        Stores the ETag and Last-Modified headers of a successfull response.
+        They are sent as If-None-Match and If-Modified-Since headers when the url is requested again.
+
+        Args:
+            id (int): URL database id
+            etag (str): ETag header value or None
+            last_modified (str): Last-Modified header value or None
+        """
+        query = """ UPDATE urls
+                    SET etag = %s, last_modified = %s
+                    WHERE id = %s
+                """
+
+        with self.db.cursor() as db:
+            db.cur.execute(
+                query,
+                [etag, last_modified, id],
+            )
@@ -1,4 +1,5 @@
 import datetime
+import json
 import logging
 import os
 import time
@@ -9,6 +10,7 @@ import bs4
 import requests
 
 from europarl import rules
+from europarl.filestore import stream_response_to_file
 
 logger = logging.getLogger("eurocli")
 
@@ -68,14 +70,72 @@ def spaced_out_dates(date):
     return dates
 
 
-def scrape_document(basedir, rule, date, session, retry=3, sleep=3):
+def conditional_headers(etag=None, last_modified=None):
+    """
+    Creates the headers for a conditional request from the validators of an earlier response.
+
+    Args:
+        etag (str, optional): ETag header of the earlier response. Defaults to None.
+        last_modified (str, optional): Last-Modified header of the earlier response. Defaults to None.
+
+    Returns:
+        dict: If-None-Match and If-Modified-Since headers, empty if no validators are known
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def load_validators(directory):
+    """
+    Loads the validators ledger which stores the ETag and Last-Modified headers per url.
+
+    Args:
+        directory (str): download directory
+
+    Returns:
+        dict: validators keyed by url
+    """
+    ledger = os.path.join(directory, "validators.json")
+    try:
+        with open(ledger, mode="r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_validators(directory, validators):
+    """
+    Stores the validators ledger in the download directory.
+
+    Args:
+        directory (str): download directory
+        validators (dict): validators keyed by url
+    """
+    ledger = os.path.join(directory, "validators.json")
+    with open(ledger, mode="w") as f:
+        json.dump(validators, f, indent=1, sort_keys=True)
+
+
+def scrape_document(basedir, rule, date, session, retry=3, sleep=3, validators=None):
     """
     Download and store a document
+
+    If a validators dictionary is passed and the document is already stored, a conditional request is made. An unchanged document (304) is not downloaded again.
+    The validators of a successfull response are stored in the dictionary.
     """
     logger.debug("{}: Scraping {}".format(date.strftime("%Y-%m-%d"), rule.name))
     url = rule.url(date)
     logger.debug("{}: Using {}".format(date.strftime("%Y-%m-%d"), url))
 
+    headers = {}
+    stored_path = rule.get_filepath(basedir, date).joinpath(rule.get_filename())
+    if validators is not None and url in validators and stored_path.exists():
+        headers = conditional_headers(**validators[url])
+
     for i in range(0, retry):
         try:
             logger.debug(
@@ -83,33 +143,60 @@ def scrape_document(basedir, rule, date, session, retry=3, sleep=3):
             )
             resp = session.get(
                 url,
+                headers=headers,
                 allow_redirects=True,
                 timeout=sleep,
+                stream=True,
             )
             resp.raise_for_status()
 
+            if resp.status_code == 304:
+                resp.close()
+                logger.info(
+                    "{}: Unchanged {}".format(date.strftime("%Y-%m-%d"), rule.name)
+                )
+                time.sleep(sleep)
+                return
+
             if resp.status_code == 200:
                 logger.debug("{}: Success".format(date.strftime("%Y-%m-%d")))
                 break
             else:
+                resp.close()
                 time.sleep(sleep)
         except requests.exceptions.ReadTimeout:
             time.sleep(sleep)
 
         except requests.exceptions.HTTPError:
+            resp.close()
             logger.error("File {} not found".format(url))
             time.sleep(sleep)
             return
 
-    if rule.format == ".html":
-        html = rewrite_links(html=resp.text, base_url=rules.BASE_URL)
-        logger.debug("{}: Links rewrote".format(date.strftime("%Y-%m-%d")))
-        filepath = rule.store_document(basedir, date, html)
-    else:
-        filepath = rule.store_document(basedir, date, resp.content)
+    with resp:
+        if rule.format == ".html":
+            html = rewrite_links(html=resp.text, base_url=rules.BASE_URL)
+            logger.debug("{}: Links rewrote".format(date.strftime("%Y-%m-%d")))
+            filepath = rule.store_document(basedir, date, html)
+        else:
+            # binary documents are streamed to disk instead of being buffered
+            filepath = stored_path
+            sha256, filesize = stream_response_to_file(resp, filepath)
+            logger.debug(
+                "{}: Stored {} bytes with sha256 {}".format(
+                    date.strftime("%Y-%m-%d"), filesize, sha256
+                )
+            )
 
     logger.debug("{}: File saved: {}".format(date.strftime("%Y-%m-%d"), filepath))
 
+    if validators is not None:
+        etag, last_modified = resp.headers.get("ETag"), resp.headers.get(
+            "Last-Modified"
+        )
+        if etag or last_modified:
+            validators[url] = {"etag": etag, "last_modified": last_modified}
+
     logger.debug("{}: Sleeping".format(date.strftime("%Y-%m-%d")))
     time.sleep(sleep)
 
@@ -139,6 +226,8 @@ def rewrite_links(html, base_url):
 
 
 def download_all_docs(basedir, rulenames, date, retry, sleep):
+    validators = load_validators(basedir)
+
     with requests.Session() as ses:
         rule = rules.rule_registry.all["session_day"]
         url = rule.url(date)
@@ -166,8 +255,11 @@ def download_all_docs(basedir, rulenames, date, retry, sleep):
                     session=ses,
                     retry=retry,
                     sleep=sleep,
+                    validators=validators,
                 )
 
+    save_validators(basedir, validators)
+
     return
 
 
@@ -17,9 +17,16 @@ import europarl.jobs.crawler as ep_crawler
 import europarl.jobs.indexer as ep_indexer
 import europarl.jobs.postprocessor as ep_postprocessor
 from europarl import configuration, rules
-from europarl.db import DBInterface, Documents, Rules, create_table_structure
+from europarl.db import (
+    DBInterface,
+    Documents,
+    Rules,
+    SchemaMigrations,
+    create_table_structure,
+)
 from europarl.downloader import download_all_docs, get_unviewed_date, spaced_out_dates
 from europarl.elasticinterface import create_index, get_current_index, index_documents
+from europarl.importer import import_directory
 
 logger = logging.getLogger("eurocli")
 click_log.basic_config("eurocli")
@@ -270,6 +277,97 @@ indexing.add_command(indexing_unindex)
 indexing.add_command(indexing_reindex)
 
 
+@click.group(name="db")
+@click.pass_context
+def database(ctx):
+    config = configuration.read()
+    ctx.obj["config"] = config
+    ctx.obj["db"] = DBInterface(config=config["General"])
+    pass
+
+
+cli.add_command(database)
+
+
+@click.command("migrate")
+@click.option("--target", type=int, help="Highest migration version to apply")
+@click.option(
+    "--list", "list_only", is_flag=True, help="Only list the pending migrations"
+)
+@click.pass_context
+def database_migrate(ctx, target, list_only):
+    """
+    Function for ``eurocli db migrate [...]``
+    Creates missing tables and applies all pending schema migrations
+
+    Args:
+        ctx (context): context object
+        target (int): highest migration version to apply
+        list_only (boolean): only lists the pending migrations if true
+    """
+    create_table_structure(ctx.obj["config"])
+
+    migrations = SchemaMigrations(ctx.obj["db"])
+    pending = migrations.pending_migrations()
+
+    table = BeautifulTable()
+    table.columns.header = ["version", "name", "concurrently"]
+    for migration in pending:
+        table.rows.append([migration.version, migration.name, migration.concurrently])
+    click.echo("Pending migrations:")
+    click.echo(table)
+
+    if list_only:
+        return
+
+    applied = migrations.migrate(target=target)
+    click.echo("Applied migrations: {}".format(applied))
+
+
+database.add_command(database_migrate)
+
+
+@click.command("import")
+@click_log.simple_verbosity_option(logger)
+@click.option(
+    "--rule",
+    "-r",
+    help="Rules to import. Use rulenames. Defaults to all session document rules",
+    multiple=True,
+)
+@click.option(
+    "--ledger/--no-ledger",
+    default=True,
+    help="Replay the backfilled_dates.txt ledger of the directory",
+)
+@click.argument("directory")
+@click.pass_context
+def database_import(ctx, rule, ledger, directory):
+    """
+    Function for ``eurocli db import [...] DIRECTORY``
+    Imports the urls and requests of a directory written by ``eurocli download sessions``
+
+    Args:
+        ctx (context): context object
+        rule (str): rulename('s) of the documents to import
+        ledger (boolean): replays the backfilled dates ledger if true
+        directory (str): download directory
+    """
+    create_table_structure(ctx.obj["config"])
+
+    result = import_directory(
+        ctx.obj["db"], directory, rulenames=list(rule), ledger=ledger
+    )
+    click.echo(
+        "Imported {} dates, {} urls and {} requests".format(
+            result["dates"], result["urls"], result["requests"]
+        )
+    )
+
+
+database.add_command(database_import)
+
+
 @click.group()
 def download():
     pass
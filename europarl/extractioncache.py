@@ -0,0 +1,156 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+
+from europarl.filestore import CHUNK_SIZE, content_path, stream_to_file
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(filepath):
+    """
+    Calculates the SHA-256 fingerprint of a file without reading it into memory at once
+
+    Args:
+        filepath (str): path to the file
+
+    Returns:
+        str: hex encoded SHA-256 digest
+    """
+    sha256 = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class ExtractionCache:
+    """
+    On-disk cache of extracted document data.
+
+    An entry is keyed by the SHA-256 hash of the document content and the versioned id of the extractor which produced it,
+    a new extractor version therefore never reads data of an older one. Entries are stored as gzipped JSON in the sharded
+    layout of the content-addressed store and can be shared by multiple workers.
+
+    The least recently used entries are evicted once the cache grows beyond its maximal size.
+    Every hit touches the modification time of its entry, which is used as the access time.
+
+    Attributes:
+        directory (str): root directory of the cache
+        max_size (int): maximal size of the cache in bytes
+        size (int): estimated size of the cache in bytes, entries written by other processes are only counted after an eviction
+    """
+
+    SUFFIX = ".json.gz"
+    # eviction removes entries until the cache is below this fraction of its maximal size
+    EVICTION_RATIO = 0.9
+
+    def __init__(self, directory, max_size):
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+        self.size = sum(size for _, _, size in self.entries())
+
+    def path(self, sha256, extractor_id):
+        """
+        Returns the path of a cache entry
+
+        Args:
+            sha256 (str): hex encoded SHA-256 digest of the document content
+            extractor_id (str): versioned id of the extractor
+
+        Returns:
+            str: absolute path of the entry
+        """
+        key = hashlib.sha256(
+            "{}:{}".format(sha256, extractor_id).encode("utf-8")
+        ).hexdigest()
+        return content_path(self.directory, key, self.SUFFIX)
+
+    def get(self, sha256, extractor_id):
+        """
+        Looks up the extracted data of a document
+
+        Args:
+            sha256 (str): hex encoded SHA-256 digest of the document content
+            extractor_id (str): versioned id of the extractor
+
+        Returns:
+            dict: extracted data, None if the document isn't cached
+        """
+        path = self.path(sha256, extractor_id)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            # a corrupt entry is treated like a miss and replaced by the next put
+            logger.warning("Dropping unreadable cache entry {}: {}".format(path, e))
+            return None
+        return data
+
+    def put(self, sha256, extractor_id, data):
+        """
+        Stores the extracted data of a document and evicts old entries if the cache is full
+
+        Args:
+            sha256 (str): hex encoded SHA-256 digest of the document content
+            extractor_id (str): versioned id of the extractor
+            data (dict): JSON serializable extracted data
+        """
+        content = gzip.compress(json.dumps(data).encode("utf-8"))
+        stream_to_file([content], self.path(sha256, extractor_id))
+        self.size += len(content)
+
+        if self.size > self.max_size:
+            self.evict()
+
+    def entries(self):
+        """
+        Lists all entries of the cache
+
+        Returns:
+            list of tuple: path, modification time and size of every entry
+        """
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(self.SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    # evicted by another worker
+                    continue
+                entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache is below EVICTION_RATIO of its maximal size
+
+        Returns:
+            int: amount of removed entries
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[1])
+        self.size = sum(size for _, _, size in entries)
+
+        removed = 0
+        target = self.max_size * self.EVICTION_RATIO
+        for path, _, size in entries:
+            if self.size <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
+            removed += 1
+
+        logger.info("Evicted {} extraction cache entries".format(removed))
+        return removed
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import tempfile
+import uuid
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _write_chunks(fd, chunks):
+    """
+    Writes chunks to an open file descriptor and closes it.
+
+    Args:
+        fd (int): file descriptor opened for writing
+        chunks (iterable of bytes): content to write
+
+    Returns:
+        tuple: hex encoded SHA-256 digest and the amount of bytes written
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+
+    with os.fdopen(fd, "wb") as f:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            f.write(chunk)
+            sha256.update(chunk)
+            size += len(chunk)
+
+    return sha256.hexdigest(), size
+
+
+def stream_to_file(chunks, filepath):
+    """
+    Writes an iterable of byte chunks to a file without holding the whole content in memory.
+
+    The chunks are written to a temporary file in the target directory, which is atomically renamed to the final path once all chunks are written.
+    A partially downloaded file is therefore never visible under the final path.
+    The SHA-256 fingerprint and the size of the content are calculated while streaming.
+
+    Args:
+        chunks (iterable of bytes): content of the file, e.g. ``requests.Response.iter_content()``
+        filepath (str): path of the file to create
+
+    Returns:
+        tuple: hex encoded SHA-256 digest and the amount of bytes written
+    """
+    directory = os.path.dirname(os.path.abspath(filepath))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, temppath = tempfile.mkstemp(dir=directory, prefix=".", suffix=".part")
+    try:
+        sha256, size = _write_chunks(fd, chunks)
+        os.replace(temppath, filepath)
+    except BaseException:
+        os.unlink(temppath)
+        raise
+
+    return sha256, size
+
+
+def stream_response_to_file(resp, filepath, chunk_size=CHUNK_SIZE):
+    """
+    Streams the body of a response, which was requested with ``stream=True``, to a file.
+
+    Args:
+        resp (requests.Response): streamed response
+        filepath (str): path of the file to create
+        chunk_size (int, optional): size of the chunks read from the response. Defaults to 64 KiB.
+
+    Returns:
+        tuple: hex encoded SHA-256 digest and the amount of bytes written
+    """
+    return stream_to_file(resp.iter_content(chunk_size=chunk_size), filepath)
+
+
+def content_path(basedir, sha256, suffix=""):
+    """
+    Returns the path of a file in the content-addressed layout.
+    Files are sharded over two directory levels named after the first four characters of the hash, e.g. ``basedir/ab/cd/abcd...ef.pdf``.
+    This keeps the amount of entries per directory small.
+
+    Args:
+        basedir (str): root directory of the content-addressed store
+        sha256 (str): hex encoded SHA-256 digest of the content
+        suffix (str, optional): file ending. Defaults to "".
+
+    Returns:
+        str: absolute path of the file
+    """
+    return os.path.join(
+        os.path.abspath(basedir), sha256[0:2], sha256[2:4], sha256 + suffix
+    )
+
+
+def content_uuid(sha256):
+    """
+    Derives a stable uuid from a SHA-256 digest.
+    Identical content therefore always results in the same uuid.
+
+    Args:
+        sha256 (str): hex encoded SHA-256 digest
+
+    Returns:
+        str: uuid built from the first 128 bits of the digest
+    """
+    return str(uuid.UUID(hex=sha256[:32]))
+
+
+def store_content_addressed(chunks, basedir, suffix=""):
+    """
+    Streams chunks into the content-addressed store.
+
+    The content is written to a temporary file in the base directory, because its hash is only known after all chunks are written.
+    It is then moved to its content-addressed path. If the path already exists, the same content was stored before and the temporary file is dropped.
+
+    Args:
+        chunks (iterable of bytes): content of the file
+        basedir (str): root directory of the content-addressed store
+        suffix (str, optional): file ending. Defaults to "".
+
+    Returns:
+        tuple: path of the stored file, hex encoded SHA-256 digest and the amount of bytes
+    """
+    basedir = os.path.abspath(basedir)
+    os.makedirs(basedir, exist_ok=True)
+
+    fd, temppath = tempfile.mkstemp(dir=basedir, prefix=".", suffix=".part")
+    try:
+        sha256, size = _write_chunks(fd, chunks)
+
+        filepath = content_path(basedir, sha256, suffix)
+        if os.path.exists(filepath):
+            os.unlink(temppath)
+        else:
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            os.replace(temppath, filepath)
+    except BaseException:
+        if os.path.exists(temppath):
+            os.unlink(temppath)
+        raise
+
+    return filepath, sha256, size
@@ -0,0 +1,147 @@
+import datetime
+import logging
+import os
+from pathlib import Path
+
+from europarl import rules
+from europarl.db import Request, Rules, SessionDay, URLs
+
+logger = logging.getLogger("eurocli")
+
+
+def scan_directory(directory, rulenames=None):
+    """
+    Finds the documents stored by ``eurocli download sessions`` in a download directory.
+
+    Args:
+        directory (str): download directory
+        rulenames (list of str, optional): rules to look for. Defaults to all registered session document rules.
+
+    Returns:
+        dict: stored documents keyed by date, every entry maps a rulename to the path of the file
+    """
+    if not rulenames:
+        rulenames = [
+            name
+            for name, rule in rules.rule_registry.all.items()
+            if rule.document_type == rule.SESSION_DOC
+        ]
+
+    documents = {}
+    for entry in sorted(Path(directory).iterdir()):
+        if not entry.is_dir():
+            continue
+        try:
+            date = datetime.datetime.strptime(entry.name, "%Y-%m-%d").date()
+        except ValueError:
+            continue
+
+        for rulename in rulenames:
+            rule = rules.rule_registry.all[rulename]
+            filepath = rule.get_filepath(directory, date).joinpath(rule.get_filename())
+            if filepath.exists():
+                documents.setdefault(date, {})[rulename] = filepath
+
+    return documents
+
+
+def read_ledger(directory):
+    """
+    Reads the backfilled_dates.txt ledger of a download directory
+
+    Args:
+        directory (str): download directory
+
+    Returns:
+        set of datetime.date: dates which were crawled, empty if no ledger exists
+    """
+    ledger = os.path.join(directory, "backfilled_dates.txt")
+    try:
+        with open(ledger, mode="r") as f:
+            lines = [line.strip() for line in f if line.strip()]
+    except FileNotFoundError:
+        return set()
+
+    return {datetime.datetime.strptime(line, "%Y-%m-%d").date() for line in lines}
+
+
+def import_directory(db, directory, rulenames=None, ledger=True):
+    """
+    Imports the crawling history of a download directory into the database.
+
+    Every stored document is logged as a successful request of its rule url. The session day url of every date with documents is logged as a successful request.
+    Dates from the ledger without any stored document are logged as days without a session (404), which keeps the SessionDayChecker from checking them again.
+    Urls and requests are streamed through COPY and everything is written in one transaction.
+
+    Args:
+        db (DBInterface): database to import into
+        directory (str): download directory
+        rulenames (list of str, optional): rules to import. Defaults to all registered session document rules.
+        ledger (bool, optional): replays the backfilled_dates.txt ledger. Defaults to True.
+
+    Returns:
+        dict: amount of imported dates, urls and requests
+    """
+    documents = scan_directory(directory, rulenames)
+    dates = set(documents)
+    if ledger:
+        dates |= read_ledger(directory)
+
+    session_rule = rules.rule_registry.all[rules.protocol.SessionDayRule.name]
+
+    with db.transaction():
+        r = Rules(db)
+        r.register_rules(rules.rule_registry.keys)
+        rule_ids = {name: id for id, name, *_ in r.get_rules()[0]}
+
+        date_ids = dict(
+            (date, date_id) for date_id, date in SessionDay(db).insert_dates(dates)
+        )
+
+        # requests of one url, keyed by rule id and url
+        requests = {}
+        for date in sorted(dates):
+            stored = documents.get(date, {})
+
+            url = session_rule.url(date)
+            status_code = 200 if stored else 404
+            requests[(rule_ids[session_rule.name], url)] = (
+                date_ids[date],
+                status_code,
+                None,
+            )
+
+            for rulename, filepath in stored.items():
+                url = rules.rule_registry.all[rulename].url(date)
+                requested_at = datetime.datetime.fromtimestamp(
+                    filepath.stat().st_mtime, tz=datetime.timezone.utc
+                )
+                requests[(rule_ids[rulename], url)] = (
+                    date_ids[date],
+                    200,
+                    requested_at,
+                )
+
+        urls = URLs(db).copy_urls(
+            (date_id, rule_id, url)
+            for (rule_id, url), (date_id, _, _) in requests.items()
+        )
+
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        request_count = Request(db).copy_requests(
+            (
+                url_id,
+                requests[(rule_id, url)][1],
+                url,
+                requests[(rule_id, url)][2] or now,
+                None,
+            )
+            for url_id, date_id, rule_id, url in urls
+        )
+
+    logger.info(
+        "Imported {} dates, {} urls and {} requests".format(
+            len(dates), len(urls), request_count
+        )
+    )
+    return {"dates": len(dates), "urls": len(urls), "requests": request_count}
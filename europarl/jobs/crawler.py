@@ -30,11 +30,13 @@ from europarl.mptools import (
     ProcWorker,
     QueueProcWorker,
     TimerProcWorker,
+    TokenBucket,
     default_signal_handler,
     init_signals,
 )
 from europarl.rules import rule
 from europarl.workers import (
+    AsyncDocumentDownloader,
     DateUrlGenerator,
     DocumentDownloader,
     PostProcessingScheduler,
@@ -61,33 +63,64 @@ def main():
             main_ctx.shutdown_event, default_signal_handler, default_signal_handler
         )
 
-        token_bucket_q = main_ctx.MPQueue(100)
+        if config["TokenBucketWorker"].get("Backend", "queue") == "shared":
+            # the bucket refills itself in shared memory, no token strings are pickled and piped
+            token_bucket_q = TokenBucket(
+                rate=1 / float(config["TokenBucketWorker"]["MinIntervalSecs"]),
+                capacity=int(config["TokenBucketWorker"].get("Burst", 100)),
+            )
+        else:
+            token_bucket_q = main_ctx.MPQueue(
+                int(config["TokenBucketWorker"].get("Burst", 100))
+            )
         url_q = main_ctx.MPQueue(10)
 
+        # the crawlers report their status codes to the TokenBucketWorker
+        # instead of it querying the requests table for every throttling check
+        status_q = None
+        if (
+            config["TokenBucketWorker"].get("StatusSource", "database") == "queue"
+            or config["TokenBucketWorker"].get("Throttling", "interval") == "aimd"
+        ):
+            status_q = main_ctx.MPQueue(1000)
+
+        # rung by the SessionDayChecker for confirmed session days, which create new rule and date combinations
+        session_bell = main_ctx.Doorbell()
+
         main_ctx.Proc(
             token_bucket_q,
+            status_q,
+            session_bell,
             name="SessionDayChecker",
             worker_class=SessionDayChecker,
             config=config["SessionDayChecker"],
         )
 
-        for instance_id in range(int(config["Downloader"].get("Instances", 1))):
-            main_ctx.Proc(
-                token_bucket_q,
-                url_q,
-                name="Downloader_{}".format(instance_id),
-                worker_class=DocumentDownloader,
-                config=config["Downloader"],
-            )
+        if config["Downloader"].get("Mode", "sync") == "async":
+            downloader_class = AsyncDocumentDownloader
+        else:
+            downloader_class = DocumentDownloader
+
+        main_ctx.Pool(
+            token_bucket_q,
+            url_q,
+            status_q,
+            name="Downloader",
+            worker_class=downloader_class,
+            config=config["Downloader"],
+            work_q=url_q,
+        )
 
         main_ctx.Proc(
             url_q,
+            session_bell,
             name="DateUrlGenerator",
             worker_class=DateUrlGenerator,
             config=config["DateUrlGenerator"],
         )
         main_ctx.Proc(
             token_bucket_q,
+            status_q,
             name="TokenGenerator",
             worker_class=TokenBucketWorker,
             config=config["TokenBucketWorker"],
@@ -95,8 +128,8 @@ def main():
 
         while not main_ctx.shutdown_event.is_set():
             event = main_ctx.event_queue.safe_get()
-            if not event:
-                continue
+            main_ctx.supervise(event)
+            main_ctx.autoscale()
 
 
 class Context(MainContext):
@@ -63,8 +63,7 @@ def main():
 
         while not main_ctx.shutdown_event.is_set():
             event = main_ctx.event_queue.safe_get()
-            if not event:
-                continue
+            main_ctx.supervise(event)
 
 
 if __name__ == "__main__":
@@ -54,15 +54,16 @@ def main():
 
         document_q = main_ctx.MPQueue(30)
 
-        for instance_id in range(
-            int(config["PostProcessingWorker"].get("Instances", 1))
-        ):
-            main_ctx.Proc(
-                document_q,
-                name="PostProcessingWorker_{}".format(instance_id),
-                worker_class=PostProcessingWorker,
-                config=config["PostProcessingWorker"],
-            )
+        # documents waiting in the database let the autoscaler grow the pool before the queue fills up
+        backlog_db = DBInterface(config=main_ctx.config["DEFAULT"])
+        main_ctx.Pool(
+            document_q,
+            name="PostProcessingWorker",
+            worker_class=PostProcessingWorker,
+            config=config["PostProcessingWorker"],
+            work_q=document_q,
+            backlog=Documents(backlog_db).count_unprocessed_documents,
+        )
 
         main_ctx.Proc(
             document_q,
@@ -73,8 +74,8 @@ def main():
 
         while not main_ctx.shutdown_event.is_set():
             event = main_ctx.event_queue.safe_get()
-            if not event:
-                continue
+            main_ctx.supervise(event)
+            main_ctx.autoscale()
 
 
 class Context(MainContext):
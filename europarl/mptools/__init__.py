@@ -1,4 +1,6 @@
 from ._mptools import (
+    Claim,
+    Doorbell,
     EventMessage,
     MainContext,
     MPQueue,
@@ -8,6 +10,8 @@ from ._mptools import (
     SignalObject,
     TerminateInterrupt,
     TimerProcWorker,
+    TokenBucket,
+    WorkerPool,
     _sleep_secs,
     default_signal_handler,
     init_signal,
@@ -19,6 +23,9 @@ from ._mptools import (
 __all__ = [
     "setup_logging",
     "MPQueue",
+    "Doorbell",
+    "Claim",
+    "TokenBucket",
     "_sleep_secs",
     "SignalObject",
     "init_signal",
@@ -29,6 +36,7 @@ __all__ = [
     "TimerProcWorker",
     "QueueProcWorker",
     "Proc",
+    "WorkerPool",
     "EventMessage",
     "MainContext",
     "TerminateInterrupt",
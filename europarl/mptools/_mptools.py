@@ -6,6 +6,8 @@ import functools
 import logging
 import multiprocessing as mp
 import multiprocessing.queues as mpq
+import os
+import pickle
 import signal
 import sys
 import time
@@ -16,10 +18,6 @@ DEFAULT_POLLING_TIMEOUT = 0.02
 MAX_SLEEP_SECS = 0.02
 
 
-# TODO: Mitigate hard crashing processes by restarting them
-# TODO:
-
-
 # -- Queue handling support
 class MPQueue(mpq.Queue):
 
@@ -28,9 +26,18 @@ class MPQueue(mpq.Queue):
     #
     # -- tldr; mp.Queue is a _method_ that returns an mpq.Queue object.  That object
     # requires a context for proper operation, so this __init__ does that work as well.
-    def __init__(self, *args, **kwargs):
+    def __init__(self, maxsize=0):
         ctx = mp.get_context()
-        super().__init__(*args, **kwargs, ctx=ctx)
+        super().__init__(maxsize, ctx=ctx)
+        # -- capacity of the queue, 0 for an unbounded queue
+        self.maxsize = max(0, maxsize)
+
+    def __getstate__(self):
+        return super().__getstate__(), self.maxsize
+
+    def __setstate__(self, state):
+        state, self.maxsize = state
+        super().__setstate__(state)
 
     def safe_get(self, timeout=DEFAULT_POLLING_TIMEOUT):
         try:
@@ -61,6 +68,215 @@ class MPQueue(mpq.Queue):
         return num_left
 
 
+# -- Shared memory token bucket
+class TokenBucket:
+    """
+    Token bucket in shared memory which can be passed to any ProcWorker like a queue.
+
+    Tokens are refilled lazily from the elapsed time whenever the bucket is accessed, so no process has to produce them.
+    The rate may be fractional and can be changed at runtime, the capacity limits the burst size.
+    safe_get, safe_put and put mirror MPQueue, which makes the bucket a drop-in replacement for a queue of token strings.
+    """
+
+    TOKEN = "TOKEN"
+    MAX_WAIT_SECS = 0.1
+
+    def __init__(self, rate, capacity=1, tokens=0):
+        ctx = mp.get_context()
+        self._lock = ctx.Lock()
+        self._capacity = float(capacity)
+        self._rate = ctx.Value("d", float(rate), lock=False)
+        self._tokens = ctx.Value("d", min(float(tokens), self._capacity), lock=False)
+        self._last_refill = ctx.Value("d", time.monotonic(), lock=False)
+        self._closed = ctx.Value("b", False, lock=False)
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def rate(self):
+        return self._rate.value
+
+    @rate.setter
+    def rate(self, rate):
+        with self._lock:
+            # tokens of the elapsed time are granted at the old rate
+            self._refill()
+            self._rate.value = float(rate)
+
+    @property
+    def tokens(self):
+        return self.refill()
+
+    @property
+    def closed(self):
+        return bool(self._closed.value)
+
+    def _refill(self):
+        # -- must be called with the lock held
+        now = time.monotonic()
+        elapsed = now - self._last_refill.value
+        self._last_refill.value = now
+        if elapsed > 0:
+            self._tokens.value = min(
+                self._capacity, self._tokens.value + elapsed * self._rate.value
+            )
+
+    def refill(self):
+        with self._lock:
+            self._refill()
+            return self._tokens.value
+
+    def try_acquire(self, amount=1):
+        with self._lock:
+            self._refill()
+            if self._tokens.value >= amount:
+                self._tokens.value -= amount
+                return True
+            return False
+
+    def acquire(self, amount=1, timeout=None):
+        if amount > self._capacity:
+            raise ValueError(
+                f"Cannot acquire {amount} tokens from a bucket with capacity {self._capacity}"
+            )
+
+        end_time = 999999999999999.9 if timeout is None else time.time() + timeout
+        while not self._closed.value:
+            with self._lock:
+                self._refill()
+                missing = amount - self._tokens.value
+                if missing <= 0:
+                    self._tokens.value -= amount
+                    return True
+                rate = self._rate.value
+
+            # -- sleep until enough tokens are refilled, but wake up to notice rate changes
+            wait = missing / rate if rate > 0 else MAX_SLEEP_SECS
+            sleep_secs = _sleep_secs(min(wait, TokenBucket.MAX_WAIT_SECS), end_time)
+            if sleep_secs <= 0:
+                return False
+            time.sleep(sleep_secs)
+        return False
+
+    def release(self, amount=1):
+        with self._lock:
+            self._refill()
+            free = self._capacity - self._tokens.value
+            self._tokens.value = min(self._capacity, self._tokens.value + amount)
+            return amount <= free
+
+    def clear(self):
+        with self._lock:
+            self._refill()
+            num_left = int(self._tokens.value)
+            self._tokens.value = 0.0
+            return num_left
+
+    def close(self):
+        self._closed.value = True
+
+    def safe_get(self, timeout=DEFAULT_POLLING_TIMEOUT):
+        if self._closed.value:
+            return "END"
+        if timeout is None:
+            acquired = self.try_acquire()
+        else:
+            acquired = self.acquire(timeout=timeout)
+        return self.TOKEN if acquired else None
+
+    def safe_put(self, item, timeout=DEFAULT_POLLING_TIMEOUT):
+        if item == "END":
+            self.close()
+            return True
+        return self.release()
+
+    def put(self, item, block=True, timeout=None):
+        if not self.safe_put(item, timeout=timeout):
+            raise Full
+
+
+# -- Cross process notification
+class Doorbell:
+    """
+    Wakes up workers which wait for new work instead of polling for it.
+
+    Every ring increments a shared counter, wait returns as soon as the counter differs from the value the waiting process saw last.
+    A ring between checking for work and waiting is therefore never lost.
+    """
+
+    def __init__(self):
+        ctx = mp.get_context()
+        self._condition = ctx.Condition()
+        self._rings = ctx.Value("Q", 0, lock=False)
+        self._seen = 0
+
+    def ring(self):
+        with self._condition:
+            self._rings.value += 1
+            self._condition.notify_all()
+
+    def wait(self, timeout=None):
+        with self._condition:
+            rung = self._condition.wait_for(
+                lambda: self._rings.value != self._seen, timeout
+            )
+            self._seen = self._rings.value
+            return rung
+
+
+# -- Items of a pooled worker
+class Claim:
+    # -- Items a pooled worker took from the work queue of its pool and didn't finish yet.
+    # They are kept in shared memory, because a crashed worker can't hand them back itself.
+    # MainContext puts them back on the work queue once the worker stopped or crashed.
+    MAX_BYTES = 4096
+
+    def __init__(self, work_q):
+        ctx = mp.get_context()
+        self.work_q = work_q
+        self._lock = ctx.Lock()
+        self._data = ctx.Array("c", self.MAX_BYTES, lock=False)
+        self._size = ctx.Value("i", 0, lock=False)
+
+    def _load(self):
+        if self._size.value == 0:
+            return []
+        return pickle.loads(self._data.raw[: self._size.value])
+
+    def _store(self, items):
+        data = pickle.dumps(items) if items else b""
+        if len(data) > self.MAX_BYTES:
+            raise ValueError(
+                f"Claimed items exceed the {self.MAX_BYTES} bytes of the claim"
+            )
+        self._data[: len(data)] = data
+        self._size.value = len(data)
+
+    def add(self, item):
+        with self._lock:
+            self._store(self._load() + [item])
+
+    def remove(self, item):
+        with self._lock:
+            items = self._load()
+            if item in items:
+                items.remove(item)
+                self._store(items)
+
+    def items(self):
+        with self._lock:
+            return self._load()
+
+    def take(self):
+        # -- returns all claimed items and forgets them
+        with self._lock:
+            items = self._load()
+            self._store([])
+            return items
+
+
 # -- useful function
 def _sleep_secs(max_sleep, end_time=999999999999999.9):
     # Calculate time left to sleep, no less than 0
@@ -139,7 +355,15 @@ class ProcWorker:
     term_handler = staticmethod(default_signal_handler)
 
     def __init__(
-        self, name, startup_event, shutdown_event, event_q, logger_q, config, *args
+        self,
+        name,
+        startup_event,
+        shutdown_event,
+        event_q,
+        logger_q,
+        config,
+        *args,
+        claim=None,
     ):
 
         self.name = name
@@ -148,9 +372,14 @@ class ProcWorker:
         self.event_q = event_q
         self.logger_q = logger_q
         self.config = config
+        self.claim = claim
         self.terminate_called = 0
 
         self.DEFAULT_POLLING_TIMEOUT = float(config["DefaultPollingTimeout"])
+        self.MAX_IDLE_WAIT_SECS = float(
+            config.get("MaxIdleWaitSecs", self.DEFAULT_POLLING_TIMEOUT)
+        )
+        self.idle_wait_secs = self.DEFAULT_POLLING_TIMEOUT
 
         self.logger = setup_logging(
             name=self.name, logger_q=self.logger_q, config=self.config
@@ -174,6 +403,33 @@ class ProcWorker:
         while not self.shutdown_event.is_set():
             self.main_func()
 
+    def wait_for_work(self, doorbell=None):
+        # -- Blocks until the doorbell rings, shutdown is requested or the idle wait is over.
+        # Every idle wait without a ring doubles the next one up to MAX_IDLE_WAIT_SECS.
+        if doorbell is None:
+            woken = self.shutdown_event.wait(self.idle_wait_secs)
+        else:
+            woken = doorbell.wait(self.idle_wait_secs)
+
+        if woken:
+            self.reset_idle_wait()
+        else:
+            self.idle_wait_secs = min(self.MAX_IDLE_WAIT_SECS, self.idle_wait_secs * 2)
+        return woken
+
+    def reset_idle_wait(self):
+        self.idle_wait_secs = self.DEFAULT_POLLING_TIMEOUT
+
+    def claim_item(self, item):
+        # -- Remembers an item taken from the work queue of the pool, it is put back on the
+        # queue if the worker stops or crashes before the item is released
+        if self.claim is not None:
+            self.claim.add(item)
+
+    def release_item(self, item):
+        if self.claim is not None:
+            self.claim.remove(item)
+
     def startup(self):
         self.logger.log(logging.DEBUG, "Entering startup")
         pass
@@ -218,9 +474,10 @@ class TimerProcWorker(ProcWorker):
         self.logger.log(logging.DEBUG, "Entering TimerProcWorker.main_loop")
         next_time = time.time() + self.INTERVAL_SECS
         while not self.shutdown_event.is_set():
-            sleep_secs = _sleep_secs(self.MAX_SLEEP_SECS, next_time)
-            time.sleep(sleep_secs)
-            if time.time() > next_time:
+            # -- block until the next call is due, a shutdown wakes the worker immediately
+            if self.shutdown_event.wait(_sleep_secs(self.INTERVAL_SECS, next_time)):
+                break
+            if time.time() >= next_time:
                 self.logger.log(
                     logging.DEBUG, "TimerProcWorker.main_loop : calling main_func"
                 )
@@ -236,7 +493,8 @@ class QueueProcWorker(ProcWorker):
     def main_loop(self):
         self.logger.log(logging.DEBUG, "Entering QueueProcWorker.main_loop")
         while not self.shutdown_event.is_set():
-            item = self.work_q.safe_get()
+            # -- block on the queue, shutdown is noticed after MAX_IDLE_WAIT_SECS at the latest
+            item = self.work_q.safe_get(self.MAX_IDLE_WAIT_SECS)
             if not item:
                 continue
             self.logger.log(
@@ -252,11 +510,19 @@ class QueueProcWorker(ProcWorker):
 
 
 def proc_worker_wrapper(
-    proc_worker_class, name, startup_evt, shutdown_evt, event_q, logger_q, config, *args
+    proc_worker_class,
+    name,
+    startup_evt,
+    shutdown_evt,
+    event_q,
+    logger_q,
+    config,
+    *args,
+    claim=None,
 ):
 
     proc_worker = proc_worker_class(
-        name, startup_evt, shutdown_evt, event_q, logger_q, config, *args
+        name, startup_evt, shutdown_evt, event_q, logger_q, config, *args, claim=claim
     )
     return proc_worker.run()
 
@@ -274,35 +540,51 @@ class Proc:
         event_q,
         logger_q,
         config,
+        claim=None,
     ):
 
         self.name = name
+        self.worker_class = worker_class
+        self.args = args
         self.shutdown_event = shutdown_event
-        self.startup_event = mp.Event()
+        self.event_q = event_q
+        self.logger_q = logger_q
+        self.config = config
+        self.claim = claim
+
+        # -- crash timestamps and the scheduled restart, maintained by MainContext.supervise
+        self.crashes = []
+        self.restart_at = None
 
         self.logger = setup_logging(logger_q=logger_q, name=name, config=config)
+        self.start()
 
+    def start(self):
+        self.startup_event = mp.Event()
         self.proc = mp.Process(
             target=proc_worker_wrapper,
             args=(
-                worker_class,
-                name,
+                self.worker_class,
+                self.name,
                 self.startup_event,
-                shutdown_event,
-                event_q,
-                logger_q,
-                config,
-                *args,
+                self.shutdown_event,
+                self.event_q,
+                self.logger_q,
+                self.config,
+                *self.args,
             ),
+            kwargs={"claim": self.claim},
         )
-        self.logger.log(logging.DEBUG, f"Proc.__init__ starting : {name}")
+        self.logger.log(logging.DEBUG, f"Proc.start starting : {self.name}")
         self.proc.start()
         started = self.startup_event.wait(timeout=Proc.STARTUP_WAIT_SECS)
-        self.logger.log(logging.DEBUG, f"Proc.__init__ starting : {name} got {started}")
+        self.logger.log(
+            logging.DEBUG, f"Proc.start starting : {self.name} got {started}"
+        )
         if not started:
             self.terminate()
             raise RuntimeError(
-                f"Process {name} failed to startup after {Proc.STARTUP_WAIT_SECS} seconds"
+                f"Process {self.name} failed to startup after {Proc.STARTUP_WAIT_SECS} seconds"
             )
 
     def full_stop(self, wait_time=SHUTDOWN_WAIT_SECS):
@@ -342,9 +624,91 @@ class Proc:
         return not exc_type
 
 
+# -- Worker pools
+def cpu_load():
+    # -- 1 minute load average per core, None on platforms without a load average
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+class WorkerPool:
+    # -- Instances of one worker class which MainContext.autoscale starts and stops
+    # between min_instances and max_instances, depending on the fill level of the
+    # work queue, the size of the backlog and the CPU load.
+    SCALE_UP_RATIO = 0.8
+    BACKLOG_PER_WORKER = 10
+
+    def __init__(
+        self,
+        *args,
+        name,
+        worker_class,
+        config,
+        min_instances,
+        max_instances,
+        work_q=None,
+        backlog=None,
+    ):
+        self.args = args
+        self.name = name
+        self.worker_class = worker_class
+        self.config = config
+        self.min_instances = min_instances
+        self.max_instances = max(min_instances, max_instances)
+        self.work_q = work_q
+        self.backlog = backlog
+
+        self.procs = []
+        self.stopping = []
+        self.next_id = 0
+
+    def __len__(self):
+        return len(self.procs)
+
+    def queue_ratio(self):
+        # -- fill level of the work queue between 0 and 1, None if it can't be determined
+        if self.work_q is None or not self.work_q.maxsize:
+            return None
+        try:
+            size = self.work_q.qsize()
+        except NotImplementedError:
+            # -- qsize isn't available on macOS
+            return None
+        return min(1.0, size / self.work_q.maxsize)
+
+    def scaling(self, load=None, max_load=None):
+        # -- returns 1 to start a worker, -1 to stop one and 0 to keep the pool as it is
+        ratio = self.queue_ratio()
+        backlog = self.backlog() if self.backlog else None
+        if ratio is None and backlog is None:
+            return 0
+
+        busy = (ratio is not None and ratio >= self.SCALE_UP_RATIO) or (
+            backlog is not None and backlog > len(self) * self.BACKLOG_PER_WORKER
+        )
+        idle = not ratio and not backlog
+
+        if busy and len(self) < self.max_instances:
+            # -- more processes don't help once the CPUs are saturated
+            if load is not None and max_load is not None and load >= max_load:
+                return 0
+            return 1
+        if idle and len(self) > self.min_instances:
+            return -1
+        return 0
+
+
 # -- Main Wrappers
 class MainContext:
     STOP_WAIT_SECS = 3.0
+    RESTART_BACKOFF_SECS = 1.0
+    MAX_RESTART_BACKOFF_SECS = 60.0
+    MAX_RESTARTS = 5
+    RESTART_WINDOW_SECS = 600.0
+    AUTOSCALE_INTERVAL_SECS = 10.0
+    AUTOSCALE_MAX_LOAD = 0.9
 
     def __init__(self, config):
         self.config = config
@@ -358,6 +722,28 @@ class MainContext:
             logger_q=self.logger_q, name="MAIN", config=self.config["General"]
         )
         self.STOP_WAIT_SECS = float(self.config["General"]["StopWaitSecs"])
+        self.RESTART_BACKOFF_SECS = float(
+            self.config["General"].get("RestartBackoffSecs", self.RESTART_BACKOFF_SECS)
+        )
+        self.MAX_RESTART_BACKOFF_SECS = float(
+            self.config["General"].get(
+                "MaxRestartBackoffSecs", self.MAX_RESTART_BACKOFF_SECS
+            )
+        )
+        self.MAX_RESTARTS = int(
+            self.config["General"].get("MaxRestarts", self.MAX_RESTARTS)
+        )
+        self.RESTART_WINDOW_SECS = float(
+            self.config["General"].get("RestartWindowSecs", self.RESTART_WINDOW_SECS)
+        )
+        self.AUTOSCALE_INTERVAL_SECS = float(
+            self.config["General"].get(
+                "AutoscaleIntervalSecs", self.AUTOSCALE_INTERVAL_SECS
+            )
+        )
+        self.AUTOSCALE_MAX_LOAD = float(
+            self.config["General"].get("AutoscaleMaxLoad", self.AUTOSCALE_MAX_LOAD)
+        )
 
         handler = logging.StreamHandler()
         handler.setLevel(logging.DEBUG)
@@ -365,6 +751,9 @@ class MainContext:
 
         self.procs = []
         self.queues = []
+        self.doorbells = []
+        self.pools = []
+        self.autoscaled_at = time.time()
 
         self.shutdown_event = mp.Event()
         self.event_queue = self.MPQueue()
@@ -388,28 +777,209 @@ class MainContext:
         # -- Don't eat exceptions that reach here.
         return not exc_type
 
-    def Proc(self, *args, name="", worker_class="", config=""):
+    def Proc(
+        self,
+        *args,
+        name="",
+        worker_class="",
+        config="",
+        shutdown_event=None,
+        claim=None,
+    ):
         proc = Proc(
             *args,
             name=name,
             worker_class=worker_class,
-            shutdown_event=self.shutdown_event,
+            shutdown_event=shutdown_event or self.shutdown_event,
             event_q=self.event_queue,
             logger_q=self.logger_q,
             config=config,
+            claim=claim,
         )
 
         self.procs.append(proc)
         return proc
 
+    def Pool(
+        self, *args, name="", worker_class="", config="", work_q=None, backlog=None
+    ):
+        # -- Starts `Instances` workers, MinInstances and MaxInstances of the worker config
+        # limit the autoscaling and default to a fixed pool size
+        instances = int(config.get("Instances", 1))
+        min_instances = int(config.get("MinInstances", instances))
+        max_instances = int(config.get("MaxInstances", instances))
+
+        pool = WorkerPool(
+            *args,
+            name=name,
+            worker_class=worker_class,
+            config=config,
+            min_instances=min_instances,
+            max_instances=max_instances,
+            work_q=work_q,
+            backlog=backlog,
+        )
+        self.pools.append(pool)
+        for _ in range(min(max(instances, pool.min_instances), pool.max_instances)):
+            self.scale_up(pool)
+        return pool
+
+    def scale_up(self, pool):
+        # -- every pooled worker gets its own shutdown event to be stopped on its own
+        # and a claim for the items of the work queue it is working on
+        proc = self.Proc(
+            *pool.args,
+            name=f"{pool.name}_{pool.next_id}",
+            worker_class=pool.worker_class,
+            config=pool.config,
+            shutdown_event=mp.Event(),
+            claim=Claim(pool.work_q) if pool.work_q is not None else None,
+        )
+        pool.next_id += 1
+        pool.procs.append(proc)
+        return proc
+
+    def scale_down(self, pool):
+        # -- the newest worker is removed by autoscale once it exited,
+        # the items it claimed but didn't finish are put back on the work queue
+        proc = pool.procs.pop()
+        proc.shutdown_event.set()
+        pool.stopping.append(proc)
+        return proc
+
+    def autoscale(self, now=None):
+        # -- Starts or stops one worker per pool and AUTOSCALE_INTERVAL_SECS, called by the main loop
+        if self.shutdown_event.is_set():
+            return
+        if now is None:
+            now = time.time()
+
+        for pool in self.pools:
+            for proc in [proc for proc in pool.stopping if not proc.proc.is_alive()]:
+                proc.proc.join()
+                self.requeue_claimed(proc)
+                pool.stopping.remove(proc)
+                self.procs.remove(proc)
+
+        if now - self.autoscaled_at < self.AUTOSCALE_INTERVAL_SECS:
+            return
+        self.autoscaled_at = now
+
+        load = cpu_load()
+        for pool in self.pools:
+            try:
+                change = pool.scaling(load, self.AUTOSCALE_MAX_LOAD)
+            except Exception as exc:
+                # -- e.g. a failing backlog query, the pool keeps its size
+                self.logger.log(
+                    logging.WARNING, f"Autoscaling {pool.name} failed: {exc}"
+                )
+                continue
+
+            if change > 0:
+                try:
+                    proc = self.scale_up(pool)
+                except RuntimeError as exc:
+                    self.logger.log(logging.ERROR, f"{exc}")
+                    continue
+            elif change < 0:
+                proc = self.scale_down(pool)
+            else:
+                continue
+            self.logger.log(
+                logging.INFO,
+                f"{'Started' if change > 0 else 'Stopping'} {proc.name}, "
+                f"{pool.name} runs {len(pool)} workers",
+            )
+
+    def requeue_claimed(self, proc):
+        # -- Puts the items a stopped or crashed worker didn't finish back on the work queue of its pool
+        if proc.claim is None:
+            return
+        for item in proc.claim.take():
+            try:
+                proc.claim.work_q.put(item, timeout=self.STOP_WAIT_SECS)
+                self.logger.log(logging.INFO, f"Requeued {item} claimed by {proc.name}")
+            except Full:
+                self.logger.log(
+                    logging.ERROR, f"Lost {item} claimed by {proc.name}, queue is full"
+                )
+
     def MPQueue(self, *args, **kwargs):
         q = MPQueue(*args, **kwargs)
         self.queues.append(q)
         return q
 
+    def supervise(self, event=None):
+        # -- Restarts crashed processes, called by the main loop with every event it receives.
+        # A process which crashed more than MAX_RESTARTS times within RESTART_WINDOW_SECS is
+        # considered to be in a crash loop and shuts down the whole context instead.
+        if self.shutdown_event.is_set():
+            return
+
+        if event is not None and event.msg_type == "FATAL":
+            self.logger.log(
+                logging.ERROR, f"Process {event.msg_src} failed: {event.msg}"
+            )
+
+        now = time.time()
+        for proc in self.procs:
+            if proc.proc.is_alive() or proc.proc.exitcode == 0:
+                continue
+            if proc.shutdown_event.is_set():
+                # -- stopped by the autoscaler
+                continue
+
+            if proc.restart_at is None:
+                self.requeue_claimed(proc)
+                proc.crashes = [
+                    crashed_at
+                    for crashed_at in proc.crashes
+                    if now - crashed_at < self.RESTART_WINDOW_SECS
+                ]
+                proc.crashes.append(now)
+
+                if len(proc.crashes) > self.MAX_RESTARTS:
+                    self.logger.log(
+                        logging.ERROR,
+                        f"Process {proc.name} crashed {len(proc.crashes)} times within "
+                        f"{self.RESTART_WINDOW_SECS} seconds, shutting down",
+                    )
+                    self.shutdown_event.set()
+                    return
+
+                backoff = min(
+                    self.MAX_RESTART_BACKOFF_SECS,
+                    self.RESTART_BACKOFF_SECS * 2 ** (len(proc.crashes) - 1),
+                )
+                proc.restart_at = now + backoff
+                self.logger.log(
+                    logging.ERROR,
+                    f"Process {proc.name} ended with exitcode {proc.proc.exitcode}, "
+                    f"restarting in {backoff} seconds",
+                )
+            elif now >= proc.restart_at:
+                proc.restart_at = None
+                try:
+                    proc.start()
+                    self.logger.log(logging.INFO, f"Process {proc.name} restarted")
+                except RuntimeError as exc:
+                    # -- counted as the next crash by the following call
+                    self.logger.log(logging.ERROR, f"{exc}")
+
+    def Doorbell(self):
+        doorbell = Doorbell()
+        self.doorbells.append(doorbell)
+        return doorbell
+
     def stop_procs(self):
         self.event_queue.safe_put(EventMessage("stop_procs", "END", "END"))
         self.shutdown_event.set()
+        for proc in self.procs:
+            proc.shutdown_event.set()
+        # -- wake up workers waiting for work so they notice the shutdown
+        for doorbell in self.doorbells:
+            doorbell.ring()
         end_time = time.time() + self.STOP_WAIT_SECS
         num_terminated = 0
         num_failed = 0
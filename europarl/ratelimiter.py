@@ -0,0 +1,264 @@
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# status codes which show that the server is overloaded or limits our requests
+CONGESTION_CODES = {408, 429, 460, 500, 502, 503, 504}
+# status codes which come with a Retry-After header worth honouring
+RETRY_AFTER_CODES = {429, 503}
+
+
+def parse_retry_after(value, now=None):
+    """
+    Parses the value of a Retry-After header
+
+    Args:
+        value (str): header value, either delay seconds or a HTTP date
+        now (float, optional): current unix timestamp. Defaults to time.time().
+
+    Returns:
+        float: seconds to wait, None if the value can't be parsed
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at is None:
+        return None
+
+    if now is None:
+        now = time.time()
+    return max(0.0, retry_at.timestamp() - now)
+
+
+def status_report(status_code, url=None, resp=None):
+    """
+    Creates the status report a crawler puts into the status queue of the TokenBucketWorker
+
+    Args:
+        status_code (int): status code of the request
+        url (str, optional): requested url
+        resp (requests.Response, optional): response of the request, provides the latency and the Retry-After header
+
+    Returns:
+        tuple: host, status code, latency in seconds and Retry-After value. Unknown values are None.
+    """
+    host = urlsplit(url).hostname if url else None
+    latency, retry_after = None, None
+    if resp is not None:
+        elapsed = getattr(resp, "elapsed", None)
+        if elapsed is not None:
+            latency = elapsed.total_seconds()
+        retry_after = resp.headers.get("Retry-After")
+    return (host, status_code, latency, retry_after)
+
+
+class HostLimiter:
+    """
+    Adaptive request rate of a single host using additive-increase/multiplicative-decrease (AIMD).
+
+    Every successful response raises the rate so that it grows by ``increase`` requests per second for every second of error-free traffic.
+    Rate limiting, server errors, timeouts and latencies above the latency target cut the rate by ``decrease``, at most once per decrease window,
+    so a burst of failures caused by the same overload only counts once.
+    A Retry-After header on 429 and 503 responses blocks the host until the requested time has passed.
+
+    Attributes:
+        rate (float): current rate in requests per second
+        blocked_until (float): unix timestamp until which no request should be made
+        latencies (collections.deque): latencies of the last responses in seconds
+    """
+
+    def __init__(
+        self,
+        rate,
+        min_rate,
+        max_rate,
+        increase=0.01,
+        decrease=0.5,
+        latency_target=None,
+        window=100,
+    ):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.latencies = deque(maxlen=window)
+        self.blocked_until = 0.0
+        self.last_decrease = float("-inf")
+
+    def percentile(self, percent):
+        """
+        Gets a percentile of the recent latencies with the nearest-rank method
+
+        Args:
+            percent (float): percentile between 0 and 100
+
+        Returns:
+            float: latency in seconds, None if no latency was recorded yet
+        """
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        rank = max(
+            0, min(len(ordered) - 1, int(round(percent / 100 * len(ordered))) - 1)
+        )
+        return ordered[rank]
+
+    def is_congested(self, status_code, latency):
+        """
+        Decides if a response shows that the host is overloaded.
+        A slow response only counts if the 90th latency percentile exceeds the latency target as well, which ignores single outliers.
+
+        Args:
+            status_code (int): status code of the response
+            latency (float): latency of the response in seconds or None
+
+        Returns:
+            bool: True if the rate should be decreased
+        """
+        if status_code in CONGESTION_CODES or 500 <= status_code < 600:
+            return True
+        if (
+            self.latency_target
+            and latency is not None
+            and latency > self.latency_target
+        ):
+            return self.percentile(90) > self.latency_target
+        return False
+
+    def record(self, status_code, latency=None, retry_after=None, now=None):
+        """
+        Adapts the rate to the response of a request
+
+        Args:
+            status_code (int): status code of the response
+            latency (float, optional): latency of the response in seconds
+            retry_after (str, optional): value of the Retry-After header
+            now (float, optional): current unix timestamp. Defaults to time.time().
+
+        Returns:
+            bool: True if the rate was decreased or the host was blocked
+        """
+        if now is None:
+            now = time.time()
+        status_code = int(status_code)
+        if latency is not None:
+            self.latencies.append(latency)
+
+        if status_code in RETRY_AFTER_CODES:
+            delay = parse_retry_after(retry_after, now)
+            if delay:
+                self.blocked_until = max(self.blocked_until, now + delay)
+
+        if self.is_congested(status_code, latency):
+            # one decrease per window, the responses to requests sent at the old rate are still arriving
+            window = max(1 / self.rate, self.percentile(90) or 0)
+            if now - self.last_decrease < window:
+                return self.blocked_until > now
+            self.last_decrease = now
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            return True
+
+        if status_code < 400 or status_code == 404:
+            # grows by `increase` per second, a second of traffic holds `rate` responses
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+        return False
+
+    def blocked_for(self, now=None):
+        """
+        Returns:
+            float: seconds until the host may be requested again, 0 if it isn't blocked
+        """
+        if now is None:
+            now = time.time()
+        return max(0.0, self.blocked_until - now)
+
+
+class AdaptiveRateLimiter:
+    """
+    Keeps a HostLimiter for every requested host.
+
+    The crawlers share one token bucket, the allowed rate is therefore the rate of the slowest host and drops to 0 while any host is blocked by a Retry-After header.
+
+    Attributes:
+        hosts (dict): HostLimiter instances keyed by host name
+    """
+
+    def __init__(self, rate, min_rate, max_rate, **limiter_args):
+        self.initial_rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.limiter_args = limiter_args
+        self.hosts = {}
+
+    def host(self, host):
+        """
+        Gets the limiter of a host and creates it on first use
+
+        Args:
+            host (str): host name, None for reports without an url
+
+        Returns:
+            HostLimiter: limiter of the host
+        """
+        if host not in self.hosts:
+            self.hosts[host] = HostLimiter(
+                self.initial_rate, self.min_rate, self.max_rate, **self.limiter_args
+            )
+        return self.hosts[host]
+
+    def record(self, host, status_code, latency=None, retry_after=None, now=None):
+        """
+        Passes a status report to the limiter of its host, see HostLimiter.record
+
+        Returns:
+            bool: True if the rate was decreased or the host was blocked
+        """
+        return self.host(host).record(status_code, latency, retry_after, now)
+
+    def rate(self, now=None):
+        """
+        Returns:
+            float: allowed rate over all hosts in requests per second, 0 while a host is blocked
+        """
+        if not self.hosts:
+            return self.initial_rate
+        if self.blocked_for(now) > 0:
+            return 0.0
+        return min(limiter.rate for limiter in self.hosts.values())
+
+    def blocked_for(self, now=None):
+        """
+        Returns:
+            float: seconds until all hosts may be requested again
+        """
+        return max(
+            (limiter.blocked_for(now) for limiter in self.hosts.values()), default=0.0
+        )
+
+    def latency_percentiles(self, percents=(50, 90, 99)):
+        """
+        Collects latency percentiles of every host for logging
+
+        Args:
+            percents (tuple of float): percentiles to compute
+
+        Returns:
+            dict: percentiles keyed by host, every entry maps the percentile to the latency in seconds
+        """
+        return {
+            host: {percent: limiter.percentile(percent) for percent in percents}
+            for host, limiter in self.hosts.items()
+        }
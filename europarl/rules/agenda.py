@@ -39,7 +39,7 @@ class Agenda(Rule):
         """
         data = {}
         data.update(filesize(filepath))
-        data.update(filecontent(filepath, cls.format))
+        data.update(filecontent(filepath, cls.format, cls.extraction_backend))
         return data
 
 
@@ -43,7 +43,7 @@ class DailyAgenda(Rule):
         """
         data = {}
         data.update(filesize(filepath))
-        data.update(filecontent(filepath, cls.format))
+        data.update(filecontent(filepath, cls.format, cls.extraction_backend))
         return data
 
 
@@ -1,9 +1,231 @@
 import codecs
+import html
+import io
 import logging
 import os
+from html.entities import html5
+from html.parser import HTMLParser
 
+import lxml.html
 from bs4 import BeautifulSoup
-from pdfminer.high_level import extract_text
+from lxml import etree
+
+from europarl.filestore import CHUNK_SIZE
+from europarl.rules.pdfextraction import PdfExtractor
+
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+# configured by the PostProcessingWorker, every worker process has its own instance
+pdf_extractor = PdfExtractor()
+
+
+def make_backend_registry():
+    """
+    Creates the registry of text extraction backends that runs on import time
+    and collects all functions marked with the @extraction_backends decorator.
+    The backends of a format are tried in the order of their registration, the preferred one first.
+
+    Returns:
+        function: Decorator factory to register a backend for a format
+    """
+    registry = {}
+
+    def register(format, name, available=True):
+        def registrar(function):
+            if available:
+                registry.setdefault(format, {})[name] = function
+            return function
+
+        return registrar
+
+    register.all = registry
+
+    return register
+
+
+extraction_backends = make_backend_registry()
+
+
+class HtmlTextParser(HTMLParser):
+    """
+    Event based parser collecting the text of a HTML document without building a tree.
+
+    It is driven by the same tokenizer as BeautifulSoup with the html.parser and skips the same strings as BeautifulSoup.get_text:
+    comments, declarations, processing instructions and the content of scripts, stylesheets and templates.
+    Only the text and the markup of a single chunk are held in memory besides the collected text.
+
+    Attributes:
+        text (io.StringIO): collected text in document order
+    """
+
+    SKIPPED_TAGS = {"script", "style", "template"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.text = io.StringIO()
+        self.skipped = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self.skipped += 1
+
+    def handle_startendtag(self, tag, attrs):
+        pass
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self.skipped:
+            self.skipped -= 1
+
+    def handle_data(self, data):
+        if not self.skipped:
+            self.text.write(data)
+
+    def handle_charref(self, name):
+        self.handle_data(html.unescape("&#{};".format(name)))
+
+    def handle_entityref(self, name):
+        # unknown entities are kept as literal text
+        self.handle_data(html5.get(name + ";", "&" + name))
+
+    def unknown_decl(self, data):
+        if data.upper().startswith("CDATA["):
+            self.handle_data(data[len("CDATA[") :])
+
+
+@extraction_backends(".html", "htmlstream")
+def streaming_html_text(filepath):
+    """
+    Extracts the text of a HTML file chunk by chunk with the HtmlTextParser.
+    The memory usage is bound by the size of the text instead of several times the size of the file.
+
+    Args:
+        filepath (str): path to the file
+
+    Returns:
+        str: text of the document
+    """
+    parser = HtmlTextParser()
+    with open(filepath, "r") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), ""):
+            parser.feed(chunk)
+    parser.close()
+    return parser.text.getvalue()
+
+
+@extraction_backends(".html", "lxml")
+def lxml_html_text(filepath):
+    """
+    Extracts the text of a HTML file with lxml.
+    Scripts, stylesheets and templates are dropped like BeautifulSoup.get_text does.
+
+    Args:
+        filepath (str): path to the file
+
+    Returns:
+        str: text of the document
+    """
+    with open(filepath, "r") as file:
+        document = lxml.html.document_fromstring(file.read())
+    etree.strip_elements(document, "script", "style", "template", with_tail=False)
+    return document.text_content()
+
+
+@extraction_backends(".html", "beautifulsoup")
+def beautifulsoup_html_text(filepath):
+    """
+    Extracts the text of a HTML file with BeautifulSoup and the html.parser
+
+    Args:
+        filepath (str): path to the file
+
+    Returns:
+        str: text of the document
+    """
+    with open(filepath, "r") as file:
+        soup = BeautifulSoup(file.read(), "html.parser")
+    return soup.get_text()
+
+
+class XmlTextTarget:
+    """
+    Parser target collecting the character data of a XML document, lxml calls it for every event without building a tree
+
+    Attributes:
+        text (io.StringIO): collected text in document order
+    """
+
+    def __init__(self):
+        self.text = io.StringIO()
+
+    def data(self, data):
+        self.text.write(data)
+
+    def close(self):
+        return self.text.getvalue()
+
+
+@extraction_backends(".xml", "xmlstream")
+def streaming_xml_text(filepath):
+    """
+    Extracts the text of a XML file chunk by chunk. Entities aren't resolved and nothing is loaded from the network.
+
+    Args:
+        filepath (str): path to the file
+
+    Returns:
+        str: text of the document
+    """
+    parser = etree.XMLParser(
+        target=XmlTextTarget(), resolve_entities=False, no_network=True, huge_tree=True
+    )
+    with open(filepath, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            parser.feed(chunk)
+    return parser.close()
+
+
+def _pymupdf_text(filepath):
+    with fitz.open(filepath) as document:
+        return "".join(page.get_text() + "\x0c" for page in document)
+
+
+@extraction_backends(".pdf", "pymupdf", available=fitz is not None)
+def pymupdf_pdf_text(filepath):
+    """
+    Extracts the text of a PDF file with PyMuPDF, if it is installed.
+    It is preferred over pdfminer, which is several times slower, and runs in the pool of the PdfExtractor with its memory limit.
+    The whole document gets the time of one page range, documents which time out or fail fall back to pdfminer and its page ranges.
+
+    Args:
+        filepath (str): path to the file
+
+    Returns:
+        str: text of all pages, every page is terminated by a form feed
+    """
+    return pdf_extractor.run(
+        _pymupdf_text,
+        (filepath,),
+        pdf_extractor.pages_per_task,
+        "Extracting {} with PyMuPDF".format(filepath),
+    )
+
+
+@extraction_backends(".pdf", "pdfminer")
+def pdfminer_pdf_text(filepath):
+    """
+    Extracts the text of a PDF file with pdfminer, see PdfExtractor.
+    It is the fallback of PyMuPDF and the default if PyMuPDF isn't installed.
+
+    Args:
+        filepath (str): path to the file
+
+    Returns:
+        str: text of all pages, every page is terminated by a form feed
+    """
+    return pdf_extractor.extract(filepath)
 
 
 def filesize(filepath):
@@ -24,29 +246,36 @@ def filesize(filepath):
     return {"filesize": res}
 
 
-def filecontent(filepath, format):
+def filecontent(filepath, format, backend=None):
     """
     Returns the content contained in a HTML or PDF file.
+    The registered backends of the format are tried one after another until one of them succeeds.
 
 
     Args:
         filepath (str): path to the file
         format (str): string containing the file ending
+        backend (str, optional): name of the backend to try first. Defaults to the registration order.
 
     Returns:
         dict: dictionary with the single key "content" and a string containing the files content as the value
     """
-    try:
-        if format == ".html":
-            with open(filepath, "r") as file:
-                soup = BeautifulSoup(file.read(), "html.parser")
-                text = soup.get_text()
-        elif format == ".pdf":
-            text = extract_text(filepath)
-        else:
-            text = None
-    except Exception as e:
-        logging.error(e)
-        text = None
+    backends = extraction_backends.all.get(format, {})
+    names = sorted(backends, key=lambda name: name != backend)
+
+    text = None
+    for name in names:
+        try:
+            text = backends[name](filepath)
+            break
+        except Exception as e:
+            if name == names[-1]:
+                logging.error(e)
+            else:
+                logging.warning(
+                    "Extraction backend {} failed on {}, falling back: {}".format(
+                        name, filepath, e
+                    )
+                )
 
     return {"content": text}
@@ -0,0 +1,261 @@
+import logging
+import multiprocessing
+import os
+import signal
+
+from pdfminer.high_level import extract_text
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+class ExtractionTimeout(Exception):
+    """
+    Raised if the pages of a document weren't extracted within their time limit
+    """
+
+
+def page_count(filepath):
+    """
+    Counts the pages of a PDF file without extracting their content
+
+    Args:
+        filepath (str): path to the PDF file
+
+    Returns:
+        int: amount of pages
+    """
+    with open(filepath, "rb") as file:
+        document = PDFDocument(PDFParser(file))
+        return sum(1 for _ in PDFPage.create_pages(document))
+
+
+def page_ranges(pages, pages_per_task):
+    """
+    Splits the pages of a document into consecutive ranges
+
+    Args:
+        pages (int): amount of pages
+        pages_per_task (int): maximal amount of pages in a range
+
+    Returns:
+        list of range: page ranges in document order
+    """
+    return [
+        range(first, min(first + pages_per_task, pages))
+        for first in range(0, pages, pages_per_task)
+    ]
+
+
+def _init_extraction_process(memory_limit):
+    """
+    Prepares a pool process, it inherits the signal handlers of the PostProcessingWorker which would turn a terminate into an exception.
+
+    Args:
+        memory_limit (int): bytes the process may allocate on top of the memory inherited from its parent, None for no limit
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    if not memory_limit or resource is None:
+        return
+    try:
+        # the forked process already maps the address space of its parent
+        with open("/proc/self/statm") as statm:
+            inherited = int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        limit = inherited + memory_limit
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (OSError, ValueError) as e:
+        logging.warning("Memory limit of the extraction process not set: {}".format(e))
+
+
+def _extract_page_range(filepath, first, last):
+    return extract_text(filepath, page_numbers=range(first, last))
+
+
+def available_processes(workers=1):
+    """
+    Divides the CPUs between the workers extracting documents at the same time
+
+    Args:
+        workers (int, optional): amount of workers with their own extraction pool. Defaults to 1.
+
+    Returns:
+        int: amount of processes of one pool, at least one
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+class PdfExtractor:
+    """
+    Extracts the text of PDF files by splitting them into page ranges, which are extracted in parallel by a process pool and reassembled in order.
+
+    The pool is created on first use and kept for the following documents. Counting the pages happens in the pool as well.
+    Every range has PAGE_TIMEOUT_SECS for each of its pages and the pool processes share MEMORY_LIMIT_MB,
+    a document exceeding either limit is aborted and the pool is replaced, which kills a stuck process.
+
+    Attributes:
+        PROCESSES (int): amount of pool processes, None divides the CPUs between the workers
+        PAGES_PER_TASK (int): amount of pages extracted by one task
+        PAGE_TIMEOUT_SECS (float): seconds a single page may take, 0 for no limit
+        MEMORY_LIMIT_MB (int): megabytes the pool may allocate, 0 for no limit
+    """
+
+    PROCESSES = None
+    PAGES_PER_TASK = 10
+    PAGE_TIMEOUT_SECS = 30.0
+    MEMORY_LIMIT_MB = 1024
+
+    def __init__(
+        self,
+        processes=None,
+        pages_per_task=None,
+        page_timeout=None,
+        memory_limit_mb=None,
+    ):
+        self.processes = int(processes or self.PROCESSES or available_processes())
+        self.pages_per_task = int(pages_per_task or self.PAGES_PER_TASK)
+        self.page_timeout = float(
+            self.PAGE_TIMEOUT_SECS if page_timeout is None else page_timeout
+        )
+        self.memory_limit_mb = int(
+            self.MEMORY_LIMIT_MB if memory_limit_mb is None else memory_limit_mb
+        )
+        self.pool = None
+        self.pid = None
+
+    def configure(self, config):
+        """
+        Reads the extraction settings of a worker.
+        Without ExtractionProcesses the CPUs are divided between the MaxInstances workers of the pool.
+
+        Args:
+            config (configparser.SectionProxy): worker configuration
+        """
+        self.close()
+        workers = int(config.get("MaxInstances", config.get("Instances", 1)))
+        self.processes = int(config.get("ExtractionProcesses", 0)) or (
+            available_processes(workers)
+        )
+        self.pages_per_task = int(config.get("PagesPerTask", self.pages_per_task))
+        self.page_timeout = float(config.get("PageTimeoutSecs", self.page_timeout))
+        self.memory_limit_mb = int(
+            config.get("ExtractionMemoryLimitMB", self.memory_limit_mb)
+        )
+
+    def get_pool(self):
+        """
+        Returns the process pool, it is created on first use and recreated in forked processes.
+
+        Returns:
+            multiprocessing.pool.Pool: process pool
+        """
+        if self.pool is not None and self.pid == os.getpid():
+            return self.pool
+
+        # the pool of a parent process can't be used after a fork
+        self.pool = multiprocessing.Pool(
+            self.processes,
+            initializer=_init_extraction_process,
+            initargs=(self.memory_limit_mb * 1024 * 1024 // self.processes,),
+        )
+        self.pid = os.getpid()
+        return self.pool
+
+    def close(self):
+        """
+        Terminates the process pool, the next document creates a new one
+        """
+        if self.pool is not None and self.pid == os.getpid():
+            self.pool.terminate()
+            self.pool.join()
+        self.pool = None
+
+    def run(self, function, args, pages, description):
+        """
+        Runs a function in the pool and waits PAGE_TIMEOUT_SECS for every page it processes
+
+        Args:
+            function (function): function to run
+            args (tuple): arguments of the function
+            pages (int): amount of pages processed by the function
+            description (str): description of the task for the timeout message
+
+        Raises:
+            ExtractionTimeout: if the function exceeded its time limit
+
+        Returns:
+            result of the function
+        """
+        return self.wait(
+            self.get_pool().apply_async(function, args), pages, description
+        )
+
+    def wait(self, result, pages, description):
+        """
+        Waits PAGE_TIMEOUT_SECS for every page of a task running in the pool, see run
+        """
+        timeout = self.page_timeout * pages if self.page_timeout else None
+        try:
+            return result.get(timeout)
+        except multiprocessing.TimeoutError:
+            # kills the stuck process with its pool
+            self.close()
+            raise ExtractionTimeout("{} wasn't done in time".format(description))
+        except MemoryError:
+            self.close()
+            raise
+
+    def extract(self, filepath):
+        """
+        Extracts the text of a PDF file
+
+        Args:
+            filepath (str): path to the PDF file
+
+        Raises:
+            ExtractionTimeout: if a page range exceeded its time limit
+            MemoryError: if a pool process exceeded its share of the memory limit
+
+        Returns:
+            str: text of all pages, every page is terminated by a form feed like the text of pdfminer.high_level.extract_text
+        """
+        results = []
+        try:
+            pages = self.run(
+                page_count,
+                (filepath,),
+                self.pages_per_task,
+                "Counting the pages of {}".format(filepath),
+            )
+
+            ranges = page_ranges(pages, self.pages_per_task)
+            pool = self.get_pool()
+            results = [
+                pool.apply_async(
+                    _extract_page_range, (filepath, pages.start, pages.stop)
+                )
+                for pages in ranges
+            ]
+            # the ranges are started in order, a range is running once all ranges before it are done
+            return "".join(
+                self.wait(
+                    result,
+                    len(pages),
+                    "Pages {}-{} of {}".format(pages.start + 1, pages.stop, filepath),
+                )
+                for pages, result in zip(ranges, results)
+            )
+        except BaseException:
+            # drops the remaining ranges of the document, they would take the time of the next document
+            if not all(result.ready() for result in results):
+                self.close()
+            raise
@@ -20,7 +20,7 @@ class ProtocolRule(Rule):
         """
         data = {}
         data.update(filesize(filepath))
-        data.update(filecontent(filepath, cls.format))
+        data.update(filecontent(filepath, cls.format, cls.extraction_backend))
         return data
 
     @classmethod
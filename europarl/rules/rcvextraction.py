@@ -0,0 +1,104 @@
+from lxml import etree
+
+# positions of the result and intention lists of a roll call vote
+POSITIONS = {
+    "Result.For": "for",
+    "Result.Against": "against",
+    "Result.Abstention": "abstention",
+    "Intention.For": "for",
+    "Intention.Against": "against",
+    "Intention.Abstention": "abstention",
+}
+
+
+def _text(element):
+    return " ".join("".join(element.itertext()).split())
+
+
+def _new_vote(element):
+    return {
+        "id": element.get("Identifier"),
+        "date": element.get("Date"),
+        "description": None,
+        "for": 0,
+        "against": 0,
+        "abstention": 0,
+        "positions": {"for": [], "against": [], "abstention": []},
+        "intentions": {"for": [], "against": [], "abstention": []},
+    }
+
+
+def rollcall_votes(filepath):
+    """
+    Extracts the roll call votes (RCV) of a named voting XML document with lxml.iterparse.
+
+    Every vote is emitted with the ids of the members voting for, against or abstaining and the corrections of their votes (intentions).
+    Names and political groups are stored once per document in the member list instead of once per vote.
+    Elements are cleared as soon as they are processed, the memory usage is therefore bound by the largest vote instead of the whole document.
+
+    Args:
+        filepath (str): path to the XML file
+
+    Returns:
+        dict: dictionary with the keys "votes" and "members".
+            A vote consists out of id, date, description, the counts for, against and abstention and the member ids in positions and intentions.
+            A member consists out of id, name and political group.
+    """
+    votes = []
+    members = {}
+
+    vote = None
+    position = None
+    intention = False
+    group = None
+
+    for event, element in etree.iterparse(
+        filepath,
+        events=("start", "end"),
+        resolve_entities=False,
+        no_network=True,
+        huge_tree=True,
+    ):
+        tag = element.tag
+        if event == "start":
+            if tag == "RollCallVote.Result":
+                vote = _new_vote(element)
+            elif tag in POSITIONS and vote is not None:
+                position = POSITIONS[tag]
+                intention = tag.startswith("Intention.")
+                if not intention and element.get("Number", "").isdigit():
+                    vote[position] = int(element.get("Number"))
+            elif tag == "Result.PoliticalGroup.List":
+                group = element.get("Identifier")
+            continue
+
+        if vote is None:
+            continue
+
+        if tag.endswith("Member.Name") and position is not None:
+            name = _text(element)
+            member_id = element.get("MepId") or element.get("PersId") or name
+            if member_id not in members:
+                members[member_id] = {"id": member_id, "name": name, "group": group}
+            elif group and not members[member_id]["group"]:
+                # intentions list members without their political group
+                members[member_id]["group"] = group
+            vote["intentions" if intention else "positions"][position].append(member_id)
+            element.clear(keep_tail=True)
+        elif tag == "RollCallVote.Description.Text":
+            vote["description"] = _text(element)
+        elif tag in POSITIONS:
+            if not intention and not vote[position]:
+                vote[position] = len(vote["positions"][position])
+            position = None
+        elif tag == "Result.PoliticalGroup.List":
+            group = None
+        elif tag == "RollCallVote.Result":
+            votes.append(vote)
+            vote = None
+            # drop the processed vote and its predecessors from the partial tree
+            element.clear(keep_tail=True)
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    return {"votes": votes, "members": list(members.values())}
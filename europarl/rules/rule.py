@@ -4,6 +4,8 @@ from abc import ABC
 from datetime import date
 from pathlib import Path
 
+from europarl.rules.extraction import extraction_backends
+
 BASE_URL = "https://europarl.europa.eu/doceo/document/"
 
 
@@ -68,6 +70,9 @@ class Rule(ABC):
     A derived class has to provide the attributes
     name, language, and format with values and has
     to implement the functions extract_data() and url()
+    The optional attribute extraction_backend selects the text extraction
+    backend which is tried first for the format of the rule. extractor_version
+    has to be increased whenever extract_data() returns different data
 
     Raises:
         NotImplementedError: If name, language, format, extract_data() or url() are not set up
@@ -79,6 +84,8 @@ class Rule(ABC):
     name = None
     language = None
     format = None
+    extraction_backend = None
+    extractor_version = 1
     document_type = SESSION_DOC
 
     def __init__(self):
@@ -116,6 +123,21 @@ class Rule(ABC):
     def get_filename(cls):
         return cls.name + cls.format
 
+    @classmethod
+    def extractor_id(cls):
+        """
+        Identifies the extractor of the rule for caching extracted data.
+        The id changes with the extractor version and with the backends available for the format.
+
+        Returns:
+            str: versioned id of the extractor
+        """
+        return "{}-v{}-{}".format(
+            cls.name,
+            cls.extractor_version,
+            "+".join(extraction_backends.all.get(cls.format, {})),
+        )
+
     @classmethod
     def extract_data(cls, filepath):
         """
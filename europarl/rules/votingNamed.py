@@ -1,4 +1,7 @@
+import logging
+
 from europarl.rules.extraction import filecontent, filesize
+from europarl.rules.rcvextraction import rollcall_votes
 from europarl.rules.rule import BASE_URL, Rule, get_term, rule_registry
 
 
@@ -35,17 +38,22 @@ class NamedVotingRule(Rule):
     @classmethod
     def extract_data(cls, filepath):
         """
-        Extracts the filesize and filecontent of a passed in file
+        Extracts the filesize, filecontent and the roll call votes of a passed in file
 
         Args:
             filepath (str): path to the file
 
         Returns:
-            dict: dictionary containing filesize and content of the the document
+            dict: dictionary containing filesize, content, votes and members of the the document
         """
         data = {}
         data.update(filesize(filepath))
-        data.update(filecontent(filepath, cls.format))
+        data.update(filecontent(filepath, cls.format, cls.extraction_backend))
+        try:
+            data.update(rollcall_votes(filepath))
+        except Exception as e:
+            logging.error(e)
+            data.update({"votes": None, "members": None})
         return data
 
 
@@ -45,7 +45,7 @@ class VotingOverviewRule(Rule):
         """
         data = {}
         data.update(filesize(filepath))
-        data.update(filecontent(filepath, cls.format))
+        data.update(filecontent(filepath, cls.format, cls.extraction_backend))
         return data
 
 
@@ -1,3 +1,4 @@
+from .asyncdocumentdownloader import AsyncDocumentDownloader
 from .dateurlgenerator import DateUrlGenerator
 from .documentdownloader import DocumentDownloader
 from .indexer import Indexer
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from europarl.workers.documentdownloader import DocumentDownloader
+
+
+class AsyncDocumentDownloader(DocumentDownloader):
+    """
+    Worker responsible for downloading documents with many requests in flight.
+
+    Instead of handling one token at a time, this worker runs an asyncio event loop with a configurable amount of fetchers.
+    Every fetcher waits for a token from the token bucket, takes a url and downloads it.
+    All fetchers share one pooled requests session, so connections and TLS sessions are reused between downloads.
+    The blocking requests are run in a thread pool, while all database interactions happen on the event loop thread, which keeps the single database connection of the worker out of the threads.
+    """
+
+    def startup(self):
+        """
+        Sets up the shared session and the thread pool used for the requests
+        """
+        super().startup()
+
+        self.CONCURRENCY = int(self.config.get("Concurrency", 4))
+
+        self.session = self.create_session(pool_size=self.CONCURRENCY)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.CONCURRENCY, thread_name_prefix=self.name
+        )
+        self.stopped = False
+        # running downloads by fetcher, they are recorded on shutdown if their fetcher didn't
+        self.in_flight = {}
+
+        self.logger.info(
+            "{} running with {} concurrent fetchers".format(self.name, self.CONCURRENCY)
+        )
+
+    def shutdown(self):
+        """
+        Waits for the running downloads and records them before the open batch is committed.
+        Downloads which didn't start yet are cancelled. Closes the shared session and the thread pool afterwards.
+        """
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.record_in_flight()
+        super().shutdown()
+        self.session.close()
+
+    def record_in_flight(self):
+        """
+        Records the downloads which finished after their fetcher was stopped, every stored file gets its database record.
+        """
+        for url, future in self.in_flight.values():
+            if future.cancelled():
+                continue
+            try:
+                resp, document = future.result()
+            except requests.RequestException as e:
+                self.record_exception(url, e)
+                continue
+            except Exception as e:
+                self.logger.error("Download of {} failed: {}".format(url["url"], e))
+                continue
+            self.record_response(url, resp, document)
+        self.in_flight = {}
+
+    def stopping(self):
+        """
+        Returns:
+            bool: True if the fetchers should stop
+        """
+        return self.shutdown_event.is_set() or self.stopped
+
+    def main_loop(self):
+        self.logger.log(logging.DEBUG, "Entering AsyncDocumentDownloader.main_loop")
+        asyncio.run(self.run_fetchers())
+
+    async def run_fetchers(self):
+        """
+        Runs all fetchers until the shutdown event is set or an END message is received
+        """
+        await asyncio.gather(
+            *[self.fetcher(fetcher_id) for fetcher_id in range(self.CONCURRENCY)]
+        )
+
+    async def fetcher(self, fetcher_id):
+        """
+        Downloads urls as long as tokens are provided.
+        Without a url the token is returned and the fetcher blocks on the url queue, like DocumentDownloader.main_func does.
+        A url which couldn't be downloaded because of a request exception is retried with the next token.
+        The shutdown event is checked after every blocking call.
+
+        Args:
+            fetcher_id (int): number of the fetcher, used for logging
+        """
+        loop = asyncio.get_running_loop()
+        url = None
+
+        while not self.stopping():
+            token = await loop.run_in_executor(
+                self.executor, self.work_q.safe_get, self.MAX_IDLE_WAIT_SECS
+            )
+            # commit a batch which is older than CommitIntervalSecs even if no download happens
+            self.commit_records(force=False)
+            if not token:
+                continue
+            if token == "END":
+                self.stopped = True
+                break
+
+            if url is None:
+                url = self.get_url(None)
+
+                if url is None:
+                    self.work_q.safe_put(token)
+                    # block on the url queue instead of polling it, the url is used with the next token
+                    url_id = await loop.run_in_executor(
+                        self.executor, self.url_q.safe_get, self.MAX_IDLE_WAIT_SECS
+                    )
+                    url = self.claim_url(url_id)
+                    continue
+
+            if self.stopping():
+                break
+
+            self.logger.debug("Fetcher {} got url {}".format(fetcher_id, url["id"]))
+
+            future = self.executor.submit(self.fetch, self.session, url, self.ua.random)
+            self.in_flight[fetcher_id] = (url, future)
+            try:
+                resp, document = await asyncio.wrap_future(future)
+            except requests.RequestException as e:
+                del self.in_flight[fetcher_id]
+                self.record_exception(url, e)
+                await loop.run_in_executor(
+                    self.executor,
+                    self.shutdown_event.wait,
+                    self.DEFAULT_POLLING_TIMEOUT,
+                )
+                continue
+
+            del self.in_flight[fetcher_id]
+            self.record_response(url, resp, document)
+            url = None
@@ -1,14 +1,15 @@
-import time
 from datetime import datetime, timedelta, timezone
 from queue import Full
 
 from europarl.db import DBInterface, Rules, SessionDay, URLs
 from europarl.mptools import ProcWorker
+from europarl.rules.rule import rule_registry
 
 
 class DateUrlGenerator(ProcWorker):
     def init_args(self, args):
-        (self.url_q,) = args
+        self.url_q, *session_bell = args
+        self.session_bell = session_bell[0] if session_bell else None
 
     def startup(self):
         super().startup()
@@ -20,14 +21,21 @@ class DateUrlGenerator(ProcWorker):
 
         self.urls = URLs(self.db)
         self.rules = Rules(self.db)
+        self.listener = None
+        if self.config.get("Notifications", "false").lower() == "true":
+            self.listener = self.db.listen("pending_combos")
 
         self.todo_date_rule_combos = []
+        self.url_buffer = []
         self.url_id = None
         self.url_string = None
         self.logger.info("{} started".format(self.name))
 
     def shutdown(self):
         super().shutdown()
+        if self.listener is not None:
+            self.listener.close()
+        self.db.close()
 
     def get_new_combos(self, limit):
         """
@@ -43,34 +51,33 @@ class DateUrlGenerator(ProcWorker):
 
         combos = self.urls.get_todo_rule_and_date_combos(limit=limit)
 
-        # got no new combinations from db. sleep for the polling timeout before retrying
-        if len(combos) == 0:
-            time.sleep(self.DEFAULT_POLLING_TIMEOUT)
-        else:
+        if len(combos) > 0:
             self.logger.info(
                 "Got {} new combinations from database".format(len(combos))
             )
 
         return combos
 
-    def create_url(self, combo):
+    def create_urls(self, combos):
         """
-        Creates a url based upon a rule and date combination
+        Creates the urls for multiple rule and date combinations at once.
+        The urls are rendered through the rule registry and stored with a single statement.
 
         Args:
-            combo (dict): rule and date combination dictionary
+            combos (list of dict): rule and date combination dictionaries
 
         Returns:
-            tuple: url_id and url_string
+            list of tuples: tuples consisting out of the url_id and the url string
         """
-        self.logger.debug(
-            "Applying rule: {} to date: {}".format(combo["rulename"], combo["date"])
-        )
-        url_id, url_string = self.rules.apply_rule(
-            date_id=combo["date_id"], rule_id=combo["rule_id"]
-        )
-        self.logger.debug("Result: {}".format(url_string))
-        return url_id, url_string
+        rows = []
+        for combo in combos:
+            rule = rule_registry.all[combo["rulename"]]
+            rows.append((combo["date_id"], combo["rule_id"], rule.url(combo["date"])))
+
+        urls = self.urls.save_urls(rows)
+        self.logger.debug("Stored {} urls".format(len(urls)))
+
+        return [(url_id, url_string) for url_id, date_id, rule_id, url_string in urls]
 
     def enqueue_url(self, url_id, url_string):
         """
@@ -96,21 +103,29 @@ class DateUrlGenerator(ProcWorker):
     def main_func(self):
         """
         Continuously enqueue new urls.
-        First block sets up a buffer of date and rule combinations.
-        This buffer is then iteratively consumed with every iteration, urls created, stored and enqueued
+        First block claims a batch of date and rule combinations and stores their urls in one transaction, a failure in between returns the combinations to the pending ones.
+        The resulting buffer of urls is then iteratively consumed with every iteration and enqueued
+        Without new combinations the generator waits until the SessionDayChecker confirms a session day or the idle wait is over.
+        With notifications enabled it waits for new pending combinations instead, which includes rules activated by other processes.
         """
 
-        if len(self.todo_date_rule_combos) == 0:
-            self.todo_date_rule_combos = self.get_new_combos(limit=self.PREFETCH_LIMIT)
-            if len(self.todo_date_rule_combos) == 0:
-                time.sleep(self.DEFAULT_POLLING_TIMEOUT * 10)
+        if self.url_id is None and len(self.url_buffer) == 0:
+            with self.db.transaction():
+                self.todo_date_rule_combos = self.get_new_combos(
+                    limit=self.PREFETCH_LIMIT
+                )
+                if len(self.todo_date_rule_combos) > 0:
+                    self.url_buffer = self.create_urls(self.todo_date_rule_combos)
 
+            if len(self.todo_date_rule_combos) == 0:
+                self.wait_for_work(self.listener or self.session_bell)
+                return
+            self.reset_idle_wait()
+            self.todo_date_rule_combos = []
             return
 
         if self.url_id is None:
-            self.url_id, self.url_string = self.create_url(
-                combo=self.todo_date_rule_combos.pop()
-            )
+            self.url_id, self.url_string = self.url_buffer.pop()
 
         self.url_id, self.url_string = self.enqueue_url(
             url_id=self.url_id, url_string=self.url_string
@@ -10,7 +10,15 @@ import requests
 from fake_useragent import UserAgent
 
 from europarl.db import DBInterface, Documents, Request, URLs
+from europarl.downloader import conditional_headers
+from europarl.filestore import (
+    CHUNK_SIZE,
+    content_uuid,
+    store_content_addressed,
+    stream_response_to_file,
+)
 from europarl.mptools import QueueProcWorker
+from europarl.ratelimiter import status_report
 
 
 class DocumentDownloader(QueueProcWorker):
@@ -19,6 +27,8 @@ class DocumentDownloader(QueueProcWorker):
     """
 
     DATAPATH = "../data/"
+    COMMIT_EVERY = 1
+    COMMIT_INTERVAL_SECS = 0
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -27,21 +37,32 @@ class DocumentDownloader(QueueProcWorker):
         (
             self.work_q,
             self.url_q,
+            *status_q,
         ) = args
+        self.status_q = status_q[0] if status_q else None
 
     def startup(self):
         """"""
         super().startup()
 
         self.DATAPATH = self.config["Path"]
+        self.STORAGE = self.config.get("Storage", "uuid")
         self.REQUEST_TIMEOUT = float(self.config["RequestTimeoutFactor"]) * float(
             self.config["StopWaitSecs"]
         )
 
         self.ua = UserAgent()
 
+        self.COMMIT_EVERY = int(self.config.get("CommitEvery", self.COMMIT_EVERY))
+        self.COMMIT_INTERVAL_SECS = float(
+            self.config.get("CommitIntervalSecs", self.COMMIT_INTERVAL_SECS)
+        )
+
         self.db = DBInterface(config=self.config)
         self.db.connection_name = self.name
+        # writes of the open batch as tuples of the write function, its arguments and the url to release after the commit
+        self.pending_records = []
+        self.batch_started = None
 
         self.request = Request(self.db)
         self.url = URLs(self.db)
@@ -49,7 +70,7 @@ class DocumentDownloader(QueueProcWorker):
 
         self.logger.info("{} started".format(self.name))
 
-        self.url_id, self.url_str = None, None
+        self.current_url = None
 
         self.headers = {
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
@@ -60,91 +81,326 @@ class DocumentDownloader(QueueProcWorker):
         }
 
     def shutdown(self):
-        """"""
+        """
+        Commits the records which are still part of an open batch
+        """
         super().shutdown()
+        self.commit_records()
 
-    def main_func(self, token):
+    def batch_record(self, write, *args, release=None):
         """
-        This method downloads documents.
-        It gets called whenever a new request token is provided by the throttling mechanism. It then tries to get a new URL from the url work queue. The token is returned if no work is available.
-        Otherwise a new session with a random user agent is generated, a download is triggered, a downloaded file is stored and the request logged.
+        Runs the database writes of a download as part of a batch, which groups the writes of multiple downloads into one transaction.
+        The transaction is committed after CommitEvery downloads or when the oldest record is older than CommitIntervalSecs.
+        Claimed urls are only released after their records were committed, a worker which stops before the commit hands them back to the url queue.
+        A database error rolls back the batch, the writes of the earlier downloads are replayed and committed before the error is raised.
 
         Args:
-            token (str): Request throttling token that is provided by the token bucket
+            write (function): function doing the database writes, called with the remaining positional arguments
+            release (int, optional): id of the claimed url which is released after the commit
         """
-        # get url
-        if not self.url_id:
-            self.logger.debug("Getting new URL")
-            self.url_id = self.url_q.safe_get()
+        if not self.db.in_transaction():
+            self.db.begin()
+            self.batch_started = time.monotonic()
 
-            if self.url_id is None:
-                self.work_q.safe_put(token)
-                time.sleep(self.DEFAULT_POLLING_TIMEOUT)
-                self.logger.debug("No work - returning")
-                return
+        try:
+            write(*args)
+        except BaseException:
+            self.db.rollback()
+            records, self.pending_records = self.pending_records, []
+            if len(records) > 0:
+                self.logger.warn(
+                    "Rolled back batch, replaying {} earlier records".format(
+                        len(records)
+                    )
+                )
+                self.replay_records(records)
+            raise
 
-            url = self.url.get_url(id=self.url_id)
-            self.url_str = url["url"]
-            self.filetype = url["filetype"]
+        self.pending_records.append((write, args, release))
+        self.commit_records(force=False)
 
+    def replay_records(self, records):
+        """
+        Writes the records of a rolled back batch again in a new transaction and commits them
+
+        Args:
+            records (list of tuples): pending records of the rolled back batch
+        """
+        self.db.begin()
         try:
+            for write, args, release in records:
+                write(*args)
+        except BaseException:
+            self.db.rollback()
+            raise
+        self.db.commit()
+        self.release_records(records)
+
+    def release_records(self, records):
+        """
+        Releases the claimed urls of committed records
+
+        Args:
+            records (list of tuples): committed records
+        """
+        for write, args, release in records:
+            if release is not None:
+                self.release_item(release)
 
-            self.logger.debug("Downloading: {}".format(self.url_str))
+    def commit_records(self, force=True):
+        """
+        Commits the open batch of records and releases their urls
 
-            with requests.Session() as ses:
-                ses.headers = self.headers
-                ses.headers["User-Agent"] = self.ua.random
-                resp = ses.get(
-                    self.url_str,
-                    allow_redirects=True,
-                    timeout=self.REQUEST_TIMEOUT,
-                )
+        Args:
+            force (bool, optional): commits even if the batch isn't full or due yet. Defaults to True.
+        """
+        if not self.db.in_transaction():
+            return
+
+        due = (
+            len(self.pending_records) >= self.COMMIT_EVERY
+            or time.monotonic() - self.batch_started >= self.COMMIT_INTERVAL_SECS
+        )
+        if force or due:
+            self.logger.debug("Committing {} records".format(len(self.pending_records)))
+            self.db.commit()
+            records, self.pending_records = self.pending_records, []
+            self.release_records(records)
+
+    def get_url(self, *args):
+        """
+        Takes the next url id from the url work queue and looks up the url.
+
+        Args:
+            *args: passed on to ``MPQueue.safe_get``, e.g. ``None`` for a non-blocking call
+
+        Returns:
+            dict: dictionary containing id, url and filetype. None if no work is available.
+        """
+        return self.claim_url(self.url_q.safe_get(*args))
+
+    def claim_url(self, url_id):
+        """
+        Claims a url id taken from the url work queue and looks up the url.
+        A claimed url is put back on the url queue if the worker is stopped or crashes before the url is released.
+
+        Args:
+            url_id (int): id of the url, None if the url queue was empty
+
+        Returns:
+            dict: dictionary containing id, url and filetype. None if no url id was passed.
+        """
+        if url_id is None:
+            return None
+        self.claim_item(url_id)
+        return self.url.get_url(id=url_id)
+
+    def create_session(self, pool_size=None):
+        """
+        Creates a requests session which is set up with the default headers.
+
+        Args:
+            pool_size (int, optional): Amount of connections the session keeps open to a host. Defaults to the requests default.
+
+        Returns:
+            requests.Session: session object
+        """
+        session = requests.Session()
+        session.headers.update(self.headers)
+        if pool_size:
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=pool_size, pool_maxsize=pool_size
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        return session
+
+    def fetch(self, session, url, user_agent):
+        """
+        Downloads a url and streams the document to disk if the request was successfull.
+        The body is never held in memory as a whole. Its SHA-256 fingerprint and size are calculated while it is written.
+        If validators of an earlier response are known for the url, the request is sent as a conditional request. A 304 response means the document is unchanged and nothing is stored.
+        This method doesn't touch the database and can therefore be run outside of the workers main thread.
+
+        Args:
+            session (requests.Session): session to make the request with
+            url (dict): url dictionary as returned by get_url
+            user_agent (str): user agent string used for this request
+
+        Returns:
+            tuple: response object and a dictionary describing the stored document, which is None if nothing was stored
+        """
+        self.logger.debug("Downloading: {}".format(url["url"]))
+
+        headers = {"User-Agent": user_agent}
+        headers.update(conditional_headers(url.get("etag"), url.get("last_modified")))
+
+        with session.get(
+            url["url"],
+            headers=headers,
+            allow_redirects=True,
+            timeout=self.REQUEST_TIMEOUT,
+            stream=True,
+        ) as resp:
             self.logger.debug(
-                "Response for: {} is {}".format(self.url_str, resp.status_code)
+                "Response for: {} is {}".format(url["url"], resp.status_code)
             )
 
-            doc_id = None
+            document = None
             # if successfull store file
             if resp.status_code == 200:
-                self.logger.debug("Storing file for {}".format(self.url_str))
-                file_uuid = str(uuid.uuid4())
-                filename = file_uuid + self.filetype
-                abspath = os.path.abspath(self.DATAPATH)
-                filepath = abspath + "/" + filename
+                self.logger.debug("Storing file for {}".format(url["url"]))
+                document = self.store(resp, url["filetype"])
 
-                open(filepath, "wb").write(resp.content)
+        return resp, document
 
-                doc_id = self.docs.register_document(
-                    filepath=filepath, filename=file_uuid
-                )
+    def store(self, resp, filetype):
+        """
+        Streams the body of a response to disk using the configured storage layout.
+
+        The "uuid" layout stores every download under a fresh uuid.
+        The "content" layout stores the file under its SHA-256 hash in a sharded directory structure. Identical content is only stored once and gets the same uuid, which lets the documents table link repeated downloads to the existing document.
 
-            self.request.mark_as_requested(
-                self.url_id,
-                status_code=resp.status_code,
-                redirected_url=resp.url,
-                document_id=doc_id,
+        Args:
+            resp (requests.Response): streamed response
+            filetype (str): file ending
+
+        Returns:
+            dict: dictionary describing the stored document
+        """
+        if self.STORAGE == "content":
+            filepath, sha256, filesize = store_content_addressed(
+                resp.iter_content(chunk_size=CHUNK_SIZE), self.DATAPATH, filetype
             )
+            file_uuid = content_uuid(sha256)
+        else:
+            file_uuid = str(uuid.uuid4())
+            filename = file_uuid + filetype
+            abspath = os.path.abspath(self.DATAPATH)
+            filepath = abspath + "/" + filename
+
+            sha256, filesize = stream_response_to_file(resp, filepath)
+
+        return {
+            "filepath": filepath,
+            "filename": file_uuid,
+            "sha256": sha256,
+            "filesize": filesize,
+        }
 
-            self.logger.info("Crawled: {}".format(self.url_str))
+    def report_status(self, status_code, url=None, resp=None):
+        """
+        Reports the status code, latency and Retry-After header of a request to the TokenBucketWorker if a status queue was passed.
+        A full status queue drops the report instead of blocking the download.
 
-            self.url_id, self.url_str, self.filetype = None, None, None
+        Args:
+            status_code (int): status code of the request
+            url (str, optional): requested url
+            resp (requests.Response, optional): response of the request
+        """
+        if self.status_q is not None:
+            self.status_q.safe_put(status_report(status_code, url, resp))
 
-        except requests.ReadTimeout as e:
+    def write_response(self, url, resp, document):
+        """
+        Registers a stored document and logs the request in the database.
+        The validators of a successfull response are stored for conditional requests.
 
-            self.logger.warn("Timeout for url: {}".format(self.url_str))
-            self.logger.warn("Exception Message: {}".format(e))
+        Args:
+            url (dict): url dictionary as returned by get_url
+            resp (requests.Response): response of the request
+            document (dict): stored document as returned by fetch or None
+        """
+        doc_id = None
+        if document is not None:
+            doc_id = self.docs.register_document(**document)
 
-            self.request.mark_as_requested(
-                url_id=self.url_id, status_code=408, redirected_url=self.url_str
+            etag, last_modified = resp.headers.get("ETag"), resp.headers.get(
+                "Last-Modified"
             )
-            time.sleep(self.DEFAULT_POLLING_TIMEOUT)
-            return
+            if etag or last_modified:
+                self.url.set_validators(url["id"], etag, last_modified)
+
+        self.request.mark_as_requested(
+            url["id"],
+            status_code=resp.status_code,
+            redirected_url=resp.url,
+            document_id=doc_id,
+        )
+
+    def record_response(self, url, resp, document):
+        """
+        Records a response in one transaction, which may be part of a batch. The url is released once the batch is committed.
+        A 304 response is logged as a request without a document, no file is stored and nothing is postprocessed.
+
+        Args:
+            url (dict): url dictionary as returned by get_url
+            resp (requests.Response): response of the request
+            document (dict): stored document as returned by fetch or None
+        """
+        self.batch_record(self.write_response, url, resp, document, release=url["id"])
+        self.report_status(resp.status_code, url["url"], resp)
+
+        if resp.status_code == 304:
+            self.logger.info("Unchanged: {}".format(url["url"]))
+        else:
+            self.logger.info("Crawled: {}".format(url["url"]))
+
+    def record_exception(self, url, exception):
+        """
+        Logs a failed request in the database.
+        Timeouts are logged with the status code 408 and all other request exceptions with 460.
+
+        Args:
+            url (dict): url dictionary as returned by get_url
+            exception (requests.RequestException): exception raised by the request
+        """
+        if isinstance(exception, requests.ReadTimeout):
+            self.logger.warn("Timeout for url: {}".format(url["url"]))
+            status_code = 408
+        else:
+            self.logger.warn("Request exception for url: {}".format(url["url"]))
+            status_code = 460
+        self.logger.warn("Exception Message: {}".format(exception))
+
+        self.batch_record(
+            self.request.mark_as_requested, url["id"], status_code, url["url"]
+        )
+        self.report_status(status_code, url["url"])
+
+    def main_func(self, token):
+        """
+        This method downloads documents.
+        It gets called whenever a new request token is provided by the throttling mechanism. It then tries to get a new URL from the url work queue. The token is returned if no work is available.
+        Otherwise a new session with a random user agent is generated, a download is triggered, a downloaded file is stored and the request logged.
+        A url which couldn't be requested because of a request exception is kept and retried with the next token.
+
+        Args:
+            token (str): Request throttling token that is provided by the token bucket
+        """
+        # commit a batch which is older than CommitIntervalSecs even if no download happens
+        self.commit_records(force=False)
+
+        # get url
+        if self.current_url is None:
+            self.logger.debug("Getting new URL")
+            self.current_url = self.get_url()
+
+            if self.current_url is None:
+                self.work_q.safe_put(token)
+                self.logger.debug("No work - waiting for the next url")
+                # block on the url queue instead of polling it, the url is used with the next token
+                self.current_url = self.get_url(self.MAX_IDLE_WAIT_SECS)
+                return
+
+        try:
+            with self.create_session() as ses:
+                resp, document = self.fetch(ses, self.current_url, self.ua.random)
+
+            self.record_response(self.current_url, resp, document)
+            self.current_url = None
 
         except requests.RequestException as e:
-            self.logger.warn("Request exception for url: {}".format(self.url_str))
-            self.logger.warn("Exception Message: {}".format(e))
-            self.request.mark_as_requested(
-                url_id=self.url_id, status_code=460, redirected_url=self.url_str
-            )
+            self.record_exception(self.current_url, e)
             time.sleep(self.DEFAULT_POLLING_TIMEOUT)
             return
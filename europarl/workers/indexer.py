@@ -36,12 +36,17 @@ class Indexer(ProcWorker):
         self.db = DBInterface(config=self.config)
         self.db.connection_name = self.name
         self.docs = Documents(self.db)
+        self.listener = None
+        if self.config.get("Notifications", "false").lower() == "true":
+            self.listener = self.db.listen("documents_unindexed")
 
         self.logger.info("{} started".format(self.name))
 
     def shutdown(self):
         """"""
         super().shutdown()
+        if self.listener is not None:
+            self.listener.close()
 
     def main_func(self):
         """
@@ -52,6 +57,7 @@ class Indexer(ProcWorker):
 
         """
 
+        documents = []
         try:
             documents = self.docs.get_unindexed_data(limit=self.PREFETCH_LIMIT)
 
@@ -84,4 +90,8 @@ class Indexer(ProcWorker):
             self.logger.error(e)
 
         finally:
-            time.sleep(self.DEFAULT_POLLING_TIMEOUT)
+            # back off while there is nothing to index
+            if len(documents) > 0:
+                self.reset_idle_wait()
+            else:
+                self.wait_for_work(self.listener)
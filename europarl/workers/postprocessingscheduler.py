@@ -1,4 +1,3 @@
-import time
 from datetime import datetime, timedelta, timezone
 from queue import Full
 
@@ -19,27 +18,51 @@ class PostProcessingScheduler(ProcWorker):
         self.db.connection_name = self.name
 
         self.documents = Documents(self.db)
+        self.listener = None
+        if self.config.get("Notifications", "false").lower() == "true":
+            self.listener = self.db.listen("documents_unprocessed")
         self.todo_documents = []
         self.current_document = None
         self.logger.info("{} started".format(self.name))
 
     def shutdown(self):
         super().shutdown()
+        if self.listener is not None:
+            self.listener.close()
+        self.release_documents()
+
+    def release_documents(self):
+        """
+        Returns the claimed documents which weren't queued up yet, other schedulers claim them again.
+        """
+        documents = list(self.todo_documents)
+        if self.current_document is not None:
+            documents.append(self.current_document)
+        if len(documents) == 0:
+            return
+
+        self.documents.release_documents([item["document"]["id"] for item in documents])
+        self.logger.info("Released {} claimed documents".format(len(documents)))
+        self.todo_documents = []
+        self.current_document = None
 
     def main_func(self):
         """
-        This function requests a number of unpostprocessed documents from the database and enqueues them into the postprocessing queue.
+        This function claims a number of unpostprocessed documents from the database and enqueues them into the postprocessing queue.
+        Claimed documents are already marked as enqueued, which allows multiple schedulers to run at the same time.
+        Documents which are still claimed but not queued up when the scheduler stops are released by shutdown.
         """
 
         if len(self.todo_documents) == 0:
             self.logger.debug("Requesting new documents")
-            self.todo_documents = self.documents.get_unprocessed_documents(
+            self.todo_documents = self.documents.claim_unprocessed_documents(
                 limit=self.PREFETCH_LIMIT
             )
             if len(self.todo_documents) == 0:
-                time.sleep(self.DEFAULT_POLLING_TIMEOUT * 10)
                 self.logger.debug("No new documents recieved")
+                self.wait_for_work(self.listener)
             else:
+                self.reset_idle_wait()
                 self.logger.debug(
                     "Recieved {} new documents".format(len(self.todo_documents))
                 )
@@ -48,7 +71,6 @@ class PostProcessingScheduler(ProcWorker):
 
         if self.current_document is None:
             self.current_document = self.todo_documents.pop()
-            self.documents.mark_as_enqueued(self.current_document["document"]["id"])
 
         try:
             self.logger.debug(
@@ -11,6 +11,7 @@ from elasticsearch import Elasticsearch
 
 from europarl import rules
 from europarl.db import DBInterface, Documents, Request, URLs
+from europarl.extractioncache import ExtractionCache, file_sha256
 from europarl.mptools import QueueProcWorker
 from europarl.rules.rule import rule_registry
 
@@ -28,11 +29,57 @@ class PostProcessingWorker(QueueProcWorker):
 
         self.docs = Documents(self.db)
 
+        rules.extraction.pdf_extractor.configure(self.config)
+
+        self.cache = None
+        if self.config.get("ExtractionCachePath"):
+            self.cache = ExtractionCache(
+                self.config["ExtractionCachePath"],
+                int(self.config.get("ExtractionCacheSizeMB", 1024)) * 1024 * 1024,
+            )
+
         self.logger.info("{} started".format(self.name))
 
     def shutdown(self):
-        """"""
+        """
+        Terminates the processes extracting the PDFs
+        """
         super().shutdown()
+        rules.extraction.pdf_extractor.close()
+
+    def extract_data(self, rule, filepath, sha256=None):
+        """
+        Extracts the data of a document with its rule or takes it from the extraction cache.
+        Data containing failed values (None) isn't cached, the next run retries it.
+
+        Args:
+            rule (Rule): rule of the document
+            filepath (str): path to the document
+            sha256 (str, optional): hex encoded SHA-256 digest of the document. Calculated from the file if it is unknown.
+
+        Returns:
+            dict: extracted data
+        """
+        if self.cache is None:
+            return rule.extract_data(filepath)
+
+        if sha256 is None:
+            try:
+                sha256 = file_sha256(filepath)
+            except OSError:
+                # the rule logs the unreadable file and returns failed values
+                return rule.extract_data(filepath)
+        extractor_id = rule.extractor_id()
+
+        document_data = self.cache.get(sha256, extractor_id)
+        if document_data is not None:
+            self.logger.debug("Took the data of {} from the cache".format(filepath))
+            return document_data
+
+        document_data = rule.extract_data(filepath)
+        if None not in document_data.values():
+            self.cache.put(sha256, extractor_id, document_data)
+        return document_data
 
     def main_func(self, document):
         """
@@ -45,8 +92,10 @@ class PostProcessingWorker(QueueProcWorker):
             metadata = self.docs.get_metadata(document["document"]["id"])
 
             document_data = None
-            document_data = rule_registry.all[document["rule"]["name"]].extract_data(
-                document["document"]["filepath"]
+            document_data = self.extract_data(
+                rule_registry.all[document["rule"]["name"]],
+                document["document"]["filepath"],
+                metadata.get("sha256"),
             )
 
             data = {**metadata, **document_data}
@@ -1,25 +1,33 @@
 import logging
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from multiprocessing.queues import Full
 
 import requests
 
-from europarl.db import DBInterface, Request, Rules, SessionDay
+from europarl.db import DBInterface, Request, Rules, SessionDay, URLs
 from europarl.mptools import QueueProcWorker
+from europarl.ratelimiter import status_report
 from europarl.rules.protocol import SessionDayRule
 
 
 class SessionDayChecker(QueueProcWorker):
+    """
+    Worker responsible for checking if a plenary session took place on a given day.
+
+    With a BatchSize larger than one, the worker collects up to BatchSize tokens and checks as many dates at once.
+    All dates and urls are stored with one statement each, the HEAD requests are made concurrently and all requests are logged with a single multi-row insert.
+    """
 
     PREFETCH_LIMIT = 100
+    BATCH_SIZE = 1
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.dates_to_check = []
 
     def init_args(self, args):
-        (self.work_q,) = args
+        # the status queue and the doorbell which is rung for confirmed session days are optional
+        self.work_q, self.status_q, self.session_bell = (*args, None, None)[:3]
 
     def startup(self):
         """
@@ -28,6 +36,7 @@ class SessionDayChecker(QueueProcWorker):
         super().startup()
 
         self.PREFETCH_LIMIT = int(self.config["PrefetchLimit"])
+        self.BATCH_SIZE = int(self.config.get("BatchSize", 1))
 
         self.db = DBInterface(config=self.config)
         self.db.connection_name = self.name
@@ -35,9 +44,22 @@ class SessionDayChecker(QueueProcWorker):
         self.sessionDay = SessionDay(self.db)
         self.request = Request(self.db)
         self.rules = Rules(self.db)
+        self.urls = URLs(self.db)
+        self.session_day_rule_id = None
 
         self.session = requests.Session()
 
+        self.executor = None
+        if self.BATCH_SIZE > 1:
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=self.BATCH_SIZE, pool_maxsize=self.BATCH_SIZE
+            )
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.BATCH_SIZE, thread_name_prefix=self.name
+            )
+
         self.url, self.url_id = None, None
 
         self.sleep_end = datetime.now(timezone.utc) - timedelta(hours=1)
@@ -46,12 +68,13 @@ class SessionDayChecker(QueueProcWorker):
 
     def shutdown(self):
         """
-        Cleans up by closing the requests-session and deleting the
-        sessionDay which will close the database connection
+        Cleans up by closing the requests-session and the database connections
         """
         super().shutdown()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
         self.session.close()
-        del self.sessionDay
+        self.db.close()
 
     def check_for_sleep(self, current_time, sleep_end):
         """
@@ -59,8 +82,7 @@ class SessionDayChecker(QueueProcWorker):
         We don't want to hammer the database with request every 100ms, querying
         if a new day has started. This function checks if a sleeping time window is over. This information can be used to return the main function early or continue computing.
 
-        We don't want to block and time.sleep() for the duration of the sleep.
-        This would block and make the process not responsive to the quit signal.
+        The main loop blocks on the shutdown event for the rest of the window, which keeps the process responsive to the quit signal.
 
         Args:
             current_time (datetime): current execution timestamp
@@ -95,6 +117,138 @@ class SessionDayChecker(QueueProcWorker):
                 self.set_sleep(timedelta(minutes=1))
                 return None
 
+    def get_new_dates(self, amount):
+        """
+        Gets up to amount dates to check from the prefetched dates or the database
+
+        Args:
+            amount (int): maximal amount of dates
+
+        Returns:
+            list of datetime.date: dates to check, empty if the database returned no dates
+        """
+        dates = []
+        while len(dates) < amount:
+            if len(self.dates_to_check) == 0 and len(dates) > 0:
+                # don't query the database again for a partially filled batch
+                break
+            date = self.get_new_date()
+            if date is None:
+                break
+            dates.append(date)
+        return dates
+
+    def collect_tokens(self, token):
+        """
+        Collects the passed token and up to BATCH_SIZE - 1 additional tokens that are already available in the token bucket.
+        Only tokens which are available right now are taken, this keeps the batch within the token budget.
+
+        Args:
+            token (str): token passed to main_func
+
+        Returns:
+            list of str: collected tokens
+        """
+        tokens = [token]
+        while len(tokens) < self.BATCH_SIZE:
+            token = self.work_q.safe_get(None)
+            if not token:
+                break
+            if token == "END":
+                # keep the termination message for the main loop
+                self.work_q.safe_put(token)
+                break
+            tokens.append(token)
+        return tokens
+
+    def probe(self, url):
+        """
+        Makes a HEAD request for a url. Request exceptions are mapped to the status codes used by crawl.
+
+        Args:
+            url (str): url to probe
+
+        Returns:
+            tuple: status code and the final url after following all redirects
+        """
+        try:
+            resp = self.session.head(url, allow_redirects=True)
+            return resp.status_code, resp.url
+        except requests.ReadTimeout as e:
+            self.logger.warn("Timeout for url: {}".format(url))
+            self.logger.warn("Exception Message: {}".format(e))
+            return 408, url
+        except requests.RequestException as e:
+            self.logger.warn("Request exception for url: {}".format(url))
+            self.logger.warn("Exception Message: {}".format(e))
+            return 460, url
+
+    def report_status(self, status_code, url=None, resp=None):
+        """
+        Reports the status code, latency and Retry-After header of a request to the TokenBucketWorker if a status queue was passed.
+
+        Args:
+            status_code (int): status code of the request
+            url (str, optional): requested url
+            resp (requests.Response, optional): response of the request
+        """
+        if self.status_q is not None:
+            self.status_q.safe_put(status_report(status_code, url, resp))
+
+    def ring_session_bell(self):
+        """
+        Wakes up the DateUrlGenerator after a session day was confirmed, if a doorbell was passed.
+        """
+        if self.session_bell is not None:
+            self.session_bell.ring()
+
+    def crawl_batch(self, dates):
+        """
+        Checks multiple dates at once.
+        All dates and urls are stored with one statement each, the urls are probed concurrently and all requests are logged with one statement.
+
+        Args:
+            dates (list of datetime.date): dates to check
+        """
+        if self.session_day_rule_id is None:
+            self.session_day_rule_id = self.rules.get_rule(
+                rulename=SessionDayRule.name
+            )[0]
+
+        date_ids = self.sessionDay.insert_dates(dates)
+        urls = self.urls.save_urls(
+            [
+                (date_id, self.session_day_rule_id, SessionDayRule.url(date))
+                for date_id, date in date_ids
+            ]
+        )
+        dates_by_id = dict(date_ids)
+
+        self.logger.debug("Crawling {} urls".format(len(urls)))
+
+        results = list(self.executor.map(self.probe, [url[3] for url in urls]))
+
+        rows = []
+        for (url_id, date_id, rule_id, url), (status_code, redirected_url) in zip(
+            urls, results
+        ):
+            rows.append((url_id, status_code, redirected_url))
+            self.report_status(status_code, url)
+
+            if status_code == 200:
+                self.logger.info(
+                    "Identified session on the: {}".format(dates_by_id[date_id])
+                )
+
+            if status_code == 404:
+                self.logger.info(
+                    "Identified no session on the: {}".format(dates_by_id[date_id])
+                )
+
+        self.request.mark_many_as_requested(rows)
+        if any(row[1] == 200 for row in rows):
+            self.ring_session_bell()
+
     def crawl(self, session, date):
         """
         Generates a url to crawls based upon the passed in
@@ -130,10 +284,12 @@ class SessionDayChecker(QueueProcWorker):
                 status_code=resp.status_code,
                 redirected_url=resp.url,
             )
+            self.report_status(resp.status_code, self.url, resp)
             self.logger.debug("Server response: {}".format(resp.status_code))
 
             if resp.status_code == 200:
                 self.logger.info("Identified session on the: {}".format(date))
+                self.ring_session_bell()
 
             if resp.status_code == 404:
                 self.logger.info("Identified no session on the: {}".format(date))
@@ -148,7 +304,8 @@ class SessionDayChecker(QueueProcWorker):
             self.request.mark_as_requested(
                 url_id=self.url_id, status_code=408, redirected_url=self.url
             )
-            time.sleep(self.DEFAULT_POLLING_TIMEOUT)
+            self.report_status(408, self.url)
+            self.shutdown_event.wait(self.DEFAULT_POLLING_TIMEOUT)
             return
 
         except requests.RequestException as e:
@@ -157,7 +314,8 @@ class SessionDayChecker(QueueProcWorker):
             self.request.mark_as_requested(
                 url_id=self.url_id, status_code=460, redirected_url=self.url
             )
-            time.sleep(self.DEFAULT_POLLING_TIMEOUT)
+            self.report_status(460, self.url)
+            self.shutdown_event.wait(self.DEFAULT_POLLING_TIMEOUT)
             return
 
     def set_sleep(self, delta):
@@ -170,20 +328,58 @@ class SessionDayChecker(QueueProcWorker):
         self.logger.debug("Setting sleep (next iteration) for: {}".format(delta))
         self.sleep_end = datetime.now(tz=timezone.utc) + delta
 
+    def remaining_sleep_secs(self):
+        """
+        Returns:
+            float: seconds until the sleep time window is over, 0 if the worker isn't sleeping
+        """
+        remaining = self.sleep_end - datetime.now(timezone.utc)
+        return max(0.0, remaining.total_seconds())
+
+    def main_loop(self):
+        """
+        Takes a token from the token bucket for every check.
+        While sleeping the worker blocks on the shutdown event instead of taking tokens, which leaves them to the other workers.
+        """
+        self.logger.debug("Entering SessionDayChecker.main_loop")
+        while not self.shutdown_event.is_set():
+            remaining = self.remaining_sleep_secs()
+            if remaining > 0:
+                self.logger.debug("Sleeping for {} seconds".format(remaining))
+                self.shutdown_event.wait(remaining)
+                continue
+
+            token = self.work_q.safe_get(self.MAX_IDLE_WAIT_SECS)
+            if not token:
+                continue
+            if token == "END":
+                break
+            self.main_func(token)
+
     def main_func(self, token):
 
         # check if function should return early because it is still sleeping
         if self.check_for_sleep(
             current_time=datetime.now(timezone.utc), sleep_end=self.sleep_end
         ):
-            self.logger.debug("Returning token to bucket")
             # put "consumed token back on queue, because no crawling work was done"
-            try:
-                self.work_q.put(token, timeout=self.DEFAULT_POLLING_TIMEOUT)
-            except Full:
-                pass
+            self.work_q.safe_put(token)
             self.logger.debug("Still sleeping, Returned Token to Bucket")
-            time.sleep(self.DEFAULT_POLLING_TIMEOUT)
+            return
+
+        if self.BATCH_SIZE > 1:
+            tokens = self.collect_tokens(token)
+            dates = self.get_new_dates(len(tokens))
+
+            # return tokens which aren't used by this batch
+            for unused_token in tokens[len(dates) :]:
+                self.work_q.safe_put(unused_token)
+
+            if len(dates) > 0:
+                self.logger.debug("Checking dates: {}".format(dates))
+                self.crawl_batch(dates)
+            else:
+                self.logger.debug("Database returned no unchecked dates, Retrying")
             return
 
         # get a date value to operate on and start sleeping cycle if db doesn't return a value
@@ -192,6 +388,7 @@ class SessionDayChecker(QueueProcWorker):
             self.logger.debug("Checking date: {}".format(date))
         else:
             self.logger.debug("Database returned no unchecked dates, Retrying")
+            self.work_q.safe_put(token)
             return
 
         self.crawl(self.session, date)
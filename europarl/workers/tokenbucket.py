@@ -1,14 +1,21 @@
+from collections import Counter
 from datetime import datetime, timedelta, timezone
 from queue import Full
 
 from europarl.db import DBInterface, Request
-from europarl.mptools import TimerProcWorker
+from europarl.mptools import TimerProcWorker, TokenBucket
+from europarl.ratelimiter import AdaptiveRateLimiter
 
 
 class TokenBucketWorker(TimerProcWorker):
     """
     Creates tokens for the crawlers to use and enques them in the bucket queue which must be passed as an arg-
 
+    If a shared memory TokenBucket is passed instead of a queue, the bucket refills itself and the worker only adjusts its rate.
+
+    An optional status queue can be passed as second arg. The crawlers put the status code of every request into it
+    and the worker counts them in memory instead of querying the requests table for every throttling check.
+    With Throttling = aimd the reports drive an AdaptiveRateLimiter instead of the doubling and halving of the token interval.
     """
 
     MIN_INTERVAL_SECS = 0.1
@@ -19,9 +26,12 @@ class TokenBucketWorker(TimerProcWorker):
         self.token_nr = 0
         self.last_check = None
         self.next_check = None
+        self.status_counter = Counter()
+        self.limiter = None
 
     def init_args(self, args):
-        (self.token_bucket_q,) = args
+        self.token_bucket_q, *status_q = args
+        self.status_q = status_q[0] if status_q else None
 
     def startup(self):
         """
@@ -33,10 +43,21 @@ class TokenBucketWorker(TimerProcWorker):
         self.THROTTLING_FACTOR = float(self.config["ThrottlingFactor"])
         self.INTERVAL_SECS = self.MIN_INTERVAL_SECS
 
+        if self.config.get("Throttling", "interval") == "aimd":
+            self.limiter = AdaptiveRateLimiter(
+                rate=1 / self.MIN_INTERVAL_SECS,
+                min_rate=1 / (self.MIN_INTERVAL_SECS * 65536),
+                max_rate=1 / self.MIN_INTERVAL_SECS,
+                increase=float(self.config.get("AIMDIncrease", 0.01)),
+                decrease=float(self.config.get("AIMDDecrease", 0.5)),
+                latency_target=float(self.config.get("LatencyTargetSecs", 0)) or None,
+            )
+
         self.db = DBInterface(config=self.config)
         self.db.connection_name = self.name
 
         self.request = Request(self.db)
+        self.update_rate()
 
         self.last_check = datetime.now(tz=timezone.utc)
         self.next_check = self.last_check + timedelta(
@@ -52,11 +73,11 @@ class TokenBucketWorker(TimerProcWorker):
 
         The mirror function is unthrottle which will gradually reduce the token generation interval.
         """
-        num_left = sum(1 for __ in self.token_bucket_q.drain())
-        self.logger.debug("Removed {} tokens from Token Bucket".format(num_left))
+        self.clear_bucket()
 
         if self.INTERVAL_SECS < self.MIN_INTERVAL_SECS * 65536:
             self.INTERVAL_SECS = self.INTERVAL_SECS * 2
+            self.update_rate()
             self.logger.info(
                 "Throttling resulted in a sleeping interval of {} seconds".format(
                     self.INTERVAL_SECS
@@ -71,12 +92,31 @@ class TokenBucketWorker(TimerProcWorker):
         """
         if self.INTERVAL_SECS > self.MIN_INTERVAL_SECS:
             self.INTERVAL_SECS = self.INTERVAL_SECS / 2
+            self.update_rate()
             self.logger.info(
                 "Unthrottling resulted in a sleeping interval of {} seconds".format(
                     self.INTERVAL_SECS
                 )
             )
 
+    def clear_bucket(self):
+        """
+        Removes all tokens from the token bucket
+        """
+        if isinstance(self.token_bucket_q, TokenBucket):
+            num_left = self.token_bucket_q.clear()
+        else:
+            num_left = sum(1 for __ in self.token_bucket_q.drain())
+        self.logger.debug("Removed {} tokens from Token Bucket".format(num_left))
+
+    def update_rate(self):
+        """
+        Sets the refill rate of a shared memory TokenBucket to one token per INTERVAL_SECS.
+        Token queues are filled by main_func and need no update.
+        """
+        if isinstance(self.token_bucket_q, TokenBucket):
+            self.token_bucket_q.rate = 1 / self.INTERVAL_SECS
+
     def apply_throttling(self, status_codes):
         """
         Matches the passed status_codes against the rquirements for throttling the token generation
@@ -99,6 +139,72 @@ class TokenBucketWorker(TimerProcWorker):
             self.unthrottle()
             return
 
+    def collect_status_codes(self, now):
+        """
+        Moves the status codes reported by the crawlers from the status queue into the rolling status counter and the adaptive rate limiter.
+        Called on every token so the bounded status queue never fills up between two throttling checks.
+
+        Args:
+            now (datetime(tz)): current timestamp
+        """
+        for host, status_code, latency, retry_after in self.status_q.drain():
+            self.status_counter[status_code] += 1
+
+            if self.limiter is not None and self.limiter.record(
+                host, status_code, latency, retry_after, now.timestamp()
+            ):
+                self.logger.info(
+                    "Decreasing the request rate of {} to {:.3f}/s after status code {}, latency percentiles: {}".format(
+                        host,
+                        self.limiter.host(host).rate,
+                        status_code,
+                        self.limiter.latency_percentiles()[host],
+                    )
+                )
+
+    def adapt_rate(self, now):
+        """
+        Sets the token interval to the rate of the adaptive rate limiter.
+        While a host is blocked by a Retry-After header the token bucket is emptied and no tokens are generated.
+
+        Args:
+            now (datetime(tz)): current timestamp
+        """
+        timestamp = now.timestamp()
+        blocked_for = self.limiter.blocked_for(timestamp)
+        if blocked_for > 0:
+            self.logger.warning(
+                "Pausing requests for {:.1f} seconds as requested by Retry-After".format(
+                    blocked_for
+                )
+            )
+            self.clear_bucket()
+            if isinstance(self.token_bucket_q, TokenBucket):
+                self.token_bucket_q.rate = 0
+            self.INTERVAL_SECS = blocked_for
+            return
+
+        self.INTERVAL_SECS = 1 / self.limiter.rate(timestamp)
+        self.update_rate()
+
+    def get_status_code_summary(self, start_time, end_time):
+        """
+        Counts the status codes of the requests made between the last and the current throttling check.
+        Uses the rolling status counter if a status queue was passed, otherwise the requests table is queried.
+
+        Args:
+            start_time (datetime(tz)): start of the time interval
+            end_time (datetime(tz)): end of the time interval
+
+        Returns:
+            collections.Counter: occurences of the individual status codes
+        """
+        if self.status_q is None:
+            return self.request.get_status_code_summary(start_time, end_time)
+
+        summary, self.status_counter = self.status_counter, Counter()
+        return summary
+
     def check_throttling(self, now):
         """
         Checks if it is time to check for throttling due to error requests.
@@ -108,12 +214,17 @@ class TokenBucketWorker(TimerProcWorker):
         Args:
             now (datetime(tz)): current timestamp
         """
+        if self.status_q is not None:
+            self.collect_status_codes(now)
+
+        if self.limiter is not None:
+            self.adapt_rate(now)
+            return
+
         self.logger.debug("Check if a throttling check is necessary.")
         if now > self.next_check:
             self.logger.debug("Checking status codes")
-            status_codes = self.request.get_status_code_summary(
-                self.last_check, now
-            ).keys()
+            status_codes = self.get_status_code_summary(self.last_check, now).keys()
             self.logger.debug("Setting checking timerange for next iteration")
             self.last_check = now
             self.next_check = now + timedelta(
@@ -125,7 +236,11 @@ class TokenBucketWorker(TimerProcWorker):
         """
         The token-string carries no meaning and is only intended for debugging purposes.
         The continous creating, waiting and discarding loop in case of a full token_bucket_q keeps the process responsive to shutdown signals which are handled in the base class TimerProcWorker.
+        A shared memory TokenBucket refills itself, in that case only the throttling check is made.
         """
+        if isinstance(self.token_bucket_q, TokenBucket):
+            self.check_throttling(datetime.now(tz=timezone.utc))
+            return
 
         token = "{}:{:04d}".format(self.name, self.token_nr)
         self.logger.debug("Created token: {}".format(token))
@@ -133,7 +248,13 @@ class TokenBucketWorker(TimerProcWorker):
         self.logger.debug("Enqueing token: {}".format(token))
 
         try:
-            self.check_throttling(datetime.now(tz=timezone.utc))
+            now = datetime.now(tz=timezone.utc)
+            self.check_throttling(now)
+            if self.limiter is not None and self.limiter.blocked_for(now.timestamp()):
+                self.logger.debug(
+                    "Hosts are blocked. - Discarding token: {}".format(token)
+                )
+                return
             self.token_bucket_q.put(token, timeout=self.DEFAULT_POLLING_TIMEOUT)
             self.logger.debug("Enqueued token: {}".format(token))
         except Full:
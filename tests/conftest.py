@@ -93,15 +93,16 @@ def template_database_setup(request, base_config):
         table_inst.create_table()
 
     def fin():
-        template_db.connection.close()
+        template_db.close()
         with temp_db.cursor() as db:
+            db.con.autocommit = True
             db.cur.execute(
                 SQL("drop database {db_name};").format(
                     db_name=Identifier(template_db_name)
                 )
             )
 
-        temp_db.connection.close()
+        temp_db.close()
 
     request.addfinalizer(fin)
     return template_db
@@ -149,6 +150,7 @@ def db_interface(request, template_database_setup, base_config):
     def fin():
         db_connection.close()
         with template_db.cursor() as db:
+            db.con.autocommit = True
             db.cur.execute(
                 SQL("drop database {db_name};").format(db_name=Identifier(db_name))
             )
@@ -0,0 +1,174 @@
+import hashlib
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from psycopg2 import sql
+
+from europarl.db import Documents, Request, Rules, URLs
+from europarl.filestore import content_uuid
+from europarl.rules.rule import rule_registry
+
+
+def test_table_exists(db_interface):
+    docs = Documents(db_interface)
+    assert docs.table_exists()
+
+
+def test_table_not_exists(db_interface):
+    with db_interface.cursor() as db:
+        db.cur.execute(
+            sql.SQL("drop table {table} cascade").format(
+                table=sql.Identifier(Documents.table_name)
+            )
+        )
+
+    docs = Documents(db_interface)
+    assert docs.table_exists() is False
+
+
+def count_documents(db_interface):
+    with db_interface.cursor() as db:
+        db.cur.execute("SELECT COUNT(*) FROM documents;")
+        count = db.cur.fetchone()[0]
+    return count
+
+
+def test_register_document_unique_uuids(db_interface):
+    docs = Documents(db_interface)
+
+    id_0 = docs.register_document(filepath="/a.pdf", filename=str(uuid.uuid4()))
+    id_1 = docs.register_document(filepath="/a.pdf", filename=str(uuid.uuid4()))
+
+    assert id_0 != id_1
+    assert count_documents(db_interface) == 2
+
+
+def test_register_document_links_unchanged_content(db_interface):
+    docs = Documents(db_interface)
+    sha256 = hashlib.sha256(b"data").hexdigest()
+
+    id_0 = docs.register_document(
+        filepath="/a.pdf", filename=content_uuid(sha256), sha256=sha256, filesize=4
+    )
+    id_1 = docs.register_document(
+        filepath="/a.pdf", filename=content_uuid(sha256), sha256=sha256, filesize=4
+    )
+
+    assert id_0 == id_1
+    assert count_documents(db_interface) == 1
+
+
+def test_claim_unprocessed_documents(db_interface):
+    docs = Documents(db_interface)
+    rules = Rules(db_interface)
+    urls = URLs(db_interface)
+    requests = Request(db_interface)
+
+    rules.register_rules(rule_registry.all)
+    rule_id, name, active = rules.get_rule(rulename="protocol_en_pdf")
+    rules.update_rule_state(id=rule_id, active=True)
+
+    start = datetime.now(tz=timezone.utc)
+    document_ids = []
+    for i in range(3):
+        document_id = docs.register_document(
+            filepath="/a.pdf", filename=str(uuid.uuid4())
+        )
+        url_id = urls.save_url(None, rule_id, "www.internet{}.de".format(i))
+        requests.mark_as_requested(
+            url_id=url_id,
+            status_code=200,
+            redirected_url="www.internet.de",
+            document_id=document_id,
+            requested_at=start + timedelta(minutes=i),
+        )
+        document_ids.append(document_id)
+
+    claimed = docs.claim_unprocessed_documents(limit=2)
+    assert [item["document"]["id"] for item in claimed] == document_ids[:2]
+    assert claimed[0]["rule"] == {"id": rule_id, "name": name}
+
+    claimed = docs.claim_unprocessed_documents(limit=2)
+    assert [item["document"]["id"] for item in claimed] == document_ids[2:]
+
+    assert docs.claim_unprocessed_documents(limit=2) == []
+    assert docs.get_unprocessed_documents(limit=10) == []
+
+
+def test_release_documents(db_interface):
+    docs = Documents(db_interface)
+    rules = Rules(db_interface)
+    urls = URLs(db_interface)
+    requests = Request(db_interface)
+
+    rules.register_rules(rule_registry.all)
+    rule_id, name, active = rules.get_rule(rulename="protocol_en_pdf")
+    rules.update_rule_state(id=rule_id, active=True)
+
+    for i in range(3):
+        document_id = docs.register_document(
+            filepath="/a.pdf", filename=str(uuid.uuid4())
+        )
+        url_id = urls.save_url(None, rule_id, "www.internet{}.de".format(i))
+        requests.mark_as_requested(
+            url_id=url_id,
+            status_code=200,
+            redirected_url="www.internet.de",
+            document_id=document_id,
+        )
+
+    claimed = docs.claim_unprocessed_documents(limit=3)
+    assert docs.count_unprocessed_documents() == 0
+
+    # the first document was queued up, the others are released
+    docs.release_documents([item["document"]["id"] for item in claimed[1:]])
+    assert docs.count_unprocessed_documents() == 2
+    claimed_again = docs.claim_unprocessed_documents(limit=3)
+    assert claimed_again == claimed[1:]
+
+
+def test_count_unprocessed_documents(db_interface):
+    docs = Documents(db_interface)
+    rules = Rules(db_interface)
+    urls = URLs(db_interface)
+    requests = Request(db_interface)
+
+    rules.register_rules(rule_registry.all)
+    rule_id, name, active = rules.get_rule(rulename="protocol_en_pdf")
+    rules.update_rule_state(id=rule_id, active=True)
+
+    for i in range(3):
+        document_id = docs.register_document(
+            filepath="/a.pdf", filename=str(uuid.uuid4())
+        )
+        url_id = urls.save_url(None, rule_id, "www.internet{}.de".format(i))
+        requests.mark_as_requested(
+            url_id=url_id,
+            status_code=200,
+            redirected_url="www.internet.de",
+            document_id=document_id,
+        )
+    # documents without a request of an active rule are never scheduled
+    docs.register_document(filepath="/b.pdf", filename=str(uuid.uuid4()))
+
+    assert docs.count_unprocessed_documents() == 3
+    docs.claim_unprocessed_documents(limit=2)
+    assert docs.count_unprocessed_documents() == 1
+
+
+def test_notifications(db_interface):
+    docs = Documents(db_interface)
+    unprocessed = db_interface.listen("documents_unprocessed")
+    unindexed = db_interface.listen("documents_unindexed")
+    unprocessed.wait(0)
+    unindexed.wait(0)
+
+    doc_id = docs.register_document(filepath="/a.pdf", filename=str(uuid.uuid4()))
+    assert unprocessed.wait(1.0) is True
+    assert unindexed.wait(0.01) is False
+
+    docs.set_data(doc_id, {"text": "processed"})
+    assert unindexed.wait(1.0) is True
+
+    unprocessed.close()
+    unindexed.close()
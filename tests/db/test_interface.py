@@ -0,0 +1,120 @@
+import os
+from datetime import date
+
+import psycopg2
+import pytest
+
+from europarl.db import DBInterface, SessionDay
+
+
+def test_cursor_reuses_pooled_connection(db_interface):
+    with db_interface.cursor() as db:
+        first = db.con
+
+    with db_interface.cursor() as db:
+        assert db.con is first
+
+
+def test_deleted_table_keeps_connection(db_interface):
+    with db_interface.cursor() as db:
+        first = db.con
+
+    sessionDay = SessionDay(db_interface)
+    del sessionDay
+
+    assert first.closed == 0
+    with db_interface.cursor() as db:
+        assert db.con is first
+
+
+def test_closed_connection_is_replaced(db_interface):
+    with db_interface.cursor() as db:
+        first = db.con
+    first.close()
+
+    with db_interface.cursor() as db:
+        db.cur.execute("SELECT 1")
+        assert db.cur.fetchone()[0] == 1
+        assert db.con is not first
+
+
+def test_broken_connection_is_discarded(db_interface):
+    with pytest.raises(psycopg2.OperationalError):
+        with db_interface.cursor() as db:
+            first = db.con
+            db.cur.execute("SELECT pg_terminate_backend(pg_backend_pid())")
+
+    with db_interface.cursor() as db:
+        db.cur.execute("SELECT 1")
+        assert db.con is not first
+
+
+def test_pool_is_recreated_after_fork(db_interface):
+    pool = db_interface.connect()
+    db_interface.pid = os.getpid() + 1
+
+    assert db_interface.connect() is not pool
+    pool.closeall()
+
+
+def count_days(db_interface):
+    with db_interface.cursor() as db:
+        db.cur.execute("SELECT COUNT(*) FROM session_days")
+        return db.cur.fetchone()[0]
+
+
+def test_transaction_commits_once(db_interface, base_config):
+    sessionDay = SessionDay(db_interface)
+    other = DBInterface(config=base_config["TestDB"])
+
+    with db_interface.transaction():
+        sessionDay.insert_date(date(2020, 1, 1))
+        sessionDay.insert_date(date(2020, 1, 2))
+        # uncommitted rows aren't visible to other connections
+        assert count_days(other) == 0
+
+    assert count_days(other) == 2
+    other.close()
+
+
+def test_transaction_rolls_back(db_interface):
+    sessionDay = SessionDay(db_interface)
+
+    with pytest.raises(ValueError):
+        with db_interface.transaction():
+            sessionDay.insert_date(date(2020, 1, 1))
+            raise ValueError
+
+    assert db_interface.in_transaction() is False
+    assert count_days(db_interface) == 0
+
+
+def test_nested_transaction_joins_outer(db_interface):
+    sessionDay = SessionDay(db_interface)
+
+    with db_interface.transaction():
+        with db_interface.transaction():
+            sessionDay.insert_date(date(2020, 1, 1))
+        assert db_interface.in_transaction()
+        db_interface.rollback()
+
+    assert count_days(db_interface) == 0
+
+
+def test_listener(db_interface):
+    listener = db_interface.listen("test_channel")
+    assert listener.wait(0.01) is False
+
+    with db_interface.cursor() as db:
+        db.cur.execute("NOTIFY test_channel;")
+
+    assert listener.wait(1.0) is True
+    assert listener.wait(0.01) is False
+
+    # a closed connection is reopened by the next wait
+    listener.connection.close()
+    assert listener.wait(0.01) is False
+    with db_interface.cursor() as db:
+        db.cur.execute("NOTIFY test_channel;")
+    assert listener.wait(1.0) is True
+    listener.close()
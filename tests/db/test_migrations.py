@@ -0,0 +1,51 @@
+from europarl.db import SchemaMigrations
+from europarl.db.migrations import migrations
+
+
+def get_indexes(db_interface, table_name):
+    with db_interface.cursor() as db:
+        db.cur.execute(
+            "SELECT indexname FROM pg_indexes WHERE tablename = %s", [table_name]
+        )
+        return {row[0] for row in db.cur.fetchall()}
+
+
+def test_table_exists(db_interface):
+    sm = SchemaMigrations(db_interface)
+    assert sm.table_exists()
+
+
+def test_baseline(db_interface):
+    sm = SchemaMigrations(db_interface)
+    assert len(sm.pending_migrations()) == len(migrations)
+
+    sm.baseline()
+
+    assert sm.pending_migrations() == []
+    assert sm.get_applied_versions() == {m.version for m in migrations}
+
+
+def test_migrate_existing_deployment(db_interface):
+    sm = SchemaMigrations(db_interface)
+
+    # simulate a deployment created before the migrations existed
+    with db_interface.cursor() as db:
+        db.cur.execute("DROP INDEX documents_unindexed_index")
+        db.cur.execute("ALTER TABLE documents DROP COLUMN sha256")
+
+    applied = sm.migrate()
+
+    assert applied == sorted(m.version for m in migrations)
+    assert "documents_unindexed_index" in get_indexes(db_interface, "documents")
+    with db_interface.cursor() as db:
+        db.cur.execute("SELECT sha256 FROM documents")
+
+    # a second run has nothing to apply
+    assert sm.migrate() == []
+
+
+def test_migrate_target(db_interface):
+    sm = SchemaMigrations(db_interface)
+
+    assert sm.migrate(target=1) == [1]
+    assert sm.get_applied_versions() == {1}
@@ -0,0 +1,103 @@
+from datetime import date
+
+import pytest
+
+from europarl.db import PendingCombos, Request, Rules, SessionDay, URLs
+from europarl.rules.rule import rule_registry
+
+
+def count_combos(db_interface):
+    with db_interface.cursor() as db:
+        db.cur.execute("SELECT COUNT(*) FROM pending_combos;")
+        return db.cur.fetchone()[0]
+
+
+def test_table_exists(db_interface):
+    pc = PendingCombos(db_interface)
+    assert pc.table_exists()
+
+
+@pytest.fixture
+def confirmed_day(db_interface):
+    u = URLs(db_interface)
+    ru = Rules(db_interface)
+    s = SessionDay(db_interface)
+
+    day_id = s.insert_date(date.today())
+    ru.register_rules(rule_registry.all)
+    session_day_id, name, active = ru.get_rule(rulename="session_day")
+    rule_id, name, active = ru.get_rule(rulename="protocol_en_pdf")
+    ru.update_rule_state(id=rule_id, active=True)
+
+    session_url_id = u.save_url(
+        date_id=day_id, rule_id=session_day_id, url="www.internet.de"
+    )
+    assert count_combos(db_interface) == 0
+
+    Request(db_interface).mark_as_requested(
+        url_id=session_url_id, status_code=200, redirected_url="www.internet.de"
+    )
+    return {"day_id": day_id, "rule_id": rule_id}
+
+
+def test_confirmed_session_day_adds_combos(db_interface, confirmed_day):
+    assert count_combos(db_interface) == 1
+
+
+def test_activated_rule_adds_combos(db_interface, confirmed_day):
+    ru = Rules(db_interface)
+    rule_id, name, active = ru.get_rule(rulename="protocol_en_html")
+    ru.update_rule_state(id=rule_id, active=True)
+    assert count_combos(db_interface) == 2
+
+
+def test_deactivated_rule_removes_combos(db_interface, confirmed_day):
+    ru = Rules(db_interface)
+    ru.update_rule_state(id=confirmed_day["rule_id"], active=False)
+    assert count_combos(db_interface) == 0
+
+
+def test_created_url_removes_combo(db_interface, confirmed_day):
+    u = URLs(db_interface)
+    u.save_url(
+        date_id=confirmed_day["day_id"],
+        rule_id=confirmed_day["rule_id"],
+        url="www.internet2.de",
+    )
+    assert count_combos(db_interface) == 0
+
+
+def test_rebuild(db_interface, confirmed_day):
+    with db_interface.cursor() as db:
+        db.cur.execute("DELETE FROM pending_combos;")
+
+    pc = PendingCombos(db_interface)
+    assert pc.rebuild() == 1
+    assert pc.rebuild() == 0
+    assert count_combos(db_interface) == 1
+
+
+def test_new_combos_notify(db_interface):
+    listener = db_interface.listen("pending_combos")
+    listener.wait(0)
+
+    ru = Rules(db_interface)
+    ru.register_rules(rule_registry.all)
+    day_id = SessionDay(db_interface).insert_date(date.today())
+    assert listener.wait(0.01) is False
+
+    rule_id, name, active = ru.get_rule(rulename="protocol_en_pdf")
+    ru.update_rule_state(id=rule_id, active=True)
+    assert listener.wait(0.01) is False
+
+    session_day_id, name, active = ru.get_rule(rulename="session_day")
+    url_id = URLs(db_interface).save_url(
+        date_id=day_id,
+        rule_id=session_day_id,
+        url="www.internet.de",
+    )
+    Request(db_interface).mark_as_requested(
+        url_id=url_id, status_code=200, redirected_url="www.internet.de"
+    )
+    assert listener.wait(1.0) is True
+    listener.close()
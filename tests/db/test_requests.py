@@ -119,3 +119,43 @@ def test_get_status_code_summary(db_interface):
         timestamp[0] - timedelta(seconds=60), timestamp[0]
     )
     assert result[200] == 1
+
+
+def test_Request_mark_many_as_requested(db_interface):
+    request = Request(db_interface)
+    urls = URLs(db_interface)
+
+    url_ids = [
+        urls.save_url(None, None, "www.internet{}.de".format(i)) for i in range(3)
+    ]
+    rows = [(url_id, 200, "www.internet.de") for url_id in url_ids]
+
+    ids = request.mark_many_as_requested(rows)
+
+    assert len(ids) == 3
+    for id, url_id in zip(ids, url_ids):
+        row = request.get_request_log(id)
+        assert row[1] == url_id
+        assert row[4] == 200
+
+
+def test_Request_copy_requests(db_interface):
+    request = Request(db_interface)
+    urls = URLs(db_interface)
+
+    requested_at = datetime.now(tz=timezone.utc)
+    url_ids = [
+        urls.save_url(None, None, "www.internet{}.de".format(i)) for i in range(3)
+    ]
+
+    count = request.copy_requests(
+        (url_id, 200, "www.internet.de", requested_at, None) for url_id in url_ids
+    )
+
+    assert count == 3
+    with db_interface.cursor() as db:
+        db.cur.execute(
+            "SELECT url_id, status_code, requested_at, document_id FROM requests ORDER BY id"
+        )
+        rows = db.cur.fetchall()
+    assert rows == [(url_id, 200, requested_at, None) for url_id in url_ids]
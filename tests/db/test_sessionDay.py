@@ -96,3 +96,15 @@ def test_SessionDays_insert_day(
 
     assert get_id == id
     assert get_date == date
+
+
+def test_SessionDays_insert_dates(db_interface):
+    sessionDay = SessionDay(db_interface)
+    single_id = sessionDay.insert_date(date=datetime.date.today())
+
+    dates = [datetime.date.today() - datetime.timedelta(days=i) for i in range(3)]
+    rows = sessionDay.insert_dates(dates + dates[:1])
+
+    assert len(rows) == 3
+    assert sorted(row[1] for row in rows) == sorted(dates)
+    assert (single_id, datetime.date.today()) in rows
@@ -1,7 +1,10 @@
+import datetime
+
 import pytest
 from psycopg2 import sql
 
-from europarl.db import SessionDay
+from europarl.db import Documents, SessionDay
+from europarl.db.tables import CopyBuffer
 
 
 def test_table_exists(db_interface):
@@ -19,3 +22,51 @@ def test_table_not_exists(db_interface):
 
     sessionDay = SessionDay(db_interface)
     assert sessionDay.table_exists() is False
+
+
+def get_indexes(db_interface, table_name):
+    with db_interface.cursor() as db:
+        db.cur.execute(
+            "SELECT indexname FROM pg_indexes WHERE tablename = %s", [table_name]
+        )
+        return {row[0] for row in db.cur.fetchall()}
+
+
+def test_create_indexes_adds_missing_indexes(db_interface):
+    docs = Documents(db_interface)
+    with db_interface.cursor() as db:
+        db.cur.execute("DROP INDEX documents_unindexed_index")
+
+    assert "documents_unindexed_index" not in get_indexes(
+        db_interface, Documents.table_name
+    )
+
+    # creating the indexes twice must not fail
+    docs.create_indexes()
+    docs.create_indexes()
+
+    assert {
+        "documents_unprocessed_index",
+        "documents_unindexed_index",
+        "documents_unindex_index",
+    } <= get_indexes(db_interface, Documents.table_name)
+
+
+def test_copy_buffer():
+    buffer = CopyBuffer([(1, None, 'a"b'), (datetime.date(2020, 1, 13), "", "x,y")])
+
+    assert buffer.read(3) == b'"1"'
+    assert buffer.read() == b',,"a""b"\n"2020-01-13","","x,y"\n'
+    assert buffer.read() == b""
+    assert buffer.count == 2
+
+
+def test_copy_rows(db_interface):
+    sessionDay = SessionDay(db_interface)
+    days = [datetime.date(2020, 1, 13) + datetime.timedelta(days=i) for i in range(5)]
+
+    with db_interface.cursor() as db:
+        count = sessionDay.copy_rows(db, ((day,) for day in days), ["dates"])
+
+    assert count == 5
+    assert sorted(row[1] for row in sessionDay.insert_dates(days)) == days
@@ -1,3 +1,4 @@
+import threading
 import uuid
 from datetime import date, datetime, timedelta, timezone
 
@@ -156,6 +157,60 @@ def test_get_todo_rule_and_date_combos_three_rules(db_interface, todo_setup):
     assert ret[2]["rulename"] == name
 
 
+def test_get_todo_rule_and_date_combos_claims(db_interface, todo_setup):
+    # claimed combinations aren't returned a second time
+    u = URLs(db_interface)
+    ru = Rules(db_interface)
+    ru.update_rule_state(id=todo_setup["rule_ids"][1], active=True)
+    ru.update_rule_state(id=todo_setup["rule_ids"][2], active=True)
+
+    assert len(u.get_todo_rule_and_date_combos(limit=1)) == 1
+    assert len(u.get_todo_rule_and_date_combos(limit=100)) == 1
+    assert len(u.get_todo_rule_and_date_combos(limit=100)) == 0
+
+
+def test_get_todo_rule_and_date_combos_concurrent_claims(db_interface, todo_setup):
+    # two generators claim in parallel transactions, the first one keeps its rows locked
+    ru = Rules(db_interface)
+    for rule_id in todo_setup["rule_ids"][1:5]:
+        ru.update_rule_state(id=rule_id, active=True)
+
+    barrier = threading.Barrier(2, timeout=10)
+    claims = {}
+
+    def claim(name):
+        u = URLs(db_interface)
+        with db_interface.transaction():
+            claims[name] = u.get_todo_rule_and_date_combos(limit=2)
+            barrier.wait()
+
+    threads = [threading.Thread(target=claim, args=(name,)) for name in "ab"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    claimed_a = {(combo["date_id"], combo["rule_id"]) for combo in claims["a"]}
+    claimed_b = {(combo["date_id"], combo["rule_id"]) for combo in claims["b"]}
+    assert len(claimed_a) == 2
+    assert len(claimed_b) == 2
+    assert claimed_a.isdisjoint(claimed_b)
+
+
+def test_get_todo_rule_and_date_combos_rollback(db_interface, todo_setup):
+    # a rolled back claim returns the combinations
+    u = URLs(db_interface)
+    ru = Rules(db_interface)
+    ru.update_rule_state(id=todo_setup["rule_ids"][1], active=True)
+
+    with pytest.raises(RuntimeError):
+        with db_interface.transaction():
+            assert len(u.get_todo_rule_and_date_combos(limit=100)) == 1
+            raise RuntimeError
+
+    assert len(u.get_todo_rule_and_date_combos(limit=100)) == 1
+
+
 def count_urls(db_interface):
     with db_interface.cursor() as db:
         query = """ SELECT COUNT(*)
@@ -208,3 +263,48 @@ def test_drop_uncrawled_urls_drop_all_but_two(db_interface, url_ids):
     u.drop_uncrawled_urls()
 
     assert count_urls(db_interface) == 2
+
+
+def test_set_validators(db_interface, rulesFix):
+    u = URLs(db_interface)
+    url_id = u.save_url(date_id=None, rule_id=rulesFix[0], url="www.internet.de")
+
+    url = u.get_url(url_id)
+    assert url["etag"] is None
+    assert url["last_modified"] is None
+
+    u.set_validators(url_id, '"abc"', "Wed, 21 Oct 2015 07:28:00 GMT")
+
+    url = u.get_url(url_id)
+    assert url["etag"] == '"abc"'
+    assert url["last_modified"] == "Wed, 21 Oct 2015 07:28:00 GMT"
+
+
+def test_save_urls(db_interface, sessionDays, rulesFix):
+    u = URLs(db_interface)
+    rows = [
+        (day_id, rule_id, "www.internet.de" + str(day_id))
+        for day_id, rule_id in zip(sessionDays, rulesFix)
+    ]
+    single_id = u.save_url(*rows[0])
+
+    result = u.save_urls(rows + rows[:1])
+
+    assert len(result) == len(rows)
+    assert single_id in [row[0] for row in result]
+    assert sorted(row[1:] for row in result) == sorted(rows)
+
+
+def test_copy_urls(db_interface, sessionDays, rulesFix):
+    u = URLs(db_interface)
+    rows = [
+        (day_id, rule_id, "www.internet.de" + str(day_id))
+        for day_id, rule_id in zip(sessionDays, rulesFix)
+    ]
+    single_id = u.save_url(*rows[0])
+
+    result = u.copy_urls(iter(rows + rows[:1]))
+
+    assert len(result) == len(rows)
+    assert single_id in [row[0] for row in result]
+    assert sorted(row[1:] for row in result) == sorted(rows)
@@ -1,6 +1,10 @@
+from datetime import date
+from unittest.mock import MagicMock, Mock
+
 import pytest
 
-from europarl.downloader import rewrite_links
+from europarl.downloader import conditional_headers, rewrite_links, scrape_document
+from europarl.rules.protocol import ProtocolEnPdfRule
 
 
 def test_rewrite_links():
@@ -16,3 +20,69 @@ def test_rewrite_links():
     print(result)
 
     assert result == expected_string
+
+
+@pytest.mark.parametrize(
+    "etag,last_modified,expected",
+    [
+        (None, None, {}),
+        ('"abc"', None, {"If-None-Match": '"abc"'}),
+        (
+            None,
+            "Wed, 21 Oct 2015 07:28:00 GMT",
+            {"If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT"},
+        ),
+        (
+            '"abc"',
+            "Wed, 21 Oct 2015 07:28:00 GMT",
+            {
+                "If-None-Match": '"abc"',
+                "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+            },
+        ),
+    ],
+)
+def test_conditional_headers(etag, last_modified, expected):
+    assert conditional_headers(etag, last_modified) == expected
+
+
+def fake_response(status_code, content=b"", headers=None):
+    resp = MagicMock()
+    resp.status_code = status_code
+    resp.headers = headers or {}
+    resp.iter_content = Mock(return_value=[content])
+    resp.__enter__ = Mock(return_value=resp)
+    resp.__exit__ = Mock(return_value=False)
+    return resp
+
+
+def test_scrape_document_stores_validators(tmp_path):
+    rule = ProtocolEnPdfRule
+    day = date(2020, 1, 13)
+    session = Mock()
+    session.get = Mock(
+        return_value=fake_response(200, b"pdf", {"ETag": '"abc"'}),
+    )
+    validators = {}
+
+    scrape_document(tmp_path, rule, day, session, sleep=0, validators=validators)
+
+    stored = rule.get_filepath(tmp_path, day).joinpath(rule.get_filename())
+    assert stored.read_bytes() == b"pdf"
+    assert validators[rule.url(day)] == {"etag": '"abc"', "last_modified": None}
+    assert session.get.call_args.kwargs["headers"] == {}
+
+
+def test_scrape_document_unchanged(tmp_path):
+    rule = ProtocolEnPdfRule
+    day = date(2020, 1, 13)
+    stored = rule.store_document(tmp_path, day, b"old pdf")
+
+    session = Mock()
+    session.get = Mock(return_value=fake_response(304))
+    validators = {rule.url(day): {"etag": '"abc"', "last_modified": None}}
+
+    scrape_document(tmp_path, rule, day, session, sleep=0, validators=validators)
+
+    assert session.get.call_args.kwargs["headers"] == {"If-None-Match": '"abc"'}
+    assert stored.read_bytes() == b"old pdf"
@@ -0,0 +1,65 @@
+import hashlib
+import os
+import time
+
+from europarl.extractioncache import ExtractionCache, file_sha256
+
+SHA256 = hashlib.sha256(b"document").hexdigest()
+
+
+def test_file_sha256(tmp_path):
+    filepath = tmp_path / "document.pdf"
+    filepath.write_bytes(b"document")
+    assert file_sha256(filepath) == SHA256
+
+
+def test_get_and_put(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache", max_size=1024 * 1024)
+    data = {"filesize": 8, "content": "Sitting of 1 August"}
+
+    assert cache.get(SHA256, "protocol_en_pdf-v1") is None
+    cache.put(SHA256, "protocol_en_pdf-v1", data)
+
+    assert cache.get(SHA256, "protocol_en_pdf-v1") == data
+    # a new extractor version doesn't read the data of the old one
+    assert cache.get(SHA256, "protocol_en_pdf-v2") is None
+    assert cache.get(hashlib.sha256(b"other").hexdigest(), "protocol_en_pdf-v1") is None
+
+    # the size of existing entries is counted by new instances
+    assert ExtractionCache(tmp_path / "cache", max_size=1024 * 1024).size == cache.size
+    assert cache.size > 0
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = ExtractionCache(tmp_path, max_size=1024 * 1024)
+    cache.put(SHA256, "extractor", {"content": "text"})
+
+    with open(cache.path(SHA256, "extractor"), "wb") as f:
+        f.write(b"no gzip")
+    assert cache.get(SHA256, "extractor") is None
+
+    cache.put(SHA256, "extractor", {"content": "text"})
+    assert cache.get(SHA256, "extractor") == {"content": "text"}
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ExtractionCache(tmp_path, max_size=1024 * 1024)
+    digests = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(4)]
+    for i, sha256 in enumerate(digests):
+        # random content doesn't compress, every entry takes a few hundred bytes
+        cache.put(sha256, "extractor", {"content": os.urandom(200).hex()})
+        past = time.time() - 100 + i
+        os.utime(cache.path(sha256, "extractor"), (past, past))
+
+    # reading the oldest entry makes it the most recently used one
+    assert cache.get(digests[0], "extractor") is not None
+
+    entry_size = cache.size / 4
+    cache.max_size = int(entry_size * 3)
+    cache.put(hashlib.sha256(b"new").hexdigest(), "extractor", {"content": "text"})
+
+    assert cache.get(digests[0], "extractor") is not None
+    assert cache.get(digests[1], "extractor") is None
+    assert cache.get(digests[2], "extractor") is None
+    assert cache.get(digests[3], "extractor") is not None
+    assert cache.size <= cache.max_size * cache.EVICTION_RATIO
@@ -0,0 +1,88 @@
+import hashlib
+import os
+
+import pytest
+
+from europarl.filestore import (
+    content_path,
+    content_uuid,
+    store_content_addressed,
+    stream_to_file,
+)
+
+
+@pytest.mark.parametrize(
+    "chunks",
+    [
+        [],
+        [b"some initial text data"],
+        [b"some ", b"", b"initial ", b"text data"],
+        [os.urandom(1024) for i in range(100)],
+    ],
+)
+def test_stream_to_file(tmp_path, chunks):
+    filepath = tmp_path / "document.pdf"
+
+    sha256, size = stream_to_file(iter(chunks), filepath)
+
+    content = b"".join(chunks)
+    assert filepath.read_bytes() == content
+    assert sha256 == hashlib.sha256(content).hexdigest()
+    assert size == len(content)
+    # no temporary files are left behind
+    assert os.listdir(tmp_path) == ["document.pdf"]
+
+
+def test_stream_to_file_creates_directories(tmp_path):
+    filepath = tmp_path / "a" / "b" / "document.pdf"
+    stream_to_file([b"data"], filepath)
+    assert filepath.read_bytes() == b"data"
+
+
+def test_stream_to_file_failure_keeps_target_untouched(tmp_path):
+    filepath = tmp_path / "document.pdf"
+    filepath.write_bytes(b"old content")
+
+    def failing_chunks():
+        yield b"new "
+        raise IOError("connection lost")
+
+    with pytest.raises(IOError):
+        stream_to_file(failing_chunks(), filepath)
+
+    assert filepath.read_bytes() == b"old content"
+    assert os.listdir(tmp_path) == ["document.pdf"]
+
+
+def test_content_path():
+    sha256 = hashlib.sha256(b"data").hexdigest()
+    path = content_path("/data", sha256, ".pdf")
+    assert path == os.path.join("/data", sha256[0:2], sha256[2:4], sha256 + ".pdf")
+
+
+def test_content_uuid_is_stable():
+    sha256 = hashlib.sha256(b"data").hexdigest()
+    assert content_uuid(sha256) == content_uuid(sha256)
+    assert content_uuid(sha256) != content_uuid(hashlib.sha256(b"other").hexdigest())
+
+
+def test_store_content_addressed_deduplicates(tmp_path):
+    path_0, sha256_0, size_0 = store_content_addressed([b"da", b"ta"], tmp_path, ".pdf")
+    path_1, sha256_1, size_1 = store_content_addressed([b"data"], tmp_path, ".pdf")
+    path_2, sha256_2, size_2 = store_content_addressed([b"other"], tmp_path, ".pdf")
+
+    assert path_0 == path_1
+    assert sha256_0 == sha256_1
+    assert size_0 == size_1 == 4
+    assert path_2 != path_0
+
+    assert path_0 == content_path(tmp_path, sha256_0, ".pdf")
+    with open(path_0, "rb") as f:
+        assert f.read() == b"data"
+
+    stored_files = [
+        os.path.join(root, file)
+        for root, dirs, files in os.walk(tmp_path)
+        for file in files
+    ]
+    assert sorted(stored_files) == sorted([path_0, path_2])
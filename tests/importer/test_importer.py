@@ -0,0 +1,78 @@
+from datetime import date
+
+import pytest
+
+from europarl.importer import import_directory, read_ledger, scan_directory
+from europarl.rules.protocol import (
+    ProtocolEnHtmlRule,
+    ProtocolEnPdfRule,
+    SessionDayRule,
+)
+
+
+@pytest.fixture
+def download_directory(tmp_path):
+    ProtocolEnPdfRule.store_document(tmp_path, date(2020, 1, 13), b"pdf")
+    ProtocolEnHtmlRule.store_document(tmp_path, date(2020, 1, 13), "html")
+    ProtocolEnPdfRule.store_document(tmp_path, date(2020, 1, 14), b"pdf")
+    tmp_path.joinpath("validators.json").write_text("{}")
+    tmp_path.joinpath("backfilled_dates.txt").write_text(
+        "2020-01-13\n2020-01-14\n2020-01-15\n"
+    )
+    return tmp_path
+
+
+def test_scan_directory(download_directory):
+    documents = scan_directory(download_directory)
+
+    assert sorted(documents) == [date(2020, 1, 13), date(2020, 1, 14)]
+    assert sorted(documents[date(2020, 1, 13)]) == [
+        "protocol_en_html",
+        "protocol_en_pdf",
+    ]
+
+
+def test_scan_directory_rules(download_directory):
+    documents = scan_directory(download_directory, rulenames=["protocol_en_html"])
+
+    assert list(documents) == [date(2020, 1, 13)]
+
+
+def test_read_ledger(download_directory, tmp_path_factory):
+    assert read_ledger(download_directory) == {
+        date(2020, 1, 13),
+        date(2020, 1, 14),
+        date(2020, 1, 15),
+    }
+    assert read_ledger(tmp_path_factory.mktemp("empty")) == set()
+
+
+def count_rows(db_interface, table):
+    with db_interface.cursor() as db:
+        db.cur.execute("SELECT COUNT(*) FROM {}".format(table))
+        return db.cur.fetchone()[0]
+
+
+def test_import_directory(db_interface, download_directory):
+    result = import_directory(db_interface, download_directory)
+
+    # 3 session day urls and 3 document urls
+    assert result == {"dates": 3, "urls": 6, "requests": 6}
+    assert count_rows(db_interface, "requests") == 6
+
+    # the ledger date without documents is logged as a day without a session
+    with db_interface.cursor() as db:
+        db.cur.execute(
+            """ SELECT requests.status_code FROM requests
+                INNER JOIN urls ON urls.id = requests.url_id
+                INNER JOIN rules ON rules.id = urls.rule_id
+                WHERE urls.url = %s AND rules.rulename = %s""",
+            [SessionDayRule.url(date(2020, 1, 15)), SessionDayRule.name],
+        )
+        assert db.cur.fetchone()[0] == 404
+
+
+def test_import_directory_no_ledger(db_interface, download_directory):
+    result = import_directory(db_interface, download_directory, ledger=False)
+
+    assert result == {"dates": 2, "urls": 5, "requests": 5}
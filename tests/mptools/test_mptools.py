@@ -9,11 +9,14 @@ import multiprocessing as mp
 import os
 import signal
 import time
+from queue import Full
 
 import pytest
 
 import europarl.mptools as mptools
 from europarl.mptools import (
+    Claim,
+    Doorbell,
     MainContext,
     MPQueue,
     Proc,
@@ -22,6 +25,8 @@ from europarl.mptools import (
     SignalObject,
     TerminateInterrupt,
     TimerProcWorker,
+    TokenBucket,
+    WorkerPool,
     _sleep_secs,
     default_signal_handler,
     init_signal,
@@ -56,6 +61,11 @@ def test_mpqueue_get():
     assert num_left == 0
 
 
+def test_mpqueue_maxsize():
+    assert MPQueue(10).maxsize == 10
+    assert MPQueue().maxsize == 0
+
+
 def test_queue_put():
     Q = MPQueue(2)
     assert Q.safe_put("ITEM1")
@@ -83,6 +93,121 @@ def test_drain_queue():
     assert num_left == 0
 
 
+def test_token_bucket_refill():
+    bucket = TokenBucket(rate=100, capacity=5)
+    assert bucket.try_acquire() is False
+
+    time.sleep(0.2)
+    # the refill is capped at the capacity
+    assert bucket.tokens == 5
+    assert bucket.try_acquire(5) is True
+    assert bucket.try_acquire() is False
+
+
+def test_token_bucket_fractional_rate():
+    bucket = TokenBucket(rate=0.5, capacity=2, tokens=1.5)
+    assert bucket.acquire(timeout=0.05) is True
+    assert bucket.acquire(timeout=0.05) is False
+
+    with pytest.raises(ValueError):
+        bucket.acquire(3)
+
+
+def test_token_bucket_release_and_clear():
+    bucket = TokenBucket(rate=0, capacity=2, tokens=1)
+    assert bucket.release() is True
+    assert bucket.release() is False
+    assert bucket.tokens == 2
+
+    assert bucket.clear() == 2
+    assert bucket.safe_get(None) is None
+
+
+def test_token_bucket_queue_interface():
+    bucket = TokenBucket(rate=0, capacity=1)
+    assert bucket.safe_get(0.02) is None
+
+    bucket.put("TOKEN")
+    with pytest.raises(Full):
+        bucket.put("TOKEN")
+    assert bucket.safe_get(0.02) == TokenBucket.TOKEN
+
+    bucket.safe_put("END")
+    assert bucket.closed
+    assert bucket.safe_get() == "END"
+
+
+def _acquire_tokens(bucket, amount, result_q):
+    result_q.put(sum(bucket.acquire(timeout=1) for _ in range(amount)))
+
+
+def test_token_bucket_shared_between_processes():
+    bucket = TokenBucket(rate=0, capacity=10, tokens=10)
+    result_q = MPQueue()
+
+    procs = [
+        mp.Process(target=_acquire_tokens, args=(bucket, 3, result_q)) for _ in range(2)
+    ]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+
+    assert result_q.safe_get(1) + result_q.safe_get(1) == 6
+    assert bucket.tokens == 4
+    result_q.safe_close()
+
+
+def test_doorbell_wait():
+    doorbell = Doorbell()
+    start = time.time()
+    assert doorbell.wait(0.05) is False
+    assert time.time() - start >= 0.05
+
+    # a ring before the wait isn't lost
+    doorbell.ring()
+    assert doorbell.wait(1.0) is True
+    assert doorbell.wait(0.01) is False
+
+
+def _ring_later(doorbell):
+    time.sleep(0.1)
+    doorbell.ring()
+
+
+def test_doorbell_wakes_other_process():
+    doorbell = Doorbell()
+    proc = mp.Process(target=_ring_later, args=(doorbell,))
+    proc.start()
+
+    start = time.time()
+    assert doorbell.wait(5.0) is True
+    assert time.time() - start < 2.0
+    proc.join()
+
+
+def test_proc_worker_wait_for_work(mp_config):
+    mp_config["MaxIdleWaitSecs"] = "0.4"
+    pw = ProcWorker("TEST", mp.Event(), mp.Event(), MPQueue(), MPQueue(), mp_config)
+    doorbell = Doorbell()
+
+    assert pw.wait_for_work(doorbell) is False
+    assert pw.idle_wait_secs == 0.2
+    assert pw.wait_for_work() is False
+    assert pw.wait_for_work() is False
+    assert pw.idle_wait_secs == 0.4
+
+    doorbell.ring()
+    assert pw.wait_for_work(doorbell) is True
+    assert pw.idle_wait_secs == 0.1
+
+    # a shutdown ends the wait immediately
+    pw.shutdown_event.set()
+    start = time.time()
+    assert pw.wait_for_work() is True
+    assert time.time() - start < 0.1
+
+
 def test_sleep_secs():
     assert _sleep_secs(5.0, time.time() - 1.0) == 0.0
     assert _sleep_secs(1.0, time.time() + 5.0) == 1.0
@@ -559,3 +684,235 @@ def test_main_context_stop_procs_hung_soft(caplog, config):
     assert num_failed == 0
     assert num_terminated == 1
     assert num_still_running == 0
+
+
+def test_main_context_restarts_crashed_procs(caplog, base_config):
+    caplog.set_level(logging.DEBUG)
+
+    with MainContext(base_config) as mctx:
+        mctx.STOP_WAIT_SECS = 0.2
+        mctx.RESTART_BACKOFF_SECS = 0.05
+        mctx.MAX_RESTARTS = 2
+        proc = mctx.Proc(
+            name="FAIL", worker_class=FailProcWorker, config=base_config["General"]
+        )
+
+        restarts = 0
+        deadline = time.time() + 10
+        while not mctx.shutdown_event.is_set() and time.time() < deadline:
+            was_scheduled = proc.restart_at is not None
+            mctx.supervise(mctx.event_queue.safe_get(0.02))
+            if was_scheduled and proc.restart_at is None:
+                restarts += 1
+
+        # -- the first two crashes are restarted with a doubling backoff, the third one ends the context
+        assert restarts == 2
+        assert len(proc.crashes) == 3
+        assert proc.crashes[1] - proc.crashes[0] >= 0.05
+        assert proc.crashes[2] - proc.crashes[1] >= 0.1
+        assert mctx.shutdown_event.is_set()
+
+
+def test_main_context_ignores_clean_exits(base_config):
+    with MainContext(base_config) as mctx:
+        mctx.STOP_WAIT_SECS = 0.2
+        proc = mctx.Proc(
+            name="CLEAN", worker_class=CleanProcWorker, config=base_config["General"]
+        )
+        mctx.shutdown_event.set()
+        proc.proc.join(1)
+        mctx.shutdown_event.clear()
+
+        mctx.supervise()
+        assert proc.crashes == []
+        assert proc.restart_at is None
+        mctx.shutdown_event.set()
+
+
+def test_worker_pool_scaling():
+    work_q = MPQueue(10)
+    backlog = [0]
+    pool = WorkerPool(
+        name="POOL",
+        worker_class=QueueProcWorker,
+        config={},
+        min_instances=1,
+        max_instances=3,
+        work_q=work_q,
+        backlog=lambda: backlog[0],
+    )
+    pool.procs = ["worker_0", "worker_1"]
+
+    # -- an empty queue and backlog shrink the pool down to min_instances
+    assert pool.scaling() == -1
+    pool.procs = ["worker_0"]
+    assert pool.scaling() == 0
+
+    # -- a large backlog grows the pool up to max_instances unless the CPUs are saturated
+    backlog[0] = 100
+    assert pool.scaling(load=0.5, max_load=0.9) == 1
+    assert pool.scaling(load=1.0, max_load=0.9) == 0
+    pool.procs = ["worker_0", "worker_1", "worker_2"]
+    assert pool.scaling() == 0
+
+    # -- a full queue grows the pool without a backlog
+    backlog[0] = 0
+    pool.procs = ["worker_0"]
+    for item in range(9):
+        work_q.put(item)
+    time.sleep(0.1)
+    assert pool.scaling() == 1
+
+    # -- a few items neither grow nor shrink the pool
+    for _ in range(7):
+        work_q.get()
+    pool.procs = ["worker_0", "worker_1"]
+    assert pool.scaling() == 0
+
+
+class ItemProcWorker(QueueProcWorker):
+    def main_func(self, item):
+        time.sleep(0.001)
+
+
+def test_main_context_autoscale(base_config):
+    with MainContext(base_config) as mctx:
+        mctx.STOP_WAIT_SECS = 0.5
+        work_q = mctx.MPQueue(10)
+        backlog = [100]
+        config = configparser.ConfigParser()
+        config["Pool"] = {
+            "DefaultPollingTimeout": 0.1,
+            "Instances": 1,
+            "MinInstances": 1,
+            "MaxInstances": 2,
+        }
+        config = config["Pool"]
+        pool = mctx.Pool(
+            work_q,
+            name="ITEMS",
+            worker_class=ItemProcWorker,
+            config=config,
+            work_q=work_q,
+            backlog=lambda: backlog[0],
+        )
+        assert [proc.name for proc in pool.procs] == ["ITEMS_0"]
+
+        now = time.time() + mctx.AUTOSCALE_INTERVAL_SECS
+        mctx.autoscale(now=now)
+        assert [proc.name for proc in pool.procs] == ["ITEMS_0", "ITEMS_1"]
+        assert len(mctx.procs) == 2
+
+        # -- stopped workers leave the context once they exited
+        backlog[0] = 0
+        now += mctx.AUTOSCALE_INTERVAL_SECS
+        mctx.autoscale(now=now)
+        assert [proc.name for proc in pool.procs] == ["ITEMS_0"]
+        stopped = pool.stopping[0]
+        stopped.proc.join(5)
+        assert stopped.proc.exitcode == 0
+
+        mctx.supervise()
+        assert stopped.restart_at is None
+        mctx.autoscale(now=now)
+        assert pool.stopping == []
+        assert len(mctx.procs) == 1
+
+
+def _add_claim(claim, item):
+    claim.add(item)
+
+
+def test_claim():
+    claim = Claim(MPQueue())
+    assert claim.take() == []
+
+    claim.add(1)
+    claim.add(2)
+    claim.remove(1)
+    claim.remove(3)
+    assert claim.items() == [2]
+
+    # -- items claimed by another process are visible to the parent
+    proc = mp.Process(target=_add_claim, args=(claim, "ITEM"))
+    proc.start()
+    proc.join(5)
+    assert claim.take() == [2, "ITEM"]
+    assert claim.items() == []
+
+    with pytest.raises(ValueError):
+        claim.add("x" * Claim.MAX_BYTES)
+
+
+class ClaimingProcWorker(QueueProcWorker):
+    def main_func(self, item):
+        # -- works on the item until the worker is stopped, the item is never released
+        self.claim_item(item)
+        self.shutdown_event.wait()
+
+
+class CrashingClaimProcWorker(QueueProcWorker):
+    def main_func(self, item):
+        self.claim_item(item)
+        raise ValueError("crashed while working on the item")
+
+
+def _claiming_pool(mctx, worker_class):
+    work_q = mctx.MPQueue(10)
+    config = configparser.ConfigParser()
+    config["Pool"] = {
+        "DefaultPollingTimeout": 0.1,
+        "Instances": 1,
+        "MinInstances": 0,
+        "MaxInstances": 1,
+    }
+    pool = mctx.Pool(
+        work_q,
+        name="CLAIMS",
+        worker_class=worker_class,
+        config=config["Pool"],
+        work_q=work_q,
+    )
+    return pool, work_q
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_main_context_requeues_items_of_stopped_workers(base_config):
+    with MainContext(base_config) as mctx:
+        mctx.STOP_WAIT_SECS = 0.5
+        pool, work_q = _claiming_pool(mctx, ClaimingProcWorker)
+        proc = pool.procs[0]
+
+        work_q.put("ITEM")
+        assert _wait_for(lambda: proc.claim.items() == ["ITEM"])
+
+        # -- the worker is stopped in the middle of its item
+        mctx.scale_down(pool)
+        proc.proc.join(5)
+        assert proc.proc.exitcode == 0
+        mctx.autoscale()
+
+        assert pool.stopping == []
+        assert work_q.safe_get(1) == "ITEM"
+
+
+def test_main_context_requeues_items_of_crashed_workers(base_config):
+    with MainContext(base_config) as mctx:
+        mctx.STOP_WAIT_SECS = 0.5
+        mctx.RESTART_BACKOFF_SECS = 10
+        pool, work_q = _claiming_pool(mctx, CrashingClaimProcWorker)
+        proc = pool.procs[0]
+
+        work_q.put("ITEM")
+        proc.proc.join(5)
+        assert proc.proc.exitcode != 0
+
+        mctx.supervise()
+        assert proc.restart_at is not None
+        assert work_q.safe_get(1) == "ITEM"
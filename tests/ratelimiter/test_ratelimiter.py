@@ -0,0 +1,120 @@
+from datetime import timedelta
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+
+from europarl.ratelimiter import (
+    AdaptiveRateLimiter,
+    HostLimiter,
+    parse_retry_after,
+    status_report,
+)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("120", 120.0),
+        (" 3 ", 3.0),
+        ("-5", 0.0),
+        (formatdate(1060.0, usegmt=True), 60.0),
+        ("soon", None),
+        (None, None),
+    ],
+)
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value, now=1000.0) == expected
+
+
+def test_status_report():
+    resp = SimpleNamespace(
+        elapsed=timedelta(milliseconds=250), headers={"Retry-After": "10"}
+    )
+    assert status_report(429, "https://www.europarl.europa.eu/doc.pdf", resp) == (
+        "www.europarl.europa.eu",
+        429,
+        0.25,
+        "10",
+    )
+    assert status_report(460) == (None, 460, None, None)
+
+
+def test_additive_increase():
+    limiter = HostLimiter(rate=1, min_rate=0.1, max_rate=2, increase=0.1)
+
+    limiter.record(200, now=0)
+    assert limiter.rate == pytest.approx(1.1)
+
+    for i in range(100):
+        limiter.record(404, now=i)
+    assert limiter.rate == 2
+
+    # client errors besides 404 neither increase nor decrease the rate
+    limiter.rate = 1
+    limiter.record(403, now=200)
+    assert limiter.rate == 1
+
+
+def test_multiplicative_decrease_once_per_window():
+    limiter = HostLimiter(rate=1, min_rate=0.1, max_rate=2, decrease=0.5)
+
+    assert limiter.record(503, now=100) is True
+    assert limiter.rate == 0.5
+    # further errors within 1 / rate seconds belong to the same overload
+    assert limiter.record(500, now=101) is False
+    assert limiter.rate == 0.5
+
+    assert limiter.record(408, now=103) is True
+    assert limiter.rate == 0.25
+
+    for i in range(10):
+        limiter.record(429, now=1000 + i * 100)
+    assert limiter.rate == 0.1
+
+
+def test_retry_after_blocks_host():
+    limiter = HostLimiter(rate=1, min_rate=0.1, max_rate=2)
+
+    assert limiter.record(429, retry_after="30", now=100) is True
+    assert limiter.blocked_for(now=110) == 20
+    assert limiter.blocked_for(now=140) == 0
+
+    # Retry-After is only honoured on 429 and 503
+    limiter.record(500, retry_after="30", now=200)
+    assert limiter.blocked_for(now=200) == 0
+
+
+def test_latency_signal():
+    limiter = HostLimiter(rate=1, min_rate=0.1, max_rate=2, latency_target=1.0)
+
+    for i in range(9):
+        limiter.record(200, latency=0.2, now=i)
+    rate = limiter.rate
+    # a single slow response is an outlier
+    assert limiter.record(200, latency=5, now=10) is False
+
+    for i in range(5):
+        limiter.record(200, latency=5, now=20 + i * 10)
+    assert limiter.rate < rate
+    assert limiter.percentile(50) == 0.2
+    assert limiter.percentile(90) == 5
+
+
+def test_adaptive_rate_limiter():
+    limiter = AdaptiveRateLimiter(rate=1, min_rate=0.1, max_rate=1)
+    assert limiter.rate(now=0) == 1
+
+    limiter.record("a.eu", 200, latency=0.5, now=0)
+    limiter.record("b.eu", 503, latency=0.5, now=0)
+    assert limiter.rate(now=1) == 0.5
+
+    limiter.record("a.eu", 429, retry_after="60", now=1)
+    assert limiter.rate(now=2) == 0
+    assert limiter.blocked_for(now=2) == 59
+    assert limiter.rate(now=61) == 0.5
+
+    assert limiter.latency_percentiles((50,)) == {
+        "a.eu": {50: 0.5},
+        "b.eu": {50: 0.5},
+    }
@@ -0,0 +1,141 @@
+import os
+from unittest.mock import Mock
+
+import pytest
+
+from europarl.rules import extraction
+from europarl.rules.extraction import (
+    beautifulsoup_html_text,
+    extraction_backends,
+    filecontent,
+    lxml_html_text,
+    make_backend_registry,
+    pymupdf_pdf_text,
+    streaming_html_text,
+)
+
+HTML = """<!DOCTYPE html>
+<html lang="en">
+<head><title>Minutes</title><style>p {color: red}</style><script>var a = 1;</script></head>
+<body>
+<!-- comment -->
+<h1>Sitting of 1 August</h1>
+<p>The sitting opened at <b>9.00</b>.</p><template>hidden</template>
+<table><tr><td>Vote</td><td>Yes</td></tr></table>
+</body>
+</html>
+"""
+
+
+@pytest.fixture
+def html_file(tmp_path):
+    filepath = tmp_path / "document.html"
+    filepath.write_text(HTML)
+    return str(filepath)
+
+
+def test_backend_registry():
+    register = make_backend_registry()
+
+    @register(".txt", "fast")
+    def fast(filepath):
+        return "fast"
+
+    @register(".txt", "missing", available=False)
+    def missing(filepath):
+        return "missing"
+
+    @register(".txt", "slow")
+    def slow(filepath):
+        return "slow"
+
+    assert list(register.all[".txt"]) == ["fast", "slow"]
+    assert list(extraction_backends.all[".html"]) == [
+        "htmlstream",
+        "lxml",
+        "beautifulsoup",
+    ]
+    # PyMuPDF is preferred if it is installed, pdfminer is the fallback
+    pdf_backends = ["pdfminer"] if extraction.fitz is None else ["pymupdf", "pdfminer"]
+    assert list(extraction_backends.all[".pdf"]) == pdf_backends
+
+
+def test_pymupdf_runs_in_the_extraction_pool(monkeypatch):
+    run = Mock(return_value="text")
+    monkeypatch.setattr(extraction.pdf_extractor, "run", run)
+
+    assert pymupdf_pdf_text("document.pdf") == "text"
+    assert run.call_args[0][:2] == (extraction._pymupdf_text, ("document.pdf",))
+
+
+def test_html_backends_extract_the_same_words(html_file):
+    lxml_text = lxml_html_text(html_file)
+    assert lxml_text.split() == beautifulsoup_html_text(html_file).split()
+    assert "var a" not in lxml_text
+    assert "hidden" not in lxml_text
+    assert "comment" not in lxml_text
+
+
+def test_filecontent_backend_selection(html_file, monkeypatch):
+    calls = []
+
+    def failing(filepath):
+        calls.append("failing")
+        raise ValueError("broken")
+
+    def working(filepath):
+        calls.append("working")
+        return "text"
+
+    monkeypatch.setitem(
+        extraction_backends.all, ".html", {"failing": failing, "working": working}
+    )
+
+    # failing backends fall back to the next one
+    assert filecontent(html_file, ".html") == {"content": "text"}
+    assert calls == ["failing", "working"]
+
+    # a rule can select the backend which is tried first
+    calls.clear()
+    assert filecontent(html_file, ".html", "working") == {"content": "text"}
+    assert calls == ["working"]
+
+    monkeypatch.setitem(extraction_backends.all, ".html", {"failing": failing})
+    assert filecontent(html_file, ".html") == {"content": None}
+
+
+def test_filecontent_of_unknown_format(html_file):
+    assert filecontent(html_file, ".docx") == {"content": None}
+
+
+TRICKY_HTML = """<!DOCTYPE html>
+<HTML><head><title>CRE &amp; PV</title></head>
+<BODY>
+<?xml-stylesheet href="style.css"?>
+<p>Price: 5&nbsp;&euro; &#8364; &#x20AC; &unknown; AT&T</p>
+<template><p>outer <template>inner</template> still hidden</p></template>
+<script>if (a < b && c > d) { document.write("</p>"); }</script>
+<p>Line<br/>break <img src="a.png" alt="not text"> after</p>
+<![CDATA[cdata text]]>
+<ul><li>one<li>two</ul>
+</BODY></HTML>
+"""
+
+
+def test_streaming_html_text_matches_beautifulsoup(tmp_path):
+    filepath = tmp_path / "document.html"
+    filepath.write_text(TRICKY_HTML)
+    assert streaming_html_text(str(filepath)) == beautifulsoup_html_text(str(filepath))
+
+
+def test_streaming_html_text_across_chunks(tmp_path):
+    filepath = tmp_path / "large.html"
+    # entities and tags are split at the chunk boundaries of the reader
+    body = "".join(
+        "<p class='speech'>Speaker {} &amp; President&#44; {}</p>\n".format(i, "x" * i)
+        for i in range(2000)
+    )
+    filepath.write_text("<html><body>{}</body></html>".format(body))
+    assert os.path.getsize(filepath) > 2 * extraction.CHUNK_SIZE
+
+    assert streaming_html_text(str(filepath)) == beautifulsoup_html_text(str(filepath))
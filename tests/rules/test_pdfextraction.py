@@ -0,0 +1,143 @@
+import time
+
+import pytest
+from pdfminer.high_level import extract_text
+
+from europarl.rules import extraction, pdfextraction
+from europarl.rules.pdfextraction import (
+    ExtractionTimeout,
+    PdfExtractor,
+    available_processes,
+    page_count,
+    page_ranges,
+)
+
+
+def write_pdf(path, pages):
+    """
+    Writes a minimal PDF with one line of text on every page
+    """
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{}] /Count {} >>".format(
+            " ".join("{} 0 R".format(4 + 2 * i) for i in range(pages)), pages
+        ),
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i in range(pages):
+        stream = "BT /F1 24 Tf 72 720 Td (Page {}) Tj ET".format(i + 1)
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            "/Resources << /Font << /F1 3 0 R >> >> /Contents {} 0 R >>".format(
+                5 + 2 * i
+            )
+        )
+        objects.append(
+            "<< /Length {} >>\nstream\n{}\nendstream".format(len(stream), stream)
+        )
+
+    content = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(content))
+        content += "{} 0 obj\n{}\nendobj\n".format(number, body).encode("latin-1")
+
+    xref = len(content)
+    content += "xref\n0 {}\n0000000000 65535 f \n".format(len(objects) + 1).encode()
+    for offset in offsets:
+        content += "{:010d} 00000 n \n".format(offset).encode()
+    content += "trailer\n<< /Size {} /Root 1 0 R >>\nstartxref\n{}\n%%EOF\n".format(
+        len(objects) + 1, xref
+    ).encode()
+
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_page_ranges():
+    assert page_ranges(0, 10) == []
+    assert page_ranges(5, 10) == [range(0, 5)]
+    assert page_ranges(25, 10) == [range(0, 10), range(10, 20), range(20, 25)]
+
+
+def test_extract_in_page_order(tmp_path):
+    filepath = write_pdf(tmp_path / "document.pdf", 7)
+    assert page_count(filepath) == 7
+
+    extractor = PdfExtractor(processes=3, pages_per_task=2)
+    text = extractor.extract(filepath)
+
+    assert text == extract_text(filepath)
+    assert [page.strip() for page in text.split("\x0c")[:-1]] == [
+        "Page {}".format(i + 1) for i in range(7)
+    ]
+
+    # the pool is kept for the next document
+    pool = extractor.pool
+    assert extractor.extract(filepath) == text
+    assert extractor.pool is pool
+    extractor.close()
+    assert extractor.pool is None
+
+
+def test_configure_divides_the_cpus_between_the_workers(monkeypatch):
+    monkeypatch.setattr(pdfextraction.os, "cpu_count", lambda: 8)
+    assert available_processes(3) == 2
+    assert available_processes(12) == 1
+
+    extractor = PdfExtractor()
+    extractor.configure({"Instances": "4"})
+    assert extractor.processes == 2
+    extractor.configure({"Instances": "2", "MaxInstances": "8"})
+    assert extractor.processes == 1
+    extractor.configure({"Instances": "2", "ExtractionProcesses": "3"})
+    assert extractor.processes == 3
+
+
+def _slow_page_range(filepath, first, last):
+    time.sleep(5)
+
+
+def test_extract_timeout(tmp_path, monkeypatch):
+    filepath = write_pdf(tmp_path / "document.pdf", 2)
+    monkeypatch.setattr(pdfextraction, "_extract_page_range", _slow_page_range)
+
+    extractor = PdfExtractor(processes=2, pages_per_task=1, page_timeout=0.2)
+    start = time.monotonic()
+    with pytest.raises(ExtractionTimeout):
+        extractor.extract(filepath)
+    assert time.monotonic() - start < 4
+    # the stuck processes are killed with their pool
+    assert extractor.pool is None
+
+
+def test_extract_timeout_per_range(tmp_path, monkeypatch):
+    # a stuck range is aborted after its own time limit instead of the limit of the whole document
+    filepath = write_pdf(tmp_path / "document.pdf", 10)
+    monkeypatch.setattr(pdfextraction, "_extract_page_range", _slow_page_range)
+
+    start = time.monotonic()
+    with pytest.raises(ExtractionTimeout):
+        PdfExtractor(processes=1, pages_per_task=1, page_timeout=0.2).extract(filepath)
+    assert time.monotonic() - start < 1.5
+
+
+def _slow_page_count(filepath):
+    time.sleep(5)
+
+
+def test_page_count_timeout(tmp_path, monkeypatch):
+    filepath = write_pdf(tmp_path / "document.pdf", 2)
+    monkeypatch.setattr(pdfextraction, "page_count", _slow_page_count)
+
+    start = time.monotonic()
+    with pytest.raises(ExtractionTimeout):
+        PdfExtractor(processes=1, pages_per_task=1, page_timeout=0.2).extract(filepath)
+    assert time.monotonic() - start < 4
+
+
+def test_filecontent_of_broken_pdf(tmp_path):
+    filepath = tmp_path / "broken.pdf"
+    filepath.write_bytes(b"no pdf")
+
+    assert extraction.filecontent(str(filepath), ".pdf") == {"content": None}
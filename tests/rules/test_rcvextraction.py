@@ -0,0 +1,132 @@
+from europarl.rules.extraction import filecontent
+from europarl.rules.rcvextraction import rollcall_votes
+from europarl.rules.votingNamed import NamedVotingFrXMLRule
+
+RCV_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<PV.RollCallVoteResults EP.Number="PE 646.608" Sitting.Date="2020-01-15">
+  <RollCallVote.Result Identifier="113345" Date="2020-01-15 12:30:12">
+    <RollCallVote.Description.Text><a href="#">A9-0047/2019</a> - Rapporteur - Am 1</RollCallVote.Description.Text>
+    <Result.For Number="2">
+      <Result.PoliticalGroup.List Identifier="ECR">
+        <PoliticalGroup.Member.Name MepId="4558" PersId="124956">Aguilar</PoliticalGroup.Member.Name>
+      </Result.PoliticalGroup.List>
+      <Result.PoliticalGroup.List Identifier="PPE">
+        <PoliticalGroup.Member.Name MepId="6666" PersId="197123">Müller</PoliticalGroup.Member.Name>
+      </Result.PoliticalGroup.List>
+    </Result.For>
+    <Result.Against Number="1">
+      <Result.PoliticalGroup.List Identifier="S&amp;D">
+        <PoliticalGroup.Member.Name MepId="5012" PersId="125000">Dupont</PoliticalGroup.Member.Name>
+      </Result.PoliticalGroup.List>
+    </Result.Against>
+    <Result.Abstention Number="0"/>
+    <Intentions>
+      <Intention.Against>
+        <PoliticalGroup.Member.Name MepId="6666" PersId="197123">Müller</PoliticalGroup.Member.Name>
+      </Intention.Against>
+    </Intentions>
+  </RollCallVote.Result>
+  <RollCallVote.Result Identifier="113346" Date="2020-01-15 12:31:40">
+    <RollCallVote.Description.Text>B9-0040/2020 - Résolution</RollCallVote.Description.Text>
+    <Result.For>
+      <Result.PoliticalGroup.List Identifier="S&amp;D">
+        <PoliticalGroup.Member.Name MepId="5012" PersId="125000">Dupont</PoliticalGroup.Member.Name>
+      </Result.PoliticalGroup.List>
+    </Result.For>
+    <Result.Abstention Number="1">
+      <Result.PoliticalGroup.List Identifier="NI">
+        <PoliticalGroup.Member.Name MepId="7001" PersId="200001">Rossi</PoliticalGroup.Member.Name>
+      </Result.PoliticalGroup.List>
+    </Result.Abstention>
+  </RollCallVote.Result>
+</PV.RollCallVoteResults>
+"""
+
+
+def write_rcv(tmp_path):
+    filepath = tmp_path / "named_voting_fr_xml.xml"
+    filepath.write_text(RCV_XML, encoding="utf-8")
+    return str(filepath)
+
+
+def test_rollcall_votes(tmp_path):
+    result = rollcall_votes(write_rcv(tmp_path))
+
+    assert result["votes"] == [
+        {
+            "id": "113345",
+            "date": "2020-01-15 12:30:12",
+            "description": "A9-0047/2019 - Rapporteur - Am 1",
+            "for": 2,
+            "against": 1,
+            "abstention": 0,
+            "positions": {
+                "for": ["4558", "6666"],
+                "against": ["5012"],
+                "abstention": [],
+            },
+            "intentions": {"for": [], "against": ["6666"], "abstention": []},
+        },
+        {
+            "id": "113346",
+            "date": "2020-01-15 12:31:40",
+            "description": "B9-0040/2020 - Résolution",
+            # counts missing in the document are taken from the member lists
+            "for": 1,
+            "against": 0,
+            "abstention": 1,
+            "positions": {"for": ["5012"], "against": [], "abstention": ["7001"]},
+            "intentions": {"for": [], "against": [], "abstention": []},
+        },
+    ]
+    assert result["members"] == [
+        {"id": "4558", "name": "Aguilar", "group": "ECR"},
+        {"id": "6666", "name": "Müller", "group": "PPE"},
+        {"id": "5012", "name": "Dupont", "group": "S&D"},
+        {"id": "7001", "name": "Rossi", "group": "NI"},
+    ]
+
+
+def test_rollcall_votes_of_many_votes(tmp_path):
+    vote = RCV_XML.split("<RollCallVote.Result ", 2)[1].rsplit(
+        "</RollCallVote.Result>", 1
+    )[0]
+    votes = "".join(
+        "<RollCallVote.Result {}</RollCallVote.Result>\n".format(
+            vote.replace('"113345"', '"{}"'.format(i), 1)
+        )
+        for i in range(1000)
+    )
+    filepath = tmp_path / "large.xml"
+    filepath.write_text(
+        "<PV.RollCallVoteResults>{}</PV.RollCallVoteResults>".format(votes),
+        encoding="utf-8",
+    )
+
+    result = rollcall_votes(str(filepath))
+    assert [vote["id"] for vote in result["votes"]] == [str(i) for i in range(1000)]
+    # members are listed once, not once per vote
+    assert len(result["members"]) == 3
+
+
+def test_named_voting_extract_data(tmp_path):
+    filepath = write_rcv(tmp_path)
+
+    data = NamedVotingFrXMLRule.extract_data(filepath)
+
+    assert len(data["votes"]) == 2
+    assert len(data["members"]) == 4
+    assert data["content"] == filecontent(filepath, ".xml")["content"]
+    assert "Rapporteur" in data["content"]
+    assert "Müller" in data["content"]
+
+
+def test_named_voting_extract_data_of_broken_file(tmp_path):
+    filepath = tmp_path / "broken.xml"
+    filepath.write_text("<PV.RollCallVoteResults><RollCallVote.Result>")
+
+    data = NamedVotingFrXMLRule.extract_data(str(filepath))
+
+    assert data["votes"] is None
+    assert data["members"] is None
+    assert data["filesize"] > 0
@@ -0,0 +1,162 @@
+import multiprocessing as mp
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from europarl.mptools import (
+    MainContext,
+    MPQueue,
+    default_signal_handler,
+    init_signals,
+)
+from europarl.workers import AsyncDocumentDownloader
+
+
+@pytest.fixture
+def downloader_instance(request, db_interface, config):
+
+    with MainContext(config) as main_ctx:
+        init_signals(
+            main_ctx.shutdown_event, default_signal_handler, default_signal_handler
+        )
+
+        # queues and the shutdown event of the main context are closed/set when leaving the context
+        token_bucket_q = MPQueue(10)
+        url_q = MPQueue(10)
+
+        return AsyncDocumentDownloader(
+            "name",
+            mp.Event(),
+            mp.Event(),
+            main_ctx.event_queue,
+            main_ctx.logger_q,
+            main_ctx.config["Downloader"],
+            token_bucket_q,
+            url_q,
+        )
+
+
+def fake_urls(amount):
+    return [
+        {"id": i, "url": "www.internet.de/{}".format(i), "filetype": ".pdf"}
+        for i in range(amount)
+    ]
+
+
+def test_fetchers_consume_all_tokens(downloader_instance):
+    dl = downloader_instance
+    dl.startup()
+
+    dl.get_url = Mock(side_effect=fake_urls(3))
+    dl.fetch = Mock(
+        return_value=(
+            SimpleNamespace(**{"status_code": 200, "url": "www.internet.de"}),
+            None,
+        )
+    )
+    dl.record_response = Mock()
+
+    for i in range(3):
+        dl.work_q.put("token:{}".format(i))
+    dl.work_q.put("END")
+
+    dl.main_loop()
+
+    assert len(dl.fetch.mock_calls) == 3
+    assert len(dl.record_response.mock_calls) == 3
+
+    dl.shutdown()
+
+
+def test_fetcher_retries_url_after_exception(downloader_instance):
+    dl = downloader_instance
+    dl.startup()
+    dl.CONCURRENCY = 1
+
+    dl.get_url = Mock(side_effect=fake_urls(1))
+    dl.fetch = Mock(
+        side_effect=[
+            requests.ReadTimeout(),
+            (
+                SimpleNamespace(**{"status_code": 200, "url": "www.internet.de"}),
+                None,
+            ),
+        ]
+    )
+    dl.record_response = Mock()
+    dl.record_exception = Mock()
+
+    for i in range(2):
+        dl.work_q.put("token:{}".format(i))
+    dl.work_q.put("END")
+
+    dl.main_loop()
+
+    assert len(dl.get_url.mock_calls) == 1
+    assert len(dl.record_exception.mock_calls) == 1
+    assert len(dl.record_response.mock_calls) == 1
+
+    dl.shutdown()
+
+
+def test_no_work_returns_token(downloader_instance):
+    dl = downloader_instance
+    dl.startup()
+    dl.CONCURRENCY = 1
+
+    dl.get_url = Mock(return_value=None)
+    dl.fetch = Mock()
+
+    def stop_after_first_return(token):
+        dl.stopped = True
+        return True
+
+    dl.work_q.safe_put = Mock(side_effect=stop_after_first_return)
+    dl.work_q.put("token:0")
+
+    dl.main_loop()
+
+    assert len(dl.work_q.safe_put.mock_calls) == 1
+    assert len(dl.fetch.mock_calls) == 0
+
+    dl.shutdown()
+
+
+def test_fetchers_stop_on_shutdown_event(downloader_instance):
+    dl = downloader_instance
+    dl.startup()
+    dl.fetch = Mock()
+
+    # no tokens are provided, the fetchers are blocked on the token bucket
+    threading.Timer(0.1, dl.shutdown_event.set).start()
+    dl.main_loop()
+
+    assert len(dl.fetch.mock_calls) == 0
+
+    dl.shutdown()
+
+
+def test_shutdown_records_downloads_in_flight(downloader_instance):
+    dl = downloader_instance
+    dl.startup()
+    dl.record_response = Mock()
+
+    url = fake_urls(1)[0]
+    resp = SimpleNamespace(**{"status_code": 200, "url": "www.internet.de"})
+    started = threading.Event()
+
+    def slow_fetch():
+        started.set()
+        time.sleep(0.1)
+        return resp, None
+
+    dl.in_flight[0] = (url, dl.executor.submit(slow_fetch))
+    started.wait()
+    dl.shutdown()
+
+    dl.record_response.assert_called_once_with(url, resp, None)
+    assert dl.in_flight == {}
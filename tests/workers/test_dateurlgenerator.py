@@ -0,0 +1,114 @@
+import multiprocessing as mp
+from datetime import date
+from unittest.mock import Mock
+
+import pytest
+
+from europarl.db import Request, Rules, SessionDay, URLs
+from europarl.mptools import Doorbell, MainContext, MPQueue
+from europarl.rules.rule import rule_registry
+from europarl.workers import DateUrlGenerator
+
+
+@pytest.fixture
+def dateurlgenerator_instance(db_interface, config):
+    with MainContext(config) as main_ctx:
+        return DateUrlGenerator(
+            "name",
+            mp.Event(),
+            mp.Event(),
+            main_ctx.event_queue,
+            main_ctx.logger_q,
+            main_ctx.config["DateUrlGenerator"],
+            MPQueue(10),
+        )
+
+
+def test_create_urls(dateurlgenerator_instance):
+    dug = dateurlgenerator_instance
+    dug.startup()
+    dug.urls = Mock()
+    dug.urls.save_urls.side_effect = lambda rows: [
+        (i, *row) for i, row in enumerate(rows)
+    ]
+
+    day = date(2020, 1, 13)
+    combos = [
+        {"date_id": 1, "date": day, "rule_id": 2, "rulename": "protocol_en_pdf"},
+        {"date_id": 1, "date": day, "rule_id": 3, "rulename": "protocol_en_html"},
+    ]
+
+    urls = dug.create_urls(combos)
+
+    dug.urls.save_urls.assert_called_once()
+    assert urls == [
+        (0, rule_registry.all["protocol_en_pdf"].url(day)),
+        (1, rule_registry.all["protocol_en_html"].url(day)),
+    ]
+
+
+def test_main_func_enqueues_buffer(dateurlgenerator_instance):
+    dug = dateurlgenerator_instance
+    dug.startup()
+    dug.url_buffer = [(1, "www.internet1.de"), (2, "www.internet2.de")]
+
+    dug.main_func()
+    dug.main_func()
+
+    assert dug.url_q.safe_get() == 2
+    assert dug.url_q.safe_get() == 1
+    assert dug.url_buffer == []
+
+
+def test_waits_for_session_bell(dateurlgenerator_instance):
+    dug = dateurlgenerator_instance
+    dug.startup()
+    if dug.listener is not None:
+        dug.listener.close()
+    dug.listener = None
+    dug.session_bell = Doorbell()
+    dug.get_new_combos = Mock(return_value=[])
+
+    dug.main_func()
+    assert dug.idle_wait_secs == 2 * dug.DEFAULT_POLLING_TIMEOUT
+
+    # a confirmed session day wakes the generator and resets the idle wait
+    dug.session_bell.ring()
+    dug.main_func()
+    assert dug.idle_wait_secs == dug.DEFAULT_POLLING_TIMEOUT
+
+    dug.shutdown()
+
+
+def test_failed_urls_keep_combos_pending(dateurlgenerator_instance, db_interface):
+    dug = dateurlgenerator_instance
+    dug.startup()
+
+    day = date(2020, 1, 13)
+    ru = Rules(db_interface)
+    ru.register_rules(rule_registry.all)
+    rule_id, name, active = ru.get_rule(rulename="protocol_en_pdf")
+    ru.update_rule_state(id=rule_id, active=True)
+    session_day_id, name, active = ru.get_rule(rulename="session_day")
+    day_id = SessionDay(db_interface).insert_date(day)
+    url_id = URLs(db_interface).save_url(
+        date_id=day_id, rule_id=session_day_id, url="www.internet.de"
+    )
+    Request(db_interface).mark_as_requested(
+        url_id=url_id, status_code=200, redirected_url="www.internet.de"
+    )
+
+    # the generator fails between claiming the combination and storing its url
+    create_urls = dug.create_urls
+    dug.create_urls = Mock(side_effect=RuntimeError)
+    with pytest.raises(RuntimeError):
+        dug.main_func()
+    assert dug.url_buffer == []
+
+    dug.create_urls = create_urls
+    dug.main_func()
+    assert [url for url_id, url in dug.url_buffer] == [
+        rule_registry.all["protocol_en_pdf"].url(day)
+    ]
+
+    dug.shutdown()
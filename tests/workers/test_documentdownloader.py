@@ -0,0 +1,167 @@
+import multiprocessing as mp
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from europarl.mptools import Claim, MainContext, MPQueue
+from europarl.workers import DocumentDownloader
+
+
+class FakeTransactionDB:
+    def __init__(self):
+        self.open = False
+        self.commits = 0
+        self.rollbacks = 0
+
+    def in_transaction(self):
+        return self.open
+
+    def begin(self):
+        self.open = True
+
+    def commit(self):
+        self.open = False
+        self.commits += 1
+
+    def rollback(self):
+        self.open = False
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def downloader_instance(request, db_interface, config):
+    with MainContext(config) as main_ctx:
+        dl = DocumentDownloader(
+            "name",
+            mp.Event(),
+            mp.Event(),
+            main_ctx.event_queue,
+            main_ctx.logger_q,
+            main_ctx.config["Downloader"],
+            MPQueue(10),
+            MPQueue(10),
+        )
+        dl.startup()
+        dl.db = FakeTransactionDB()
+        dl.request = Mock()
+        dl.docs = Mock()
+        dl.url = Mock()
+        return dl
+
+
+def response(status_code=200):
+    return SimpleNamespace(status_code=status_code, url="www.internet.de", headers={})
+
+
+def test_records_are_committed_per_batch(downloader_instance):
+    dl = downloader_instance
+    dl.COMMIT_EVERY = 3
+    dl.COMMIT_INTERVAL_SECS = 60
+
+    url = {"id": 1, "url": "www.internet.de"}
+    for _ in range(5):
+        dl.record_response(url, response(), None)
+
+    assert dl.request.mark_as_requested.call_count == 5
+    assert dl.db.commits == 1
+    assert len(dl.pending_records) == 2
+
+    dl.shutdown()
+    assert dl.db.commits == 2
+
+
+def test_records_are_committed_after_interval(downloader_instance):
+    dl = downloader_instance
+    dl.COMMIT_EVERY = 100
+    dl.COMMIT_INTERVAL_SECS = 0
+
+    dl.record_response({"id": 1, "url": "www.internet.de"}, response(), None)
+
+    assert dl.db.commits == 1
+
+
+def test_claimed_urls_are_released_after_commit(downloader_instance):
+    dl = downloader_instance
+    dl.COMMIT_EVERY = 2
+    dl.COMMIT_INTERVAL_SECS = 60
+    dl.claim = Claim(dl.url_q)
+
+    for url_id in [1, 2]:
+        dl.claim_item(url_id)
+
+    dl.record_response({"id": 1, "url": "www.internet.de"}, response(), None)
+    assert dl.claim.items() == [1, 2]
+
+    dl.record_response({"id": 2, "url": "www.internet.de"}, response(), None)
+    assert dl.db.commits == 1
+    assert dl.claim.items() == []
+
+
+def test_failed_record_keeps_earlier_records(downloader_instance):
+    dl = downloader_instance
+    dl.COMMIT_EVERY = 100
+    dl.COMMIT_INTERVAL_SECS = 60
+    dl.claim = Claim(dl.url_q)
+    dl.request.mark_as_requested.side_effect = [None, ValueError, None]
+
+    first, second = {"id": 1, "url": "www.internet.de"}, {
+        "id": 2,
+        "url": "www.internet.de",
+    }
+    dl.claim_item(first["id"])
+    dl.claim_item(second["id"])
+
+    dl.record_response(first, response(), None)
+    with pytest.raises(ValueError):
+        dl.record_response(second, response(), None)
+
+    # the batch is rolled back and the record of the first download is written again
+    assert dl.db.rollbacks == 1
+    assert dl.db.commits == 1
+    assert (
+        dl.request.mark_as_requested.call_args_list[2]
+        == dl.request.mark_as_requested.call_args_list[0]
+    )
+    assert dl.pending_records == []
+
+    # only the committed url is released, the failed one is handed back when the worker stops
+    assert dl.claim.items() == [2]
+
+
+def test_status_codes_are_reported(downloader_instance):
+    dl = downloader_instance
+    dl.status_q = MPQueue(10)
+
+    url = {"id": 1, "url": "https://www.internet.de/doc.pdf"}
+    dl.record_response(url, response(404), None)
+    dl.record_exception(url, Exception("connection reset"))
+
+    assert list(dl.status_q.drain()) == [
+        ("www.internet.de", 404, None, None),
+        ("www.internet.de", 460, None, None),
+    ]
+
+
+def test_claimed_urls_are_released_after_download(downloader_instance):
+    dl = downloader_instance
+    dl.claim = Claim(dl.url_q)
+    dl.url.get_url.return_value = {
+        "id": 7,
+        "url": "https://www.internet.de/doc.pdf",
+        "filetype": ".pdf",
+    }
+    dl.fetch = Mock(side_effect=[requests.ConnectionError(), (response(404), None)])
+
+    dl.url_q.put(7)
+    time.sleep(0.1)
+
+    # a failed download keeps the url claimed for the retry with the next token
+    dl.main_func("token:0")
+    assert dl.claim.items() == [7]
+
+    dl.main_func("token:1")
+    assert dl.claim.items() == []
+    assert len(dl.fetch.mock_calls) == 2
@@ -1,6 +1,7 @@
 import configparser
 import multiprocessing as mp
 import os
+import time
 from datetime import date, datetime, timedelta, timezone
 from types import SimpleNamespace
 from unittest.mock import MagicMock, Mock
@@ -185,3 +186,59 @@ def test_crawl(sessiondaychecker_instance, db_interface, status_code, sleep_set)
     assert (sd.sleep_end > datetime.now(tz=timezone.utc)) == sleep_set
 
     sd.shutdown()
+
+
+def test_crawl_batch(sessiondaychecker_instance):
+    sd = sessiondaychecker_instance
+    sd.config["BatchSize"] = "2"
+    sd.startup()
+
+    days = [date(2020, 1, 13), date(2020, 1, 14)]
+
+    sd.session_day_rule_id = 1
+    sd.sessionDay = Mock()
+    sd.sessionDay.insert_dates.return_value = [(1, days[0]), (2, days[1])]
+    sd.urls = Mock()
+    sd.urls.save_urls.return_value = [(10, 1, 1, "url_a"), (11, 2, 1, "url_b")]
+    sd.request = Mock()
+    sd.session = Mock()
+    sd.session.head.side_effect = lambda url, allow_redirects: SimpleNamespace(
+        status_code=200 if url == "url_a" else 404, url=url
+    )
+
+    sd.crawl_batch(days)
+
+    sd.sessionDay.insert_dates.assert_called_once_with(days)
+    assert len(sd.urls.save_urls.call_args[0][0]) == 2
+    sd.request.mark_many_as_requested.assert_called_once_with(
+        [(10, 200, "url_a"), (11, 404, "url_b")]
+    )
+
+    sd.shutdown()
+
+
+def test_collect_tokens(sessiondaychecker_instance):
+    sd = sessiondaychecker_instance
+    sd.BATCH_SIZE = 3
+    sd.work_q = MPQueue(10)
+    sd.work_q.safe_put("TOKEN")
+    sd.work_q.safe_put("END")
+
+    assert sd.collect_tokens("TOKEN") == ["TOKEN", "TOKEN"]
+    assert sd.work_q.safe_get() == "END"
+
+
+def test_main_loop_sleeps_without_taking_tokens(sessiondaychecker_instance):
+    sd = sessiondaychecker_instance
+    sd.work_q = MPQueue(10)
+    sd.work_q.safe_put("TOKEN")
+    sd.shutdown_event = mp.Event()
+    sd.set_sleep(timedelta(seconds=0.2))
+    sd.main_func = Mock(side_effect=lambda token: sd.shutdown_event.set())
+
+    start = time.time()
+    sd.main_loop()
+
+    # the token stays in the bucket until the sleep is over
+    assert time.time() - start >= 0.2
+    sd.main_func.assert_called_once_with("TOKEN")
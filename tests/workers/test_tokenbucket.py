@@ -16,6 +16,7 @@ from europarl.mptools import (
     ProcWorker,
     QueueProcWorker,
     TimerProcWorker,
+    TokenBucket,
     default_signal_handler,
     init_signals,
 )
@@ -208,3 +209,63 @@ def test_unthrottle(tokenbucket_instance):
             assert tokenbucket_instance.INTERVAL_SECS == old / 2
         else:
             assert tokenbucket_instance.INTERVAL_SECS == old
+
+
+def test_status_queue_summary(tokenbucket_instance):
+    tokenbucket_instance.startup()
+    tokenbucket_instance.request.get_status_code_summary = MagicMock()
+    tokenbucket_instance.status_q = MPQueue(10)
+
+    for status_code in [200, 200, 429]:
+        tokenbucket_instance.status_q.put(("www.internet.de", status_code, 0.1, None))
+
+    now = datetime.now(tz=timezone.utc)
+    tokenbucket_instance.check_throttling(now)
+    tokenbucket_instance.next_check = now
+
+    summary = tokenbucket_instance.get_status_code_summary(now, now)
+    assert summary == {200: 2, 429: 1}
+    assert tokenbucket_instance.get_status_code_summary(now, now) == {}
+    assert tokenbucket_instance.request.get_status_code_summary.mock_calls == []
+
+
+def test_shared_token_bucket(tokenbucket_instance):
+    tokenbucket_instance.token_bucket_q = TokenBucket(rate=0, capacity=10, tokens=5)
+    tokenbucket_instance.startup()
+    tokenbucket_instance.check_throttling = MagicMock()
+
+    bucket = tokenbucket_instance.token_bucket_q
+    assert bucket.rate == 1 / tokenbucket_instance.MIN_INTERVAL_SECS
+
+    # the bucket refills itself, main_func only checks for throttling
+    tokenbucket_instance.main_func()
+    assert len(tokenbucket_instance.check_throttling.mock_calls) == 1
+
+    tokenbucket_instance.throttle()
+    assert bucket.tokens < 1
+    assert bucket.rate == 1 / (2 * tokenbucket_instance.MIN_INTERVAL_SECS)
+
+    tokenbucket_instance.unthrottle()
+    assert bucket.rate == 1 / tokenbucket_instance.MIN_INTERVAL_SECS
+
+
+def test_aimd_throttling(tokenbucket_instance):
+    tokenbucket_instance.config["Throttling"] = "aimd"
+    tokenbucket_instance.token_bucket_q = TokenBucket(rate=0, capacity=10, tokens=5)
+    tokenbucket_instance.startup()
+    tokenbucket_instance.status_q = MPQueue(10)
+    bucket = tokenbucket_instance.token_bucket_q
+    max_rate = 1 / tokenbucket_instance.MIN_INTERVAL_SECS
+
+    tokenbucket_instance.status_q.put(("www.internet.de", 500, 0.1, None))
+    tokenbucket_instance.check_throttling(datetime.now(tz=timezone.utc))
+    assert bucket.rate == max_rate / 2
+    assert (
+        tokenbucket_instance.INTERVAL_SECS == 2 * tokenbucket_instance.MIN_INTERVAL_SECS
+    )
+
+    tokenbucket_instance.status_q.put(("www.internet.de", 429, 0.1, "120"))
+    tokenbucket_instance.check_throttling(datetime.now(tz=timezone.utc))
+    assert bucket.rate == 0
+    assert bucket.tokens < 1
+    assert 119 < tokenbucket_instance.INTERVAL_SECS <= 120